@@ -0,0 +1 @@
+"""Бенчмарки Facecast Video Downloader (запуск: python -m benchmarks.<имя>)"""
@@ -0,0 +1,131 @@
+"""
+Бенчмарк разбора сообщений чата на синтетическом корпусе
+
+Запуск:
+    python -m benchmarks.chat_parser                 # 1 000 000 строк
+    python -m benchmarks.chat_parser -n 200000 --legacy
+"""
+
+import re
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+from typing import Callable, Dict, List
+
+from src.chat_parser import ChatTextParser
+
+
+AUTHORS = [
+    'Антон Середкин (Базис)', 'Леонтьев Дмитрий (Рубитех)', 'Мария Иванова',
+    'John Smith (Acme)', 'Ольга Петрова', 'Иван Сидоров (Альфа Банк)',
+]
+
+TEXTS = [
+    'Привет, коллеги! Доброе утро!',
+    'Коллеги, добрый день!',
+    'А будет ли запись вебинара?',
+    'Спасибо за доклад, очень полезно',
+    'Подскажите, где скачать презентацию?',
+]
+
+
+def generate_corpus(count: int, duplicate_ratio: float = 0.1, seed: int = 42) -> List[str]:
+    """
+    Создает синтетические строки в формате виджета
+
+    Args:
+        count: Количество строк
+        duplicate_ratio: Доля повторов (виджет отдает одни и те же узлы несколько раз)
+        seed: Зерно генератора
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(count):
+        if corpus and rng.random() < duplicate_ratio:
+            corpus.append(corpus[rng.randrange(len(corpus))])
+            continue
+        minutes = i // 60 % (24 * 60)
+        moderator = 'Модератор' if rng.random() < 0.05 else ''
+        emoji = '👍🔥' if rng.random() < 0.2 else ''
+        corpus.append(
+            f"{minutes // 60:02d}:{minutes % 60:02d}{rng.choice(AUTHORS)}{moderator}"
+            f"{rng.choice(TEXTS)} #{i}{emoji}"
+        )
+    return corpus
+
+
+def legacy_parse(raw_messages: List[str]) -> List[Dict[str, str]]:
+    """Прежняя реализация OpendemoChat._parse_messages (для сравнения)"""
+    parsed = []
+    seen = set()
+    for raw in raw_messages:
+        if raw in seen:
+            continue
+        seen.add(raw)
+        time_match = re.match(r'^(\d{1,2}:\d{2})', raw)
+        time_str = time_match.group(1) if time_match else ""
+        text = raw[len(time_str):] if time_str else raw
+        author_match = re.match(r'^([А-ЯЁA-Z][а-яёa-z]+(?:\s+[А-ЯЁA-Z][а-яёa-z]+)*(?:\s*\([^)]+\))?)', text)
+        author = author_match.group(1).strip() if author_match else "Unknown"
+        if author != "Unknown":
+            text = text[len(author):].strip()
+        text = re.sub(r'^Модератор\s*', '', text)
+        text = re.sub(r'[👍👎❤️🤩🔥😍👋😋😆🥰🤣🤔🤯😱🤬😢😈🤷‍♂️💯🎉💔🤝🏆🗿]+$', '', text).strip()
+        if text and len(text) > 3:
+            parsed.append({'time': time_str, 'author': author, 'text': text})
+    return parsed
+
+
+def measure(name: str, func: Callable[[List[str]], list], corpus: List[str],
+            track_memory: bool) -> Dict[str, float]:
+    """Замеряет скорость и (опционально) пиковую память одного парсера"""
+    start = time.perf_counter()
+    result = func(corpus)
+    elapsed = time.perf_counter() - start
+
+    stats = {
+        'messages': len(result),
+        'seconds': elapsed,
+        'messages_per_sec': len(corpus) / elapsed if elapsed else 0.0,
+    }
+    del result
+
+    if track_memory:
+        tracemalloc.start()
+        func(corpus)
+        stats['peak_mb'] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+
+    line = (f"{name:8} {stats['messages']:>9} сообщений  "
+            f"{stats['messages_per_sec']:>12,.0f} строк/с  {elapsed:7.2f} с")
+    if 'peak_mb' in stats:
+        line += f"  пик памяти {stats['peak_mb']:8.1f} МБ"
+    print(line)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк разбора сообщений чата')
+    parser.add_argument('-n', '--count', type=int, default=1_000_000, help='Количество строк корпуса')
+    parser.add_argument('--legacy', action='store_true', help='Сравнить с прежней реализацией')
+    parser.add_argument('--no-memory', action='store_true', help='Не замерять пиковую память (tracemalloc)')
+    args = parser.parse_args()
+
+    print(f"Генерация корпуса: {args.count} строк...")
+    corpus = generate_corpus(args.count)
+
+    track_memory = not args.no_memory
+    current = measure('parser', lambda raws: ChatTextParser().parse_batch(raws), corpus, track_memory)
+
+    if args.legacy:
+        legacy = measure('legacy', legacy_parse, corpus, track_memory)
+        if legacy['messages'] != current['messages']:
+            print(f"✗ Результаты различаются: {legacy['messages']} != {current['messages']}")
+            sys.exit(1)
+        print(f"Ускорение: {current['messages_per_sec'] / legacy['messages_per_sec']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
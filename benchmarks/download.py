@@ -0,0 +1,248 @@
+"""
+Сквозной бенчмарк скачивания на локальном HLS сервере
+
+Сервер (src/standin/hls.py) работает в отдельном процессе, каждый замер -
+в свежем процессе, поэтому пиковая память и процессорное время относятся
+только к загрузчику.
+
+Запуск:
+    python -m benchmarks.download                                  # 100 x 1 МБ, 1/5/10 потоков
+    python -m benchmarks.download --segments 300 --segment-size 2M --latency 0.05 --jitter 0.05
+    python -m benchmarks.download --bandwidth 4M --error-rate 0.02 --workers 5,20
+    python -m benchmarks.download --mode video                     # через download_video целиком
+    python -m benchmarks.download --save                           # benchmarks/results/download-<commit>.json
+    python -m benchmarks.download --compare benchmarks/results/download-abc1234.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+import contextlib
+import multiprocessing
+from dataclasses import asdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from src.standin.hls import HLSConfig, HLSStandInServer
+from src.segment_cache import parse_size
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def _serve(config: HLSConfig, ready):
+    server = HLSStandInServer(config)
+    ready.put(server.base_url)
+    server.serve_forever()
+
+
+def start_server(config: HLSConfig):
+    """
+    Запускает HLS сервер в отдельном процессе
+
+    Returns:
+        (процесс, базовый URL)
+    """
+    context = multiprocessing.get_context('spawn')
+    ready = context.Queue()
+    process = context.Process(target=_serve, args=(config, ready), daemon=True)
+    process.start()
+    return process, ready.get(timeout=30)
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Перцентиль методом ближайшего ранга"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Пиковый RSS текущего процесса (МБ)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдает килобайты, macOS - байты
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def run_case(base_url: str, mode: str, workers: int, output_dir: str) -> Dict:
+    """Один замер (выполняется в отдельном процессе)"""
+    import requests
+    from src.hooks import DownloadHooks
+    from src.m3u8_parser import M3U8Parser
+    from src.metadata import VideoMetadataExtractor
+    from src.downloader import VideoDownloader
+    from src.download import download_video
+
+    latencies = []
+
+    class LatencyRecorder(DownloadHooks):
+        def on_request_end(self, url, kind, status, nbytes, latency, error):
+            if kind == 'segment' and status == 200:
+                latencies.append(latency)
+
+    hooks = [LatencyRecorder()]
+    output_path = os.path.join(output_dir, f'bench-{mode}-{workers}.ts')
+
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        if mode == 'video':
+            VideoMetadataExtractor.BASE_URL = base_url
+            result = download_video('https://facecast.net/w/bench', output_dir=output_dir,
+                                    filename=os.path.basename(output_path), workers=workers, hooks=hooks)
+        else:
+            parser = M3U8Parser()
+            master = requests.get(f'{base_url}/master.m3u8', timeout=30).text
+            media_url = f"{base_url}/{parser.select_best_quality(master)}"
+            urls = parser.parse(requests.get(media_url, timeout=30).text, media_url)
+            result = VideoDownloader(max_workers=workers, hooks=hooks).download_segments(urls, output_path)
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+
+    size = os.path.getsize(output_path) if result.success else 0
+    for path in (output_path, output_path + '.segments.json'):
+        if os.path.exists(path):
+            os.remove(path)
+
+    gigabytes = size / 1024 ** 3
+    return {
+        'success': result.success,
+        'error': result.error_message,
+        'seconds': elapsed,
+        'bytes': size,
+        'throughput_mb_s': size / 1024 ** 2 / elapsed if elapsed else 0.0,
+        'latency_p50_ms': (percentile(latencies, 0.50) or 0.0) * 1000,
+        'latency_p99_ms': (percentile(latencies, 0.99) or 0.0) * 1000,
+        'requests': len(latencies),
+        'peak_rss_mb': peak_rss_mb(),
+        'cpu_seconds': cpu,
+        'cpu_s_per_gb': cpu / gigabytes if gigabytes else None,
+    }
+
+
+def measure(base_url: str, mode: str, workers: int, output_dir: str) -> Dict:
+    """Запускает замер в свежем процессе"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(run_case, base_url, mode, workers, output_dir).result()
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def print_row(name: str, stats: Dict):
+    if not stats['success']:
+        print(f"{name:18} ✗ {stats['error']}")
+        return
+    rss = f"{stats['peak_rss_mb']:7.1f} МБ" if stats['peak_rss_mb'] is not None else '       -'
+    cpu = f"{stats['cpu_s_per_gb']:7.2f}" if stats['cpu_s_per_gb'] is not None else '      -'
+    print(f"{name:18} {stats['throughput_mb_s']:9.1f} МБ/с  p50 {stats['latency_p50_ms']:7.1f} мс  "
+          f"p99 {stats['latency_p99_ms']:7.1f} мс  RSS {rss}  CPU {cpu} с/ГБ  {stats['seconds']:6.2f} с")
+
+
+def compare(current: Dict, baseline_path: str):
+    """Печатает изменения относительно сохраненного прогона"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nСравнение с {baseline.get('commit', '?')} ({baseline_path}):")
+    if baseline.get('config') != current['config']:
+        print("  ⚠ Параметры сервера отличаются - сравнение приблизительное")
+    previous = {case['name']: case for case in baseline.get('cases', [])}
+    for case in current['cases']:
+        old = previous.get(case['name'])
+        if not old or not old['success'] or not case['success']:
+            continue
+        change = (case['throughput_mb_s'] / old['throughput_mb_s'] - 1) * 100 if old['throughput_mb_s'] else 0.0
+        print(f"  {case['name']:18} {old['throughput_mb_s']:8.1f} -> {case['throughput_mb_s']:8.1f} МБ/с "
+              f"({change:+.1f}%)  p99 {old['latency_p99_ms']:.1f} -> {case['latency_p99_ms']:.1f} мс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Сквозной бенчмарк скачивания на локальном HLS сервере')
+    parser.add_argument('--segments', type=int, default=100, help='Количество сегментов')
+    parser.add_argument('--segment-size', default='1M', help='Размер сегмента, например 512K или 2M')
+    parser.add_argument('--latency', type=float, default=0.02, help='Задержка ответа на сегмент (с)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Случайная добавка к задержке (с)')
+    parser.add_argument('--bandwidth', help='Ограничение скорости одного ответа, например 4M (байт/с)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Доля ответов 503')
+    parser.add_argument('--truncate-rate', type=float, default=0.0, help='Доля оборванных ответов')
+    parser.add_argument('-w', '--workers', default='1,5,10', help='Количество потоков через запятую')
+    parser.add_argument('--mode', choices=['downloader', 'video'], default='downloader',
+                        help='downloader - VideoDownloader.download_segments, video - download_video целиком')
+    parser.add_argument('--save', nargs='?', const='', metavar='PATH',
+                        help='Сохранить результаты (по умолчанию benchmarks/results/download-<commit>.json)')
+    parser.add_argument('--compare', metavar='PATH', help='Сравнить с сохраненными результатами')
+    args = parser.parse_args()
+
+    config = HLSConfig(
+        segments=args.segments,
+        segment_size=parse_size(args.segment_size),
+        latency=args.latency,
+        jitter=args.jitter,
+        bandwidth=parse_size(args.bandwidth) if args.bandwidth else None,
+        error_rate=args.error_rate,
+        truncate_rate=args.truncate_rate,
+    )
+    workers_list = [int(value) for value in args.workers.split(',') if value.strip()]
+
+    total_mb = config.segments * config.actual_segment_size / 1024 ** 2
+    print(f"Сервер: {config.segments} сегментов x {config.actual_segment_size / 1024:.0f} КБ "
+          f"({total_mb:.0f} МБ), задержка {config.latency * 1000:.0f} мс")
+
+    process, base_url = start_server(config)
+    cases = []
+    try:
+        with tempfile.TemporaryDirectory(prefix='facecast-bench-') as output_dir:
+            for workers in workers_list:
+                name = f"{args.mode} w={workers}"
+                stats = measure(base_url, args.mode, workers, output_dir)
+                stats['name'] = name
+                stats['workers'] = workers
+                cases.append(stats)
+                print_row(name, stats)
+    finally:
+        process.terminate()
+        process.join()
+
+    commit = current_commit()
+    report = {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'mode': args.mode,
+        'config': {**asdict(config), 'variants': list(config.variants)},
+        'cases': cases,
+    }
+
+    if args.compare:
+        compare(report, args.compare)
+
+    if args.save is not None:
+        path = args.save or os.path.join(RESULTS_DIR, f'download-{commit}.json')
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n✓ Результаты сохранены: {path}")
+
+    if not all(case['success'] for case in cases):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
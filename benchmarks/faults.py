@@ -0,0 +1,297 @@
+"""
+Сценарии сбоев: время и корректность скачивания VideoDownloader
+
+Каждый сценарий поднимает локальный HLS сервер (src/standin/hls.py) с
+заданными сбоями, скачивает media playlist лучшего качества через
+VideoDownloader.download_segments (сценарии с full_path - через
+download_video целиком, со страницы события) и сверяет результат с
+эталонными сегментами. Сервер работает в том же процессе - время сценариев
+определяется задержками и повторами, а не пропускной способностью.
+
+Запуск:
+    python -m benchmarks.faults                                # все сценарии
+    python -m benchmarks.faults --only reset,edge_outage -w 10
+    python -m benchmarks.faults --list
+    python -m benchmarks.faults --save                         # benchmarks/results/faults-<commit>.json
+    python -m benchmarks.faults --compare benchmarks/results/faults-abc1234.json
+
+Код выхода 1, если исход сценария не совпал с ожидаемым, файл
+отличается от эталона или (с --compare) сценарий замедлился больше
+допустимого.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import platform
+import tempfile
+import threading
+import contextlib
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from src.standin.hls import HLSConfig, HLSStandInServer
+from src.segment_cache import parse_size
+from src.m3u8_parser import M3U8Parser
+from src.downloader import VideoDownloader
+from src.hooks import DownloadHooks
+from src.metadata import VideoMetadataExtractor
+from src.download import download_video
+from benchmarks.download import RESULTS_DIR, current_commit
+
+
+SEGMENT_NAME = re.compile(r'/seg(\d+)\.ts$')
+
+# Замедление меньше этого (секунды) не считается регрессией при --compare
+MIN_REGRESSION = 0.5
+
+
+@dataclass
+class Scenario:
+    """Сценарий сбоя"""
+    name: str
+    description: str
+    faults: Dict[str, Any] = field(default_factory=dict)  # поля HLSConfig поверх общих параметров
+    expect_success: bool = True  # ожидаемый исход скачивания
+    full_path: bool = False  # скачивать через download_video (с разбором плейлиста)
+
+
+SCENARIOS = [
+    Scenario('baseline', 'без сбоев - точка отсчета'),
+    Scenario('slowloris', '5% ответов первые 3 с отдаются по пакету раз в 0.5 с',
+             {'stall_rate': 0.05, 'stall': 3.0}),
+    Scenario('reset', '5% соединений сбрасываются (RST) на середине тела',
+             {'reset_rate': 0.05}),
+    Scenario('truncated', '5% ответов обрываются на середине тела',
+             {'truncate_rate': 0.05}),
+    Scenario('burst_503', 'каждые 4 с - 0.5 с ответов 503',
+             {'burst_every': 4.0, 'burst_length': 0.5, 'burst_status': 503}),
+    Scenario('burst_429', 'каждые 4 с - 1 с ответов 429 с Retry-After',
+             {'burst_every': 4.0, 'burst_length': 1.0, 'burst_status': 429}),
+    Scenario('edge_outage', 'один из трех узлов CDN недоступен 2 с',
+             {'edges': 3, 'dark_edge': 1, 'dark_after': 0.3, 'dark_for': 2.0}),
+    Scenario('edge_down', 'один из трех узлов CDN отключается до конца (переключения узлов нет)',
+             {'edges': 3, 'dark_edge': 1, 'dark_after': 0.3}, expect_success=False),
+    # Плейлист читается один раз, поэтому живой поток не записывается: ожидается
+    # понятная ошибка вместо файла из текущего окна
+    Scenario('live_window', 'идет трансляция: окно из 10 сегментов сдвигается каждые 0.2 с',
+             {'live': True, 'live_window': 10, 'live_advance': 0.2, 'live_purge': 1.0},
+             expect_success=False, full_path=True),
+]
+
+
+class RetryRecorder(DownloadHooks):
+    """Считает повторные запросы по причине и типу ошибки"""
+
+    def __init__(self):
+        self.retries: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def on_retry(self, url, attempt, reason, error):
+        key = f"{reason}:{type(error).__name__}"
+        with self._lock:
+            self.retries[key] = self.retries.get(key, 0) + 1
+
+
+def playlist_urls(server: HLSStandInServer) -> List[str]:
+    """URL сегментов media playlist лучшего качества (как их видит download_video)"""
+    parser = M3U8Parser()
+    master = requests.get(server.master_url, timeout=30).text
+    media_url = f"{server.base_url}/{parser.select_best_quality(master)}"
+    return parser.parse(requests.get(media_url, timeout=30).text, media_url)
+
+
+def expected_digest(server: HLSStandInServer, urls: List[str]) -> str:
+    """SHA-256 склейки эталонных сегментов"""
+    digest = hashlib.sha256()
+    for url in urls:
+        digest.update(server.segment(int(SEGMENT_NAME.search(url).group(1))))
+    return digest.hexdigest()
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def run_scenario(scenario: Scenario, base: HLSConfig, workers: int, output_dir: str) -> Dict:
+    """
+    Выполняет сценарий
+
+    Returns:
+        Словарь с исходом, временем, повторами и счетчиками сбоев сервера
+    """
+    config = replace(base, **scenario.faults)
+    recorder = RetryRecorder()
+    output_path = os.path.join(output_dir, f'{scenario.name}.ts')
+
+    with HLSStandInServer(config) as server:
+        started = time.perf_counter()
+        urls = playlist_urls(server)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            if scenario.full_path:
+                VideoMetadataExtractor.BASE_URL = server.base_url
+                result = download_video(f'https://facecast.net/w/{scenario.name}', output_dir=output_dir,
+                                        filename=os.path.basename(output_path), workers=workers,
+                                        hooks=[recorder])
+            else:
+                result = VideoDownloader(max_workers=workers, hooks=[recorder]).download_segments(urls, output_path)
+        elapsed = time.perf_counter() - started
+        faults = {key: value for key, value in server.stats.items()
+                  if key not in ('requests', 'bytes') and value}
+        requests_count = server.stats['requests']
+        correct = result.success and file_digest(output_path) == expected_digest(server, urls)
+
+    for path in (output_path, output_path + '.segments.json'):
+        if os.path.exists(path):
+            os.remove(path)
+
+    return {
+        'name': scenario.name,
+        'success': result.success,
+        'expected': scenario.expect_success,
+        'correct': correct,
+        'error': result.error_message,
+        'seconds': elapsed,
+        'segments': len(urls),
+        'requests': requests_count,
+        'retries': recorder.retries,
+        'faults': faults,
+    }
+
+
+def passed(case: Dict) -> bool:
+    """Исход совпал с ожидаемым, а скачанный файл - с эталоном"""
+    if case['success'] != case['expected']:
+        return False
+    return case['correct'] or not case['success']
+
+
+def print_row(case: Dict, baseline_seconds: Optional[float]):
+    mark = '✓' if passed(case) else '✗'
+    outcome = 'скачано' if case['success'] else 'ошибка'
+    if case['success'] and not case['correct']:
+        outcome = 'ФАЙЛ ОТЛИЧАЕТСЯ'
+    slowdown = f"x{case['seconds'] / baseline_seconds:4.1f}" if baseline_seconds else '     '
+    retries = sum(case['retries'].values())
+    print(f"{mark} {case['name']:13} {case['seconds']:7.2f} с {slowdown}  {outcome:15} "
+          f"повторов {retries:3}  запросов {case['requests']:4}")
+    details = [f"{key}={value}" for key, value in sorted(case['retries'].items())]
+    details += [f"{key}={value}" for key, value in sorted(case['faults'].items())]
+    if details:
+        print(f"  {'':13} {', '.join(details)}")
+    if case['error'] and not passed(case):
+        print(f"  {'':13} {case['error']}")
+
+
+def compare(current: Dict, baseline_path: str, tolerance: float) -> bool:
+    """
+    Печатает изменения времени относительно сохраненного прогона
+
+    Returns:
+        True, если ни один сценарий не замедлился больше допустимого
+    """
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nСравнение с {baseline.get('commit', '?')} ({baseline_path}):")
+    if baseline.get('config') != current['config'] or baseline.get('workers') != current['workers']:
+        print("  ⚠ Параметры прогона отличаются - сравнение приблизительное")
+    previous = {case['name']: case for case in baseline.get('cases', [])}
+    ok = True
+    for case in current['cases']:
+        old = previous.get(case['name'])
+        if not old:
+            continue
+        change = case['seconds'] - old['seconds']
+        regression = change > MIN_REGRESSION and change > old['seconds'] * tolerance
+        outcome_changed = old['success'] != case['success']
+        ok = ok and not regression
+        mark = '✗' if regression else ('⚠' if outcome_changed else ' ')
+        note = ' исход изменился' if outcome_changed else ''
+        print(f"  {mark} {case['name']:13} {old['seconds']:7.2f} -> {case['seconds']:7.2f} с "
+              f"({change / old['seconds'] * 100 if old['seconds'] else 0.0:+.0f}%){note}")
+    return ok
+
+
+def main():
+    names = [scenario.name for scenario in SCENARIOS]
+    parser = argparse.ArgumentParser(description='Сценарии сбоев скачивания на локальном HLS сервере')
+    parser.add_argument('--only', help=f"Сценарии через запятую ({', '.join(names)})")
+    parser.add_argument('--list', action='store_true', help='Показать сценарии и выйти')
+    parser.add_argument('--segments', type=int, default=60, help='Количество сегментов')
+    parser.add_argument('--segment-size', default='256K', help='Размер сегмента, например 256K или 1M')
+    parser.add_argument('--latency', type=float, default=0.02, help='Задержка ответа на сегмент (с)')
+    parser.add_argument('-w', '--workers', type=int, default=VideoDownloader.DEFAULT_WORKERS,
+                        help='Количество потоков скачивания')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Допустимое замедление при --compare (доля, по умолчанию 0.25)')
+    parser.add_argument('--save', nargs='?', const='', metavar='PATH',
+                        help='Сохранить результаты (по умолчанию benchmarks/results/faults-<commit>.json)')
+    parser.add_argument('--compare', metavar='PATH', help='Сравнить с сохраненными результатами')
+    args = parser.parse_args()
+
+    if args.list:
+        for scenario in SCENARIOS:
+            expectation = '' if scenario.expect_success else ' [ожидается ошибка]'
+            print(f"{scenario.name:13} {scenario.description}{expectation}")
+        return
+
+    selected = SCENARIOS
+    if args.only:
+        wanted = [name.strip() for name in args.only.split(',') if name.strip()]
+        unknown = [name for name in wanted if name not in names]
+        if unknown:
+            parser.error(f"неизвестные сценарии: {', '.join(unknown)}")
+        selected = [scenario for scenario in SCENARIOS if scenario.name in wanted]
+
+    base = HLSConfig(segments=args.segments, segment_size=parse_size(args.segment_size), latency=args.latency)
+    print(f"Сервер: {base.segments} сегментов x {base.actual_segment_size / 1024:.0f} КБ, "
+          f"задержка {base.latency * 1000:.0f} мс, потоков {args.workers}\n")
+
+    cases = []
+    baseline_seconds = None
+    with tempfile.TemporaryDirectory(prefix='facecast-faults-') as output_dir:
+        for scenario in selected:
+            case = run_scenario(scenario, base, args.workers, output_dir)
+            if scenario.name == 'baseline' and case['success']:
+                baseline_seconds = case['seconds']
+            cases.append(case)
+            print_row(case, baseline_seconds)
+
+    commit = current_commit()
+    report = {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'workers': args.workers,
+        'config': {**asdict(base), 'variants': list(base.variants)},
+        'cases': cases,
+    }
+
+    ok = all(passed(case) for case in cases)
+    if args.compare:
+        ok = compare(report, args.compare, args.tolerance) and ok
+
+    if args.save is not None:
+        path = args.save or os.path.join(RESULTS_DIR, f'faults-{commit}.json')
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n✓ Результаты сохранены: {path}")
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""
+Память при скачивании длинного видео
+
+Скачивает синтетический поток в несколько гигабайт с локального HLS
+сервера через VideoDownloader.download_segments и следит за RSS и
+tracemalloc. Память загрузчика не должна зависеть от длины видео:
+бенчмарк завершается с кодом 1, если пик превысил заданную границу.
+
+Запуск:
+    python -m benchmarks.memory                                  # 2 ГБ сегментами по 2 МБ, граница RSS 256 МБ
+    python -m benchmarks.memory --size 8G --workers 20 --max-rss 384M
+    python -m benchmarks.memory --size 1G --no-tracemalloc       # только RSS, без накладных расходов tracemalloc
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+import contextlib
+import multiprocessing
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from src.standin.hls import HLSConfig
+from src.segment_cache import parse_size
+from benchmarks.download import start_server, peak_rss_mb
+
+
+# Сколько раз за скачивание снимать память
+CHECKPOINTS = 10
+TOP_ALLOCATIONS = 5
+
+
+def current_rss_mb() -> Optional[float]:
+    """Текущий RSS процесса (МБ); без /proc - пиковый"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_mb()
+
+
+def run_download(base_url: str, workers: int, output_dir: str, trace: bool) -> Dict:
+    """Скачивание с замерами памяти (выполняется в отдельном процессе)"""
+    import requests
+    from src.hooks import DownloadHooks
+    from src.m3u8_parser import M3U8Parser
+    from src.downloader import VideoDownloader
+
+    parser = M3U8Parser()
+    master = requests.get(f'{base_url}/master.m3u8', timeout=30).text
+    media_url = f"{base_url}/{parser.select_best_quality(master)}"
+    urls = parser.parse(requests.get(media_url, timeout=30).text, media_url)
+    every = max(1, len(urls) // CHECKPOINTS)
+
+    checkpoints: List[Dict] = []
+    heaviest = {'traced': -1, 'snapshot': None}
+    lock = threading.Lock()
+
+    class MemorySampler(DownloadHooks):
+        def __init__(self):
+            self.written = 0
+
+        def on_segment_written(self, index, nbytes, latency):
+            with lock:
+                self.written += 1
+                if self.written % every:
+                    return
+                point = {'segments': self.written, 'rss_mb': current_rss_mb()}
+                if trace:
+                    traced = tracemalloc.get_traced_memory()[0]
+                    point['traced_mb'] = traced / 1024 ** 2
+                    if traced > heaviest['traced']:
+                        heaviest['traced'] = traced
+                        heaviest['snapshot'] = tracemalloc.take_snapshot()
+                checkpoints.append(point)
+
+    if trace:
+        tracemalloc.start()
+    output_path = os.path.join(output_dir, 'memory.ts')
+    started = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        result = VideoDownloader(max_workers=workers, hooks=[MemorySampler()]).download_segments(urls, output_path)
+    elapsed = time.perf_counter() - started
+
+    traced_peak = None
+    top = []
+    if trace:
+        traced_peak = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        if heaviest['snapshot'] is not None:
+            for stat in heaviest['snapshot'].statistics('lineno')[:TOP_ALLOCATIONS]:
+                frame = stat.traceback[0]
+                top.append({'site': f"{frame.filename}:{frame.lineno}", 'mb': stat.size / 1024 ** 2,
+                            'blocks': stat.count})
+        tracemalloc.stop()
+
+    size = os.path.getsize(output_path) if result.success else 0
+    for path in (output_path, output_path + '.segments.json'):
+        if os.path.exists(path):
+            os.remove(path)
+
+    return {
+        'success': result.success,
+        'error': result.error_message,
+        'segments': len(urls),
+        'bytes': size,
+        'seconds': elapsed,
+        'peak_rss_mb': peak_rss_mb(),
+        'traced_peak_mb': traced_peak,
+        'checkpoints': checkpoints,
+        'top_allocations': top,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Пиковая память при скачивании длинного видео')
+    parser.add_argument('--size', default='2G', help='Объем потока, например 2G или 8G')
+    parser.add_argument('--segment-size', default='2M', help='Размер сегмента')
+    parser.add_argument('-w', '--workers', type=int, default=10, help='Количество потоков скачивания')
+    parser.add_argument('--max-rss', default='256M', help='Граница пикового RSS процесса скачивания')
+    parser.add_argument('--max-traced', default='128M', help='Граница пика памяти по tracemalloc')
+    parser.add_argument('--no-tracemalloc', action='store_true', help='Не включать tracemalloc')
+    parser.add_argument('--output-dir', help='Каталог для временного файла (по умолчанию - системный)')
+    args = parser.parse_args()
+
+    segment_size = parse_size(args.segment_size)
+    config = HLSConfig(segments=max(1, parse_size(args.size) // segment_size), segment_size=segment_size)
+    max_rss = parse_size(args.max_rss) / 1024 ** 2
+    max_traced = parse_size(args.max_traced) / 1024 ** 2
+    trace = not args.no_tracemalloc
+
+    total_mb = config.segments * config.actual_segment_size / 1024 ** 2
+    print(f"Поток: {config.segments} сегментов x {config.actual_segment_size / 1024 ** 2:.1f} МБ "
+          f"({total_mb / 1024:.2f} ГБ), потоков {args.workers}")
+
+    process, base_url = start_server(config)
+    try:
+        with tempfile.TemporaryDirectory(prefix='facecast-memory-', dir=args.output_dir) as output_dir:
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                stats = pool.submit(run_download, base_url, args.workers, output_dir, trace).result()
+    finally:
+        process.terminate()
+        process.join()
+
+    if not stats['success']:
+        print(f"✗ Скачивание не удалось: {stats['error']}")
+        sys.exit(1)
+
+    print(f"\nСкачано {stats['bytes'] / 1024 ** 3:.2f} ГБ за {stats['seconds']:.1f} с\n")
+    print(f"{'сегментов':>10} {'RSS, МБ':>9}" + (f" {'traced, МБ':>11}" if trace else ''))
+    for point in stats['checkpoints']:
+        line = f"{point['segments']:10} {point['rss_mb']:9.1f}"
+        if trace:
+            line += f" {point['traced_mb']:11.1f}"
+        print(line)
+
+    if stats['top_allocations']:
+        print("\nКрупнейшие выделения в самой тяжелой точке:")
+        for allocation in stats['top_allocations']:
+            print(f"  {allocation['mb']:8.1f} МБ  {allocation['blocks']:6} блоков  {allocation['site']}")
+
+    ok = True
+    peak_rss = stats['peak_rss_mb']
+    if peak_rss is not None:
+        mark = '✓' if peak_rss <= max_rss else '✗'
+        ok = peak_rss <= max_rss
+        print(f"\n{mark} Пиковый RSS: {peak_rss:.1f} МБ (граница {max_rss:.0f} МБ)")
+    else:
+        print("\n⚠ Пиковый RSS недоступен в этой системе")
+    if trace:
+        traced_ok = stats['traced_peak_mb'] <= max_traced
+        ok = ok and traced_ok
+        print(f"{'✓' if traced_ok else '✗'} Пик tracemalloc: {stats['traced_peak_mb']:.1f} МБ "
+              f"(граница {max_traced:.0f} МБ)")
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
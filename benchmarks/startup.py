@@ -0,0 +1,159 @@
+"""
+Время запуска CLI
+
+Каждый сценарий запускается отдельным процессом несколько раз; время -
+медиана от старта интерпретатора до выхода, за вычетом пустого запуска
+`python -c pass`. Один дополнительный запуск с `python -X importtime`
+показывает, какие модули загружены, и проверяет, что тяжелые зависимости
+(requests, bs4, selenium, numpy, http.server) не импортируются там, где
+они не нужны.
+
+Запуск:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 30 --top 15
+    python -m benchmarks.startup --max-ms 80                  # код выхода 1, если медиана больше
+    python -m benchmarks.startup --save                       # benchmarks/results/startup-<commit>.json
+    python -m benchmarks.startup --compare benchmarks/results/startup-abc1234.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+from typing import Dict, List, Tuple
+
+from benchmarks.download import RESULTS_DIR, current_commit
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Сценарий -> аргументы интерпретатора
+CASES = {
+    'import': ['-c', 'import src.download'],
+    'help': ['-m', 'src.download', '--help'],
+    'bad-url': ['-m', 'src.download', 'https://example.com/not-a-video'],
+    'tune-help': ['-m', 'src.download', 'tune', '--help'],
+    'verify-help': ['-m', 'src.download', 'verify', '--help'],
+    'index-help': ['-m', 'src.download', 'index', '--help'],
+}
+
+# Модули, которые не должны загружаться ни в одном сценарии
+HEAVY_MODULES = ('requests', 'urllib3', 'bs4', 'selenium', 'numpy', 'http.server')
+
+
+def run_once(args: List[str], importtime: bool = False) -> Tuple[float, str]:
+    """
+    Запускает интерпретатор с аргументами
+
+    Returns:
+        (время в секундах, stderr)
+    """
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + args
+    started = time.perf_counter()
+    completed = subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return time.perf_counter() - started, completed.stderr
+
+
+def median_ms(args: List[str], runs: int) -> float:
+    return statistics.median(run_once(args)[0] for _ in range(runs)) * 1000
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """
+    Разбирает вывод -X importtime
+
+    Returns:
+        [(модуль с отступом вложенности, собственное время мкс, общее время мкс)]
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|', 2)
+        imports.append((name[1:].rstrip(), int(own), int(cumulative)))
+    return imports
+
+
+def heavy_imports(imports: List[Tuple[str, int, int]]) -> List[str]:
+    """Тяжелые модули из HEAVY_MODULES среди загруженных"""
+    loaded = {name.strip() for name, _, _ in imports}
+    return [module for module in HEAVY_MODULES if module in loaded]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Время запуска CLI и загружаемые модули')
+    parser.add_argument('--runs', type=int, default=15, help='Запусков на сценарий')
+    parser.add_argument('--top', type=int, default=10, help='Сколько самых долгих импортов показать для help')
+    parser.add_argument('--max-ms', type=float, help='Граница медианы сценария (мс, без пустого запуска)')
+    parser.add_argument('--save', nargs='?', const='', metavar='PATH',
+                        help='Сохранить результаты (по умолчанию benchmarks/results/startup-<commit>.json)')
+    parser.add_argument('--compare', metavar='PATH', help='Сравнить с сохраненными результатами')
+    args = parser.parse_args()
+
+    interpreter = median_ms(['-c', 'pass'], args.runs)
+    print(f"Пустой запуск интерпретатора: {interpreter:.1f} мс (вычитается)\n")
+
+    ok = True
+    cases: List[Dict] = []
+    help_imports: List[Tuple[str, int, int]] = []
+    for name, case_args in CASES.items():
+        elapsed = median_ms(case_args, args.runs) - interpreter
+        _, stderr = run_once(case_args, importtime=True)
+        imports = parse_importtime(stderr)
+        heavy = heavy_imports(imports)
+        if name == 'help':
+            help_imports = imports
+
+        slow = args.max_ms is not None and elapsed > args.max_ms
+        ok = ok and not heavy and not slow
+        mark = '✗' if heavy or slow else '✓'
+        note = f"  загружены: {', '.join(heavy)}" if heavy else ''
+        print(f"{mark} {name:12} {elapsed:7.1f} мс  модулей {len(imports):4}{note}")
+        cases.append({'name': name, 'ms': elapsed, 'modules': len(imports), 'heavy': heavy})
+
+    if help_imports and args.top:
+        # Модули, которые загружает сам интерпретатор (site и .pth файлы), не показываются
+        startup = {module.strip() for module, _, _ in parse_importtime(run_once(['-c', 'pass'], importtime=True)[1])}
+        print("\nСамые долгие импорты (help, общее время):")
+        top_level = [item for item in help_imports
+                     if len(item[0]) - len(item[0].lstrip()) <= 2 and item[0].strip() not in startup]
+        for module, _, cumulative in sorted(top_level, key=lambda item: -item[2])[:args.top]:
+            print(f"  {cumulative / 1000:7.1f} мс  {module.strip()}")
+
+    commit = current_commit()
+    report = {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'interpreter_ms': interpreter,
+        'cases': cases,
+    }
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\nСравнение с {baseline.get('commit', '?')} ({args.compare}):")
+        previous = {case['name']: case for case in baseline.get('cases', [])}
+        for case in cases:
+            old = previous.get(case['name'])
+            if old:
+                print(f"  {case['name']:12} {old['ms']:7.1f} -> {case['ms']:7.1f} мс ({case['ms'] - old['ms']:+.1f})")
+
+    if args.save is not None:
+        path = args.save or os.path.join(RESULTS_DIR, f'startup-{commit}.json')
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n✓ Результаты сохранены: {path}")
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,7 @@ from setuptools import setup, find_packages
 setup(
     name="facecast-downloader",
     version="0.1.0",
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
     install_requires=[
         "requests>=2.31.0",
         "beautifulsoup4>=4.12.0",
@@ -0,0 +1,140 @@
+"""Облегченный профиль браузера для извлечения чата"""
+
+from typing import List
+
+try:
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    SELENIUM_AVAILABLE = True
+except ImportError:
+    SELENIUM_AVAILABLE = False
+
+
+class ChatBrowserProfile:
+    """
+    Настраивает Chrome для извлечения чата
+
+    В облегченном режиме браузер не загружает картинки, шрифты,
+    видеосегменты и скрипты плеера, а элемент <video> отключается
+    до загрузки страницы. Виджет HyperComments при этом работает как обычно.
+    """
+
+    USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+    # Шаблоны URL для Network.setBlockedURLs (поддерживается только '*')
+    BLOCKED_URL_PATTERNS = [
+        # Видеопоток и медиа
+        '*.m3u8*', '*.ts', '*.ts?*', '*.m4s*', '*.mp4*', '*.aac*', '*.webm*',
+        # Изображения
+        '*.png*', '*.jpg*', '*.jpeg*', '*.gif*', '*.webp*', '*.svg*', '*.ico*',
+        # Шрифты
+        '*.woff*', '*.ttf*', '*.otf*', '*.eot*',
+        # Плеер facecast и счетчики
+        '*/player/*', '*player.js*', '*hls.min.js*', '*hls.js*',
+        '*mc.yandex.ru*', '*google-analytics.com*', '*googletagmanager.com*',
+    ]
+
+    # Chrome content settings: 2 = запрещено
+    BLOCKED_CONTENT_PREFS = {
+        'profile.managed_default_content_settings.images': 2,
+        'profile.managed_default_content_settings.media_stream': 2,
+        'profile.managed_default_content_settings.plugins': 2,
+        'profile.default_content_setting_values.notifications': 2,
+    }
+
+    # Выполняется в каждом документе (включая iframe) до скриптов страницы
+    DISABLE_MEDIA_SCRIPT = """
+    (function() {
+        var proto = window.HTMLMediaElement && window.HTMLMediaElement.prototype;
+        if (!proto) { return; }
+        proto.play = function() { return Promise.resolve(); };
+        proto.load = function() {};
+        Object.defineProperty(proto, 'autoplay', {get: function() { return false; }, set: function() {}});
+        Object.defineProperty(proto, 'preload', {get: function() { return 'none'; }, set: function() {}});
+        if (window.MediaSource) { window.MediaSource.isTypeSupported = function() { return false; }; }
+    })();
+    """
+
+    def __init__(self, headless: bool = True, lightweight: bool = True):
+        """
+        Args:
+            headless: Запускать браузер в фоновом режиме
+            lightweight: Блокировать медиа, картинки, шрифты и плеер
+        """
+        if not SELENIUM_AVAILABLE:
+            raise ImportError(
+                "Selenium не установлен. Установите: pip install selenium"
+            )
+
+        self.headless = headless
+        self.lightweight = lightweight
+
+    def build_options(self) -> 'Options':
+        """
+        Создает опции Chrome
+
+        Returns:
+            Настроенный объект Options
+        """
+        options = Options()
+        if self.headless:
+            options.add_argument('--headless')
+        options.add_argument('--no-sandbox')
+        options.add_argument('--disable-dev-shm-usage')
+        options.add_argument('--disable-gpu')
+        options.add_argument('--window-size=1920,1080')
+        options.add_argument(f'user-agent={self.USER_AGENT}')
+
+        if self.lightweight:
+            for argument in self._lightweight_arguments():
+                options.add_argument(argument)
+            options.add_experimental_option('prefs', dict(self.BLOCKED_CONTENT_PREFS))
+            # Не ждем загрузки всех ресурсов - достаточно DOM
+            options.page_load_strategy = 'eager'
+
+        return options
+
+    def _lightweight_arguments(self) -> List[str]:
+        """Аргументы командной строки Chrome для облегченного режима"""
+        return [
+            '--blink-settings=imagesEnabled=false',
+            '--autoplay-policy=user-gesture-required',
+            '--mute-audio',
+            '--disable-extensions',
+            '--disable-background-networking',
+            '--disable-component-update',
+            '--disable-default-apps',
+            '--disable-sync',
+            '--disable-features=MediaRouter,AutofillServerCommunication',
+            '--disable-remote-fonts',
+            '--js-flags=--max-old-space-size=256',
+        ]
+
+    def create_driver(self):
+        """
+        Запускает Chrome с профилем и настраивает блокировку запросов
+
+        Returns:
+            Экземпляр webdriver.Chrome
+        """
+        driver = webdriver.Chrome(options=self.build_options())
+
+        if self.lightweight:
+            self._apply_blocking(driver)
+
+        return driver
+
+    def _apply_blocking(self, driver):
+        """Включает блокировку запросов и отключение видео через CDP"""
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd(
+                'Network.setBlockedURLs', {'urls': self.BLOCKED_URL_PATTERNS}
+            )
+            driver.execute_cdp_cmd(
+                'Page.addScriptToEvaluateOnNewDocument',
+                {'source': self.DISABLE_MEDIA_SCRIPT}
+            )
+        except Exception as e:
+            # CDP доступен не во всех сборках драйвера - работаем без блокировки
+            print(f"⚠ Не удалось включить блокировку запросов: {e}")
@@ -0,0 +1,227 @@
+"""ChatAlignment - привязка сообщений чата к позиции в скачанном видео"""
+
+import re
+import json
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Iterable, List, Optional
+
+try:
+    from zoneinfo import ZoneInfo
+    ZONEINFO_AVAILABLE = True
+except ImportError:
+    ZONEINFO_AVAILABLE = False
+
+from .chat_message import ChatMessage
+from .m3u8_parser import Segment
+
+
+CLOCK_PATTERN = re.compile(r'^(\d{1,2}):(\d{2})(?::(\d{2}))?$')
+OFFSET_PATTERN = re.compile(r'^(?:UTC|GMT)?([+-])(\d{1,2})(?::?(\d{2}))?$', re.IGNORECASE)
+
+
+class ChatAlignmentError(Exception):
+    """Ошибка построения индекса привязки чата"""
+    pass
+
+
+def parse_timezone(value: str) -> tzinfo:
+    """
+    Разбирает часовой пояс времени сообщений чата
+
+    Args:
+        value: Имя зоны IANA (Europe/Moscow), UTC или смещение (+03:00, UTC+3)
+
+    Returns:
+        Часовой пояс
+
+    Raises:
+        ChatAlignmentError: Если часовой пояс не распознан
+    """
+    name = value.strip()
+    if name.upper() in ('UTC', 'GMT', 'Z'):
+        return timezone.utc
+
+    match = OFFSET_PATTERN.match(name)
+    if match:
+        offset = timedelta(hours=int(match.group(2)), minutes=int(match.group(3) or 0))
+        if offset >= timedelta(hours=24):
+            raise ChatAlignmentError(f"Недопустимое смещение часового пояса: {value}")
+        return timezone(-offset if match.group(1) == '-' else offset)
+
+    if not ZONEINFO_AVAILABLE:
+        raise ChatAlignmentError(
+            f"Имена часовых поясов ({value}) поддерживаются с Python 3.9 - укажите смещение, например +03:00"
+        )
+    try:
+        return ZoneInfo(name)
+    except (KeyError, ValueError):
+        raise ChatAlignmentError(f"Неизвестный часовой пояс: {value}")
+
+
+class ChatAlignment:
+    """
+    Индекс "сообщение -> смещение в видео и номер сегмента"
+
+    Время начала каждого сегмента берется из #EXT-X-PROGRAM-DATE-TIME,
+    а между метками экстраполируется по длительностям #EXTINF. Время
+    сообщения (HH:MM, ISO 8601 или unix-время) переводится в то же время
+    и ищется бинарным поиском среди сегментов.
+
+    Время без часового пояса (HH:MM и ISO без смещения) виджет чата
+    показывает в поясе зрителя, а не потока, поэтому оно читается в
+    поясе chat_tz, по умолчанию - в локальном поясе системы. Пояс
+    #EXT-X-PROGRAM-DATE-TIME (обычно UTC) для него не используется.
+
+    Формат файла (<видео>_chat_align.json):
+        {"version": 1, "stream_start": "...", "duration": 3600.0,
+         "segment_offsets": [0.0, 6.0, ...],
+         "messages": [[смещение, номер сегмента], ...]}
+
+    messages[i] соответствует i-му сообщению сохраненного чата;
+    [null, null] - время сообщения не удалось разобрать.
+    """
+
+    VERSION = 1
+
+    def __init__(self, segments: List[Segment], stream_start: Optional[datetime] = None,
+                 chat_tz: Optional[tzinfo] = None):
+        """
+        Args:
+            segments: Сегменты плейлиста в порядке воспроизведения
+            stream_start: Время начала потока, если в плейлисте нет
+                #EXT-X-PROGRAM-DATE-TIME
+            chat_tz: Часовой пояс времени сообщений без пояса
+                (None - локальный пояс системы)
+
+        Raises:
+            ChatAlignmentError: Если время начала потока неизвестно
+        """
+        if not segments:
+            raise ChatAlignmentError("Плейлист не содержит сегментов")
+
+        self.segment_offsets: List[float] = []
+        self.segment_wall_starts: List[float] = []
+        self.chat_tz = chat_tz
+
+        media_offset = 0.0
+        wall_clock = stream_start.timestamp() if stream_start else None
+        self.tz: Optional[tzinfo] = stream_start.tzinfo if stream_start else None
+
+        for segment in segments:
+            if segment.program_date_time is not None:
+                wall_clock = segment.program_date_time.timestamp()
+                if self.tz is None:
+                    self.tz = segment.program_date_time.tzinfo
+
+            if wall_clock is None:
+                raise ChatAlignmentError(
+                    "В плейлисте нет #EXT-X-PROGRAM-DATE-TIME - время начала потока неизвестно"
+                )
+
+            self.segment_offsets.append(media_offset)
+            self.segment_wall_starts.append(wall_clock)
+            media_offset += segment.duration
+            wall_clock += segment.duration
+
+        self.duration = media_offset
+        self.stream_start = datetime.fromtimestamp(self.segment_wall_starts[0], self.tz)
+
+    def locate(self, message: ChatMessage) -> Optional[List]:
+        """
+        Находит позицию сообщения в видео
+
+        Returns:
+            [смещение в секундах, номер сегмента] или None если время
+            сообщения не удалось разобрать. Сообщения до начала или после
+            конца потока прижимаются к границам видео.
+        """
+        moment = self._message_time(message.timestamp)
+        if moment is None:
+            return None
+
+        index = bisect_right(self.segment_wall_starts, moment) - 1
+        if index < 0:
+            return [0.0, 0]
+
+        offset = self.segment_offsets[index] + (moment - self.segment_wall_starts[index])
+        if index + 1 < len(self.segment_offsets):
+            if offset >= self.segment_offsets[index + 1]:
+                # Сообщение попало в разрыв между метками времени - начало следующего сегмента
+                index += 1
+                offset = self.segment_offsets[index]
+        else:
+            offset = min(offset, self.duration)
+
+        return [round(offset, 3), index]
+
+    def build(self, messages: Iterable[ChatMessage]) -> List[Optional[List]]:
+        """Возвращает позиции для всех сообщений в исходном порядке"""
+        return [self.locate(message) for message in messages]
+
+    def save(self, messages: Iterable[ChatMessage], output_path: str) -> int:
+        """
+        Строит индекс и сохраняет его рядом с видео
+
+        Args:
+            messages: Сообщения в том же порядке, что и в сохраненном чате
+            output_path: Путь к файлу индекса
+
+        Returns:
+            Количество сообщений с найденной позицией
+        """
+        positions = self.build(messages)
+        data = {
+            'version': self.VERSION,
+            'stream_start': self.stream_start.isoformat(),
+            'duration': round(self.duration, 3),
+            'segment_offsets': [round(offset, 3) for offset in self.segment_offsets],
+            'messages': [position or [None, None] for position in positions],
+        }
+
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+
+        return sum(1 for position in positions if position is not None)
+
+    def _message_time(self, timestamp: str) -> Optional[float]:
+        """Переводит время сообщения в unix-время"""
+        if not timestamp:
+            return None
+        timestamp = timestamp.strip()
+
+        clock = CLOCK_PATTERN.match(timestamp)
+        if clock:
+            return self._clock_time(int(clock.group(1)), int(clock.group(2)), int(clock.group(3) or 0))
+
+        try:
+            value = float(timestamp)
+            return value / 1000 if value > 1e11 else value
+        except ValueError:
+            pass
+
+        try:
+            moment = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        if moment.tzinfo is None and self.chat_tz is not None:
+            # Без chat_tz наивное время считается локальным
+            moment = moment.replace(tzinfo=self.chat_tz)
+        return moment.timestamp()
+
+    def _clock_time(self, hours: int, minutes: int, seconds: int) -> Optional[float]:
+        """
+        Время суток (HH:MM) в поясе chat_tz относительно дня начала потока
+        в том же поясе
+
+        Если получилось заметно раньше начала потока, значит трансляция
+        перешла через полночь.
+        """
+        start = self.stream_start.astimezone(self.chat_tz)
+        try:
+            moment = start.replace(hour=hours, minute=minutes, second=seconds, microsecond=0)
+        except ValueError:
+            return None
+        if moment < start - timedelta(hours=12):
+            moment += timedelta(days=1)
+        return moment.timestamp()
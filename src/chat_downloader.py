@@ -2,18 +2,17 @@
 
 import json
 import requests
-from typing import List, Dict, Optional
-from dataclasses import dataclass
-from datetime import datetime
+from typing import Any, Iterator, List, Dict, Optional
 
-
-@dataclass
-class ChatMessage:
-    """Сообщение чата"""
-    timestamp: str
-    username: str
-    message: str
-    user_id: Optional[str] = None
+from .chat_message import ChatMessage
+from .hooks import DownloadHooks, as_hook_list
+from .json_stream import JSONArrayStream
+from .chat_pagination import (
+    Page, PageFetcher, RateLimiter, item_id, make_session, merge_pages, pagination_info
+)
+from .chat_export import (
+    TxtChatExporter, JsonChatExporter, JsonlChatExporter, HtmlChatExporter
+)
 
 
 class ChatDownloadError(Exception):
@@ -26,10 +25,25 @@ class ChatDownloader:
     
     BASE_URL = "https://facecast.net"
     TIMEOUT = 30
+    STREAM_CHUNK_SIZE = 64 * 1024
+    PAGE_SIZE = 500
+    DEFAULT_WORKERS = PageFetcher.DEFAULT_WORKERS
     
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, rate_limit: Optional[float] = None,
+                 page_size: int = PAGE_SIZE, hooks: Optional[DownloadHooks] = None):
+        """
+        Args:
+            max_workers: Количество параллельных запросов страниц истории
+            rate_limit: Максимум запросов в секунду (None - без ограничения)
+            page_size: Количество сообщений, запрашиваемых на странице
+            hooks: Обратные вызовы (on_chat_messages)
+        """
+        self.max_workers = max(1, max_workers)
+        self.rate_limit = rate_limit
+        self.page_size = page_size
+        self.rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+        self.hooks = as_hook_list(hooks)
+        self.session = make_session(self.max_workers, {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
             'Accept': 'application/json',
             'Referer': 'https://facecast.net/'
@@ -52,10 +66,20 @@ class ChatDownloader:
         # Пробуем различные API endpoints для получения чата
         chat_messages = []
         
+        # Endpoint 0: История чата напрямую из API HyperComments
+        try:
+            chat_messages = self.download_hypercomments(video_id, code)
+            if chat_messages:
+                self.hooks.on_chat_messages('hypercomments', len(chat_messages))
+                return chat_messages
+        except Exception:
+            pass
+        
         # Endpoint 1: Попытка получить чат через API
         try:
             chat_messages = self._try_api_endpoint(video_id, code)
             if chat_messages:
+                self.hooks.on_chat_messages('api', len(chat_messages))
                 return chat_messages
         except Exception:
             pass
@@ -64,6 +88,7 @@ class ChatDownloader:
         try:
             chat_messages = self._try_html_endpoint(video_id, code)
             if chat_messages:
+                self.hooks.on_chat_messages('html', len(chat_messages))
                 return chat_messages
         except Exception:
             pass
@@ -72,30 +97,150 @@ class ChatDownloader:
         # (чат может быть отключен или недоступен)
         return []
     
+    def download_hypercomments(self, video_id: str, code: Optional[str] = None) -> List[ChatMessage]:
+        """
+        Скачивает историю чата через JSON API виджета HyperComments
+        
+        Args:
+            video_id: Идентификатор видео
+            code: Опциональный код доступа
+            
+        Returns:
+            Список сообщений (время - ISO 8601 в UTC) или пустой список,
+            если виджет на странице не найден
+            
+        Raises:
+            HyperCommentsError: Если API виджета не ответил
+        """
+        from .hypercomments import HyperCommentsClient
+        
+        query = f"?key={code}" if code else ""
+        for page_url in (f"{self.BASE_URL}/w/{video_id}{query}",
+                         f"{self.BASE_URL}/w/chat.html?{video_id}" + (f"&key={code}" if code else "")):
+            try:
+                response = self.session.get(page_url, timeout=self.TIMEOUT)
+            except requests.RequestException:
+                continue
+            if response.status_code != 200:
+                continue
+            
+            widget = HyperCommentsClient.discover(response.text, page_url)
+            if widget:
+                widget_id, xid = widget
+                client = HyperCommentsClient(widget_id, max_workers=self.max_workers,
+                                             rate_limit=self.rate_limit)
+                return client.fetch_history(xid)
+        
+        return []
+    
     def _try_api_endpoint(self, video_id: str, code: Optional[str]) -> List[ChatMessage]:
         """Пытается получить чат через API"""
+        try:
+            return list(self._iter_api_endpoint(video_id, code))
+        except Exception as e:
+            print(f"Ошибка при получении чата через API: {e}")
+        
+        return []
+    
+    def _iter_api_endpoint(self, video_id: str, code: Optional[str]) -> Iterator[ChatMessage]:
+        """
+        Читает историю из API потоково и отдает сообщения по мере разбора
+        
+        Первая страница не загружается в память целиком: сообщения начинают
+        поступать, как только найден массив chat/messages/items/data. Если
+        в ответе есть общее количество сообщений или курсор, остальные
+        страницы скачиваются параллельно (PageFetcher) и объединяются
+        без дубликатов.
+        """
         # Используем правильный API endpoint для получения данных события
         url = f"{self.BASE_URL}/api/event/{video_id}"
-        params = {}
+        params = {'offset': 0, 'limit': self.page_size}
         if code:
             params['key'] = code
         
-        try:
-            response = self.session.get(url, params=params, timeout=self.TIMEOUT)
-            if response.status_code == 200:
-                data = response.json()
-                # Извлекаем чат из данных события
-                if isinstance(data, dict) and 'chat' in data:
-                    return self._parse_chat_data(data['chat'])
-                # Если чат находится в другом месте структуры
-                elif isinstance(data, dict) and 'messages' in data:
-                    return self._parse_chat_data(data['messages'])
-                # Пробуем распарсить всю структуру
-                return self._parse_chat_data(data)
-        except Exception as e:
-            print(f"Ошибка при получении чата через API: {e}")
+        first_page = Page()
+        received = 0
+        seen = set()
         
-        return []
+        def first_items():
+            nonlocal received
+            # Следующие страницы ограничивает PageFetcher
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            for item in self._stream_api_page(url, params, first_page, collect=False, missing_ok=True):
+                received += 1
+                key = item_id(item)
+                if key is not None:
+                    seen.add(key)
+                yield item
+        
+        def pages():
+            # merge_pages дочитывает первую страницу до запроса следующих
+            yield first_items()
+            if first_page.total is None and not first_page.cursor:
+                # Без total и курсора нельзя отличить полную историю от первой страницы
+                return
+            fetcher = PageFetcher(
+                lambda offset=0, cursor=None: self._fetch_api_page(url, params, offset, cursor),
+                page_size=self.page_size,
+                max_workers=self.max_workers,
+                rate_limiter=self.rate_limiter,
+                key=item_id
+            )
+            yield from fetcher.fetch_remaining(received, first_page.total, first_page.cursor, seen)
+        
+        for item in merge_pages(pages(), key=item_id):
+            message = self._parse_chat_item(item)
+            if message:
+                yield message
+    
+    def _stream_api_page(self, url: str, params: Dict, page: Page,
+                         collect: bool = True, missing_ok: bool = False) -> Iterator[Any]:
+        """
+        Отдает элементы страницы по мере чтения ответа
+        
+        По окончании чтения page.total и page.cursor содержат сведения
+        о следующих страницах, а page.items (если collect) - элементы.
+        
+        Args:
+            missing_ok: Ответ не 200 - пустая страница, а не ошибка
+                (для первой страницы: у события может не быть API чата)
+        
+        Raises:
+            ChatDownloadError: Если сервер ответил не 200 и не missing_ok
+        """
+        with self.session.get(url, params=params, timeout=self.TIMEOUT, stream=True) as response:
+            if response.status_code != 200:
+                if missing_ok:
+                    return
+                # Пустая страница была бы принята за конец истории или оставила бы пропуск
+                raise ChatDownloadError(
+                    f"Не удалось получить страницу чата {params}: HTTP {response.status_code}"
+                )
+            if response.encoding is None:
+                response.encoding = 'utf-8'
+            
+            stream = JSONArrayStream(response.iter_content(self.STREAM_CHUNK_SIZE, decode_unicode=True))
+            for item in stream:
+                if collect:
+                    page.items.append(item)
+                yield item
+            page.total, page.cursor = pagination_info(stream.meta)
+    
+    def _fetch_api_page(self, url: str, params: Dict, offset: int = 0,
+                        cursor: Optional[str] = None) -> Page:
+        """Запрашивает одну из следующих страниц истории"""
+        page_params = dict(params)
+        if cursor:
+            page_params.pop('offset', None)
+            page_params['cursor'] = cursor
+        else:
+            page_params['offset'] = offset
+        
+        page = Page()
+        for _ in self._stream_api_page(url, page_params, page):
+            pass
+        return page
     
     def _try_html_endpoint(self, video_id: str, code: Optional[str]) -> List[ChatMessage]:
         """Пытается получить чат из HTML страницы"""
@@ -125,39 +270,9 @@ class ChatDownloader:
         
         if isinstance(data, list):
             for item in data:
-                if isinstance(item, dict):
-                    # Пытаемся извлечь данные из различных возможных полей
-                    timestamp = (item.get('timestamp') or 
-                               item.get('time') or 
-                               item.get('created_at') or 
-                               item.get('date') or '')
-                    
-                    username = (item.get('username') or 
-                              item.get('user') or 
-                              item.get('name') or 
-                              item.get('author') or 
-                              item.get('from') or 
-                              'Unknown')
-                    
-                    message_text = (item.get('message') or 
-                                  item.get('text') or 
-                                  item.get('content') or 
-                                  item.get('body') or '')
-                    
-                    user_id = (item.get('user_id') or 
-                             item.get('userId') or 
-                             item.get('uid') or 
-                             item.get('id'))
-                    
-                    # Создаем сообщение только если есть текст
-                    if message_text:
-                        message = ChatMessage(
-                            timestamp=str(timestamp),
-                            username=str(username),
-                            message=str(message_text),
-                            user_id=str(user_id) if user_id else None
-                        )
-                        messages.append(message)
+                message = self._parse_chat_item(item)
+                if message:
+                    messages.append(message)
         elif isinstance(data, dict):
             # Рекурсивно ищем массив сообщений в структуре
             if 'messages' in data:
@@ -171,126 +286,89 @@ class ChatDownloader:
         
         return messages
     
-    def save_chat_txt(self, messages: List[ChatMessage], output_path: str):
+    def _parse_chat_item(self, item: any) -> Optional[ChatMessage]:
+        """Преобразует один элемент ответа API в сообщение"""
+        if not isinstance(item, dict):
+            return None
+        
+        # Пытаемся извлечь данные из различных возможных полей
+        timestamp = (item.get('timestamp') or 
+                   item.get('time') or 
+                   item.get('created_at') or 
+                   item.get('date') or '')
+        
+        username = (item.get('username') or 
+                  item.get('user') or 
+                  item.get('name') or 
+                  item.get('author') or 
+                  item.get('from') or 
+                  'Unknown')
+        
+        message_text = (item.get('message') or 
+                      item.get('text') or 
+                      item.get('content') or 
+                      item.get('body') or '')
+        
+        user_id = (item.get('user_id') or 
+                 item.get('userId') or 
+                 item.get('uid') or 
+                 item.get('id'))
+        
+        # Создаем сообщение только если есть текст
+        if not message_text:
+            return None
+        
+        return ChatMessage(
+            timestamp=str(timestamp),
+            username=str(username),
+            message=str(message_text),
+            user_id=str(user_id) if user_id else None
+        )
+    
+    def save_chat_txt(self, messages: List[ChatMessage], output_path: str,
+                      compression: Optional[str] = None):
         """
         Сохраняет чат в текстовый файл
         
         Args:
             messages: Список сообщений
             output_path: Путь для сохранения
+            compression: None, 'gzip' или 'zstd'
         """
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write("="*60 + "\n")
-            f.write("Чат видео\n")
-            f.write(f"Сохранено: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"Всего сообщений: {len(messages)}\n")
-            f.write("="*60 + "\n\n")
-            
-            for msg in messages:
-                timestamp = msg.timestamp if msg.timestamp else "??:??:??"
-                f.write(f"[{timestamp}] {msg.username}: {msg.message}\n")
+        TxtChatExporter(output_path, compression=compression).export(messages)
     
-    def save_chat_json(self, messages: List[ChatMessage], output_path: str):
+    def save_chat_json(self, messages: List[ChatMessage], output_path: str,
+                       compression: Optional[str] = None):
         """
         Сохраняет чат в JSON файл
         
         Args:
             messages: Список сообщений
             output_path: Путь для сохранения
+            compression: None, 'gzip' или 'zstd'
+        """
+        JsonChatExporter(output_path, compression=compression).export(messages)
+    
+    def save_chat_jsonl(self, messages: List[ChatMessage], output_path: str,
+                        compression: Optional[str] = None):
+        """
+        Сохраняет чат в JSON Lines файл (одно сообщение на строку)
+        
+        Args:
+            messages: Список сообщений
+            output_path: Путь для сохранения
+            compression: None, 'gzip' или 'zstd'
         """
-        data = {
-            'saved_at': datetime.now().isoformat(),
-            'message_count': len(messages),
-            'messages': [
-                {
-                    'timestamp': msg.timestamp,
-                    'username': msg.username,
-                    'message': msg.message,
-                    'user_id': msg.user_id
-                }
-                for msg in messages
-            ]
-        }
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        JsonlChatExporter(output_path, compression=compression).export(messages)
     
-    def save_chat_html(self, messages: List[ChatMessage], output_path: str):
+    def save_chat_html(self, messages: List[ChatMessage], output_path: str,
+                       compression: Optional[str] = None):
         """
         Сохраняет чат в HTML файл
         
         Args:
             messages: Список сообщений
             output_path: Путь для сохранения
+            compression: None, 'gzip' или 'zstd'
         """
-        html = f"""<!DOCTYPE html>
-<html lang="ru">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Чат видео</title>
-    <style>
-        body {{
-            font-family: Arial, sans-serif;
-            max-width: 800px;
-            margin: 0 auto;
-            padding: 20px;
-            background-color: #f5f5f5;
-        }}
-        .header {{
-            background-color: #333;
-            color: white;
-            padding: 20px;
-            border-radius: 5px;
-            margin-bottom: 20px;
-        }}
-        .chat-container {{
-            background-color: white;
-            border-radius: 5px;
-            padding: 20px;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        }}
-        .message {{
-            padding: 10px;
-            margin-bottom: 10px;
-            border-left: 3px solid #4CAF50;
-            background-color: #f9f9f9;
-        }}
-        .timestamp {{
-            color: #666;
-            font-size: 0.9em;
-        }}
-        .username {{
-            font-weight: bold;
-            color: #333;
-        }}
-        .text {{
-            margin-top: 5px;
-            color: #444;
-        }}
-    </style>
-</head>
-<body>
-    <div class="header">
-        <h1>Чат видео</h1>
-        <p>Сохранено: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-        <p>Всего сообщений: {len(messages)}</p>
-    </div>
-    <div class="chat-container">
-"""
-        
-        for msg in messages:
-            timestamp = msg.timestamp if msg.timestamp else "??:??:??"
-            html += f"""        <div class="message">
-            <span class="timestamp">[{timestamp}]</span>
-            <span class="username">{msg.username}</span>
-            <div class="text">{msg.message}</div>
-        </div>
-"""
-        
-        html += """    </div>
-</body>
-</html>"""
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html)
+        HtmlChatExporter(output_path, compression=compression).export(messages)
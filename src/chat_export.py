@@ -0,0 +1,331 @@
+"""Потоковая запись чата в TXT, JSON, JSONL и HTML"""
+
+import io
+import gzip
+import json
+from html import escape
+from datetime import datetime
+from typing import IO, Iterable, Optional
+
+from .chat_message import ChatMessage
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+
+BUFFER_SIZE = 1024 * 1024
+
+# Один экземпляр кодировщика вместо разбора аргументов json.dumps на каждое сообщение
+_encode_json = json.JSONEncoder(ensure_ascii=False).encode
+
+COMPRESSION_SUFFIXES = {
+    'gzip': '.gz',
+    'zstd': '.zst',
+}
+
+
+class ChatExportError(Exception):
+    """Ошибка сохранения чата"""
+    pass
+
+
+def open_output(path: str, compression: Optional[str] = None,
+                buffer_size: int = BUFFER_SIZE) -> IO[str]:
+    """
+    Открывает буферизованный текстовый поток для записи с опциональным сжатием
+
+    Args:
+        path: Путь к файлу
+        compression: None, 'gzip' или 'zstd' (None - определяется по расширению)
+        buffer_size: Размер буфера записи в байтах
+
+    Returns:
+        Текстовый поток в UTF-8
+
+    Raises:
+        ChatExportError: Если сжатие не поддерживается
+    """
+    if compression is None:
+        for name, suffix in COMPRESSION_SUFFIXES.items():
+            if path.endswith(suffix):
+                compression = name
+                break
+
+    if compression is None:
+        return open(path, 'w', encoding='utf-8', buffering=buffer_size)
+
+    raw = open(path, 'wb')
+    try:
+        if compression == 'gzip':
+            compressed = _ClosingGzipFile(fileobj=raw, mode='wb', compresslevel=6)
+        elif compression == 'zstd':
+            if not ZSTD_AVAILABLE:
+                raise ChatExportError(
+                    "Сжатие zstd недоступно. Установите: pip install zstandard"
+                )
+            compressed = zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=True)
+        else:
+            raise ChatExportError(f"Неизвестный тип сжатия: {compression}")
+    except Exception:
+        raw.close()
+        raise
+
+    return io.TextIOWrapper(io.BufferedWriter(compressed, buffer_size), encoding='utf-8')
+
+
+class _ClosingGzipFile(gzip.GzipFile):
+    """GzipFile, закрывающий переданный fileobj вместе с собой"""
+
+    def close(self):
+        fileobj = self.fileobj
+        try:
+            super().close()
+        finally:
+            if fileobj is not None:
+                fileobj.close()
+
+
+class ChatExporter:
+    """
+    Базовый класс потокового экспорта
+
+    Сообщения записываются по одному, поэтому время экспорта линейно,
+    а память не зависит от размера чата. Если количество сообщений
+    заранее неизвестно (передан генератор), оно записывается в конце файла.
+    """
+
+    extension = ''
+
+    def __init__(self, output_path: str, title: str = "Чат видео",
+                 compression: Optional[str] = None):
+        """
+        Args:
+            output_path: Путь для сохранения
+            title: Заголовок документа
+            compression: None, 'gzip' или 'zstd'
+        """
+        self.output_path = output_path
+        self.title = title
+        self.compression = compression
+        self.saved_at = datetime.now()
+
+    def export(self, messages: Iterable[ChatMessage]) -> int:
+        """
+        Записывает сообщения в файл
+
+        Args:
+            messages: Сообщения чата (список или любой итератор)
+
+        Returns:
+            Количество записанных сообщений
+        """
+        total = len(messages) if hasattr(messages, '__len__') else None
+        count = 0
+
+        with open_output(self.output_path, self.compression) as f:
+            self.write_header(f, total)
+            for msg in messages:
+                self.write_message(f, msg, count)
+                count += 1
+            self.write_footer(f, count, total)
+
+        return count
+
+    def write_header(self, f: IO[str], total: Optional[int]):
+        """Записывает начало документа"""
+        pass
+
+    def write_message(self, f: IO[str], msg, index: int):
+        """Записывает одно сообщение"""
+        raise NotImplementedError
+
+    def write_footer(self, f: IO[str], count: int, total: Optional[int]):
+        """Записывает конец документа"""
+        pass
+
+
+class TxtChatExporter(ChatExporter):
+    """Текстовый формат для чтения"""
+
+    extension = 'txt'
+
+    def write_header(self, f, total):
+        f.write("=" * 60 + "\n")
+        f.write(f"{self.title}\n")
+        f.write(f"Сохранено: {self.saved_at.strftime('%Y-%m-%d %H:%M:%S')}\n")
+        if total is not None:
+            f.write(f"Всего сообщений: {total}\n")
+        f.write("=" * 60 + "\n\n")
+
+    def write_message(self, f, msg, index):
+        timestamp = msg.timestamp if msg.timestamp else "??:??:??"
+        f.write(f"[{timestamp}] {msg.username}: {msg.message}\n")
+
+    def write_footer(self, f, count, total):
+        if total is None:
+            f.write(f"\nВсего сообщений: {count}\n")
+
+
+class JsonChatExporter(ChatExporter):
+    """JSON документ {'saved_at', 'message_count', 'messages'}"""
+
+    extension = 'json'
+
+    def write_header(self, f, total):
+        f.write('{\n')
+        f.write(f'  "saved_at": {json.dumps(self.saved_at.isoformat())},\n')
+        if total is not None:
+            f.write(f'  "message_count": {total},\n')
+        f.write('  "messages": [')
+
+    def write_message(self, f, msg, index):
+        f.write(',\n    ' if index else '\n    ')
+        f.write(_encode_json(msg.to_dict()))
+
+    def write_footer(self, f, count, total):
+        f.write('\n  ]' if count else ']')
+        if total is None:
+            f.write(f',\n  "message_count": {count}')
+        f.write('\n}\n')
+
+
+class JsonlChatExporter(ChatExporter):
+    """JSON Lines: одно сообщение на строку"""
+
+    extension = 'jsonl'
+
+    def write_message(self, f, msg, index):
+        f.write(_encode_json(msg.to_dict()))
+        f.write('\n')
+
+
+class HtmlChatExporter(ChatExporter):
+    """HTML страница для просмотра в браузере"""
+
+    extension = 'html'
+
+    STYLE = """
+        body {
+            font-family: Arial, sans-serif;
+            max-width: 800px;
+            margin: 0 auto;
+            padding: 20px;
+            background-color: #f5f5f5;
+        }
+        .header {
+            background-color: #333;
+            color: white;
+            padding: 20px;
+            border-radius: 5px;
+            margin-bottom: 20px;
+        }
+        .chat-container {
+            background-color: white;
+            border-radius: 5px;
+            padding: 20px;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+        }
+        .message {
+            padding: 10px;
+            margin-bottom: 10px;
+            border-left: 3px solid #4CAF50;
+            background-color: #f9f9f9;
+        }
+        .timestamp {
+            color: #666;
+            font-size: 0.9em;
+        }
+        .username {
+            font-weight: bold;
+            color: #333;
+        }
+        .text {
+            margin-top: 5px;
+            color: #444;
+            white-space: pre-wrap;
+        }
+    """
+
+    def write_header(self, f, total):
+        title = escape(self.title)
+        f.write(f"""<!DOCTYPE html>
+<html lang="ru">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+    <style>{self.STYLE}</style>
+</head>
+<body>
+    <div class="header">
+        <h1>{title}</h1>
+        <p>Сохранено: {self.saved_at.strftime('%Y-%m-%d %H:%M:%S')}</p>
+""")
+        if total is not None:
+            f.write(f"        <p>Всего сообщений: {total}</p>\n")
+        f.write("""    </div>
+    <div class="chat-container">
+""")
+
+    def write_message(self, f, msg, index):
+        timestamp = escape(msg.timestamp) if msg.timestamp else "??:??:??"
+        f.write(f"""        <div class="message">
+            <span class="timestamp">[{timestamp}]</span>
+            <span class="username">{escape(msg.username)}</span>
+            <div class="text">{escape(msg.message)}</div>
+        </div>
+""")
+
+    def write_footer(self, f, count, total):
+        f.write("    </div>\n")
+        if total is None:
+            f.write(f'    <p class="timestamp">Всего сообщений: {count}</p>\n')
+        f.write("</body>\n</html>\n")
+
+
+EXPORTERS = {
+    exporter.extension: exporter
+    for exporter in (TxtChatExporter, JsonChatExporter, JsonlChatExporter, HtmlChatExporter)
+}
+
+
+def export_chat(messages: Iterable[ChatMessage], output_path: str, fmt: str,
+                title: str = "Чат видео", compression: Optional[str] = None) -> int:
+    """
+    Сохраняет чат в указанном формате
+
+    Args:
+        messages: Сообщения чата
+        output_path: Путь для сохранения
+        fmt: 'txt', 'json', 'jsonl' или 'html'
+        title: Заголовок документа
+        compression: None, 'gzip' или 'zstd'
+
+    Returns:
+        Количество записанных сообщений
+
+    Raises:
+        ChatExportError: Если формат не поддерживается
+    """
+    exporter_class = EXPORTERS.get(fmt)
+    if exporter_class is None:
+        raise ChatExportError(f"Неизвестный формат чата: {fmt}")
+    return exporter_class(output_path, title, compression).export(messages)
+
+
+def output_path_for(base_path: str, fmt: str, compression: Optional[str] = None) -> str:
+    """
+    Формирует имя файла чата с учетом формата и сжатия
+
+    Args:
+        base_path: Путь без расширения (например, 'video_chat')
+        fmt: Формат чата
+        compression: None, 'gzip' или 'zstd'
+    """
+    path = f"{base_path}.{fmt}"
+    if compression:
+        path += COMPRESSION_SUFFIXES[compression]
+    return path
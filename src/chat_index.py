@@ -0,0 +1,370 @@
+"""ChatIndex - полнотекстовый индекс архива чатов в SQLite (FTS5)"""
+
+import os
+import re
+import io
+import gzip
+import json
+import sqlite3
+import argparse
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional
+
+from .chat_message import ChatMessage
+from .json_stream import JSONArrayStream
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    event_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    username TEXT NOT NULL,
+    message TEXT NOT NULL,
+    user_id TEXT,
+    UNIQUE (event_id, timestamp, username, message)
+);
+CREATE INDEX IF NOT EXISTS idx_messages_event_time ON messages (event_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_messages_author ON messages (username, event_id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5 (
+    username, message,
+    content='messages', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts (rowid, username, message) VALUES (new.id, new.username, new.message);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, username, message)
+    VALUES ('delete', old.id, old.username, old.message);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_au AFTER UPDATE OF username, message ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, username, message)
+    VALUES ('delete', old.id, old.username, old.message);
+    INSERT INTO messages_fts (rowid, username, message) VALUES (new.id, new.username, new.message);
+END;
+
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    event_id TEXT NOT NULL,
+    message_count INTEGER NOT NULL
+);
+"""
+
+UPSERT_SQL = """
+INSERT INTO messages (event_id, timestamp, username, message, user_id)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (event_id, timestamp, username, message) DO UPDATE
+SET user_id = excluded.user_id
+WHERE messages.user_id IS NULL AND excluded.user_id IS NOT NULL
+"""
+
+READ_CHUNK_SIZE = 256 * 1024
+
+# Суффиксы имен файлов экспорта: <event_id>_chat.json, <event_id>_chat_live.jsonl
+EVENT_ID_PATTERN = re.compile(r'^(.+?)_chat(?:_live)?\.(?:json|jsonl)(?:\.gz|\.zst)?$')
+
+
+class ChatIndexError(Exception):
+    """Ошибка индексации чата"""
+    pass
+
+
+@dataclass
+class SearchHit:
+    """Результат поиска"""
+    event_id: str
+    timestamp: str
+    username: str
+    message: str
+    snippet: str
+
+
+class ChatIndex:
+    """
+    Индекс сообщений чатов по событию, автору и времени
+
+    Повторная загрузка того же чата не создает дубликатов: сообщение
+    однозначно определяется (event_id, timestamp, username, message).
+    """
+
+    BATCH_SIZE = 5000
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: Путь к файлу базы SQLite (создается при необходимости)
+        """
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        try:
+            self.connection.executescript(SCHEMA)
+        except sqlite3.OperationalError as e:
+            raise ChatIndexError(f"SQLite без поддержки FTS5 или UPSERT: {e}")
+
+    def close(self):
+        """Закрывает соединение"""
+        self.connection.close()
+
+    def __enter__(self) -> 'ChatIndex':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def ingest_messages(self, event_id: str, messages: Iterable[ChatMessage]) -> int:
+        """
+        Добавляет сообщения события в индекс (пачками, в одной транзакции)
+
+        Args:
+            event_id: Идентификатор события
+            messages: Сообщения (список или итератор)
+
+        Returns:
+            Количество новых сообщений
+        """
+        before = self.count(event_id)
+        batch = []
+
+        with self.connection:
+            for msg in messages:
+                batch.append((event_id, msg.timestamp or '', msg.username, msg.message, msg.user_id))
+                if len(batch) >= self.BATCH_SIZE:
+                    self.connection.executemany(UPSERT_SQL, batch)
+                    batch.clear()
+            if batch:
+                self.connection.executemany(UPSERT_SQL, batch)
+
+        return self.count(event_id) - before
+
+    def ingest_file(self, path: str, event_id: Optional[str] = None, force: bool = False) -> int:
+        """
+        Загружает файл экспорта чата (JSON или JSONL, в том числе .gz/.zst)
+
+        Неизмененные с прошлой загрузки файлы пропускаются.
+
+        Args:
+            path: Путь к файлу
+            event_id: Идентификатор события (по умолчанию - из имени файла)
+            force: Загрузить файл даже если он не изменился
+
+        Returns:
+            Количество новых сообщений
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        event_id = event_id or self.event_id_from_path(path)
+
+        if not force:
+            row = self.connection.execute(
+                'SELECT size, mtime FROM sources WHERE path = ?', (path,)
+            ).fetchone()
+            if row and row[0] == stat.st_size and row[1] == stat.st_mtime:
+                return 0
+
+        added = self.ingest_messages(event_id, read_export(path))
+
+        with self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO sources (path, size, mtime, event_id, message_count) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (path, stat.st_size, stat.st_mtime, event_id,
+                 self.count(event_id))
+            )
+        return added
+
+    def search(self, query: str, event_id: Optional[str] = None,
+               author: Optional[str] = None, since: Optional[str] = None,
+               until: Optional[str] = None, limit: int = 50) -> List[SearchHit]:
+        """
+        Ищет сообщения по тексту
+
+        Args:
+            query: Запрос FTS5 (слова, "фраза", префикс*, OR, NOT)
+            event_id: Ограничить событием
+            author: Ограничить автором (точное совпадение)
+            since: Время не раньше (сравнение строк timestamp)
+            until: Время не позже
+            limit: Максимальное количество результатов
+
+        Returns:
+            Список найденных сообщений, самые релевантные первыми
+        """
+        sql = [
+            "SELECT m.event_id, m.timestamp, m.username, m.message,",
+            "       snippet(messages_fts, 1, '[', ']', '…', 12)",
+            "FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid",
+            "WHERE messages_fts MATCH ?",
+        ]
+        params: list = [query]
+
+        for column, operator, value in (('m.event_id', '=', event_id), ('m.username', '=', author),
+                                        ('m.timestamp', '>=', since), ('m.timestamp', '<=', until)):
+            if value is not None:
+                sql.append(f"AND {column} {operator} ?")
+                params.append(value)
+
+        sql.append("ORDER BY rank LIMIT ?")
+        params.append(limit)
+
+        try:
+            rows = self.connection.execute('\n'.join(sql), params).fetchall()
+        except sqlite3.OperationalError as e:
+            raise ChatIndexError(f"Неверный поисковый запрос: {e}")
+
+        return [SearchHit(*row) for row in rows]
+
+    def count(self, event_id: Optional[str] = None) -> int:
+        """Количество сообщений в индексе (всего или для события)"""
+        if event_id is None:
+            return self.connection.execute('SELECT COUNT(*) FROM messages').fetchone()[0]
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM messages WHERE event_id = ?', (event_id,)
+        ).fetchone()[0]
+
+    @staticmethod
+    def event_id_from_path(path: str) -> str:
+        """Извлекает идентификатор события из имени файла экспорта"""
+        name = os.path.basename(path)
+        match = EVENT_ID_PATTERN.match(name)
+        if match:
+            return match.group(1)
+        return name.split('.', 1)[0]
+
+
+def _open_text(path: str) -> io.TextIOBase:
+    """Открывает файл экспорта для чтения с учетом сжатия"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if path.endswith('.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            raise ChatIndexError("Для .zst файлов установите: pip install zstandard")
+        raw = open(path, 'rb')
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw, closefd=True),
+                                encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+def read_export(path: str) -> Iterator[ChatMessage]:
+    """
+    Читает сообщения из файла экспорта
+
+    Args:
+        path: JSON (формат chat_export) или JSONL файл
+
+    Yields:
+        Сообщения чата
+    """
+    with _open_text(path) as f:
+        if '.jsonl' in os.path.basename(path):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield ChatMessage.from_dict(json.loads(line))
+            return
+
+        # Большие экспорты не загружаются целиком - читаем массив messages потоково
+        chunks = iter(lambda: f.read(READ_CHUNK_SIZE), '')
+        for item in JSONArrayStream(chunks, keys=('messages',)):
+            if isinstance(item, dict):
+                yield ChatMessage.from_dict(item)
+
+
+def _ingest_command(args) -> int:
+    with ChatIndex(args.db) as index:
+        total = 0
+
+        if args.event:
+            from .chat_downloader import ChatDownloader
+            print(f"Скачивание чата события {args.event}...")
+            if args.source == 'opendemo':
+                from .opendemo_chat import OpendemoChat
+                messages = OpendemoChat().extract_chat(args.event, args.code)
+            else:
+                messages = ChatDownloader().download_chat(args.event, args.code)
+            added = index.ingest_messages(args.event, messages)
+            print(f"✓ {args.event}: добавлено {added} из {len(messages)}")
+            total += added
+
+        for path in _expand_paths(args.paths):
+            try:
+                added = index.ingest_file(path, args.event_id, args.force)
+            except (OSError, ValueError, ChatIndexError) as e:
+                print(f"⚠ {path}: {e}")
+                continue
+            if added:
+                print(f"✓ {path}: добавлено {added}")
+            total += added
+
+        print(f"Всего добавлено: {total}, в индексе: {index.count()}")
+    return 0
+
+
+def _expand_paths(paths: List[str]) -> Iterator[str]:
+    """Раскрывает директории в список файлов экспорта чата"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if EVENT_ID_PATTERN.match(name):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def _search_command(args) -> int:
+    with ChatIndex(args.db) as index:
+        hits = index.search(' '.join(args.query), args.event, args.author,
+                            args.since, args.until, args.limit)
+
+    for hit in hits:
+        timestamp = hit.timestamp or '??:??'
+        print(f"{hit.event_id} [{timestamp}] {hit.username}: {hit.snippet}")
+
+    if not hits:
+        print("Ничего не найдено")
+    return 0 if hits else 1
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI: facecast-dl index {ingest,search}"""
+    parser = argparse.ArgumentParser(
+        prog='facecast-dl index',
+        description='Полнотекстовый индекс архива чатов (SQLite FTS5)'
+    )
+    parser.add_argument('--db', default='chat_index.db', help='Файл базы (по умолчанию: chat_index.db)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ingest = subparsers.add_parser('ingest', help='Добавить чаты в индекс')
+    ingest.add_argument('paths', nargs='*', help='Файлы *_chat.json / *_chat.jsonl или директории')
+    ingest.add_argument('--event-id', help='Идентификатор события для всех файлов (по умолчанию - из имени файла)')
+    ingest.add_argument('--event', help='Скачать чат события и добавить его напрямую')
+    ingest.add_argument('--code', help='Код доступа для --event')
+    ingest.add_argument('--source', choices=['api', 'opendemo'], default='api',
+                        help='Источник чата для --event (по умолчанию: api)')
+    ingest.add_argument('--force', action='store_true', help='Перечитать неизмененные файлы')
+
+    search = subparsers.add_parser('search', help='Найти сообщения')
+    search.add_argument('query', nargs='+', help='Запрос FTS5')
+    search.add_argument('--event', help='Только в этом событии')
+    search.add_argument('--author', help='Только этот автор')
+    search.add_argument('--since', help='Время не раньше')
+    search.add_argument('--until', help='Время не позже')
+    search.add_argument('-n', '--limit', type=int, default=50, help='Количество результатов')
+
+    args = parser.parse_args(argv)
+    try:
+        if args.command == 'ingest':
+            return _ingest_command(args)
+        return _search_command(args)
+    except ChatIndexError as e:
+        print(f"✗ {e}")
+        return 1
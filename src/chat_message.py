@@ -0,0 +1,74 @@
+"""ChatMessage - общая модель сообщения чата для всех источников"""
+
+import sys
+from typing import Any, Dict, Optional
+
+
+class ChatMessage:
+    """
+    Сообщение чата
+
+    Класс с __slots__ вместо dataclass: у экземпляров нет __dict__,
+    а имена авторов интернируются, поэтому миллионы сообщений одного
+    чата занимают в несколько раз меньше памяти.
+    """
+
+    __slots__ = ('timestamp', 'username', 'message', 'user_id')
+
+    # Ключи словарей, которые возвращал OpendemoChat до появления ChatMessage
+    LEGACY_KEYS = {
+        'time': 'timestamp',
+        'author': 'username',
+        'text': 'message',
+    }
+
+    def __init__(self, timestamp: str, username: str, message: str,
+                 user_id: Optional[str] = None):
+        self.timestamp = timestamp
+        self.username = sys.intern(username)
+        self.message = message
+        self.user_id = user_id
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ChatMessage':
+        """
+        Создает сообщение из словаря экспорта (JSON/JSONL)
+
+        Понимает как текущие ключи (timestamp, username, message),
+        так и старые ключи OpendemoChat (time, author, text).
+        """
+        user_id = data.get('user_id')
+        return cls(
+            timestamp=str(data.get('timestamp', data.get('time')) or ''),
+            username=str(data.get('username', data.get('author')) or 'Unknown'),
+            message=str(data.get('message', data.get('text')) or ''),
+            user_id=str(user_id) if user_id else None
+        )
+
+    def to_dict(self) -> Dict[str, Optional[str]]:
+        """Преобразует сообщение в словарь для JSON"""
+        return {
+            'timestamp': self.timestamp,
+            'username': self.username,
+            'message': self.message,
+            'user_id': self.user_id
+        }
+
+    def __getitem__(self, key: str):
+        """Доступ по ключу для совместимости с msg['time'], msg['author'], msg['text']"""
+        name = self.LEGACY_KEYS.get(key, key)
+        if name not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, name)
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.timestamp, self.username, self.message, self.user_id) == \
+               (other.timestamp, other.username, other.message, other.user_id)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return (f"ChatMessage(timestamp={self.timestamp!r}, username={self.username!r}, "
+                f"message={self.message!r}, user_id={self.user_id!r})")
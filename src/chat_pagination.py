@@ -0,0 +1,310 @@
+"""PageFetcher - параллельное чтение постраничной истории чата"""
+
+import time
+import threading
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+if TYPE_CHECKING:
+    import requests
+
+
+@dataclass
+class Page:
+    """Одна страница истории: элементы и сведения о следующих страницах"""
+    items: List[Any] = field(default_factory=list)
+    total: Optional[int] = None
+    cursor: Optional[str] = None
+
+
+# Поля ответа с общим количеством элементов и курсором следующей страницы
+TOTAL_KEYS = ('total', 'count', 'total_count')
+CURSOR_KEYS = ('next_cursor', 'cursor', 'next')
+
+
+class RateLimiter:
+    """
+    Ограничитель частоты запросов (token bucket), общий для всех потоков
+
+    Допускает всплеск до burst запросов подряд, в среднем - не больше
+    rate запросов в секунду.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        """
+        Args:
+            rate: Запросов в секунду
+            burst: Размер всплеска (по умолчанию - max(1, rate))
+
+        Raises:
+            ValueError: Если rate не положителен
+        """
+        if rate <= 0:
+            raise ValueError("Частота запросов должна быть положительной")
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1, int(rate)))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Блокирует поток, пока не станет доступен очередной запрос"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class PageFetcher:
+    """
+    Скачивает все страницы истории, начиная с первой
+
+    По первой странице определяется способ пагинации:
+    - известно общее количество - остальные страницы скачиваются
+      параллельно по смещению;
+    - есть курсор - страницы читаются по цепочке курсоров;
+    - страница заполнена целиком - страницы скачиваются пачками
+      по max_workers, пока не встретится неполная.
+
+    Если задан key, чтение по курсору и до неполной страницы
+    останавливается на первой странице без новых идентификаторов:
+    так сервер, который не понимает параметры пагинации и повторяет
+    одну и ту же страницу, не получает max_pages запросов.
+
+    Больше max_pages страниц после первой не скачивается: если история
+    на этом обрезана, выводится предупреждение.
+
+    Все запросы проходят через общий RateLimiter, если он задан.
+    """
+
+    DEFAULT_WORKERS = 4
+    MAX_PAGES = 1000
+
+    def __init__(self, fetch_page: Callable[..., Page], page_size: int,
+                 max_workers: int = DEFAULT_WORKERS,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 key: Optional[Callable[[Any], Optional[Hashable]]] = None,
+                 max_pages: int = MAX_PAGES):
+        """
+        Args:
+            fetch_page: Функция fetch_page(offset=..., cursor=...) -> Page
+            page_size: Количество элементов на полной странице
+            max_workers: Количество параллельных запросов
+            rate_limiter: Общий ограничитель частоты запросов
+            key: Идентификатор элемента (None - элемент не проверяется на повтор)
+            max_pages: Максимум страниц после первой
+        """
+        self._fetch_page = fetch_page
+        self.page_size = page_size
+        self.max_workers = max(1, max_workers)
+        self.rate_limiter = rate_limiter
+        self.key = key
+        self.max_pages = max(1, max_pages)
+
+    def fetch(self, first_page: Optional[Page] = None) -> List[List[Any]]:
+        """
+        Скачивает историю
+
+        Args:
+            first_page: Уже полученная первая страница (иначе запрашивается)
+
+        Returns:
+            Элементы страниц в порядке истории (по списку на страницу)
+        """
+        if first_page is None:
+            first_page = self.fetch_page(offset=0)
+        seen: Set[Hashable] = set()
+        self._add_keys(first_page.items, seen)
+        pages = [first_page.items]
+        pages.extend(self.fetch_remaining(len(first_page.items), first_page.total, first_page.cursor, seen))
+        return pages
+
+    def fetch_remaining(self, received: int, total: Optional[int] = None,
+                        cursor: Optional[str] = None,
+                        seen: Optional[Set[Hashable]] = None) -> List[List[Any]]:
+        """
+        Скачивает страницы после первой
+
+        Args:
+            received: Количество элементов на первой странице
+            total: Общее количество элементов, если известно
+            cursor: Курсор следующей страницы, если есть
+            seen: Идентификаторы элементов первой страницы (дополняется)
+
+        Returns:
+            Элементы следующих страниц в порядке истории
+        """
+        seen = set() if seen is None else seen
+        if total is not None and total > received:
+            if received == 0:
+                return []
+            offsets = list(range(received, total, self.page_size))
+            if len(offsets) > self.max_pages:
+                self._warn_truncated()
+                offsets = offsets[:self.max_pages]
+            return self._fetch_offsets(offsets)
+        if cursor:
+            return self._follow_cursor(cursor, seen)
+        if received >= self.page_size:
+            return self._fetch_until_short(received, seen)
+        return []
+
+    def fetch_page(self, offset: int = 0, cursor: Optional[str] = None) -> Page:
+        """Запрашивает одну страницу с учетом ограничения частоты"""
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        return self._fetch_page(offset=offset, cursor=cursor)
+
+    def _fetch_offsets(self, offsets: List[int]) -> List[List[Any]]:
+        """Параллельно скачивает страницы по известным смещениям"""
+        if len(offsets) == 1 or self.max_workers == 1:
+            return [self.fetch_page(offset=offset).items for offset in offsets]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return [page.items for page in executor.map(lambda offset: self.fetch_page(offset=offset), offsets)]
+
+    def _follow_cursor(self, cursor: str, seen: Set[Hashable]) -> List[List[Any]]:
+        """Последовательно читает страницы по цепочке курсоров"""
+        pages = []
+        seen_cursors = set()
+
+        while cursor and cursor not in seen_cursors:
+            if len(pages) >= self.max_pages:
+                self._warn_truncated()
+                break
+            seen_cursors.add(cursor)
+            page = self.fetch_page(cursor=cursor)
+            if not page.items or not self._add_keys(page.items, seen):
+                break
+            pages.append(page.items)
+            cursor = page.cursor
+
+        return pages
+
+    def _fetch_until_short(self, start: int, seen: Set[Hashable]) -> List[List[Any]]:
+        """
+        Скачивает страницы пачками по max_workers, пока не встретится
+        неполная страница или страница без новых элементов
+        """
+        pages = []
+        offset = start
+
+        while len(pages) < self.max_pages:
+            count = min(self.max_workers, self.max_pages - len(pages))
+            offsets = [offset + i * self.page_size for i in range(count)]
+            for items in self._fetch_offsets(offsets):
+                if not items or not self._add_keys(items, seen):
+                    return pages
+                pages.append(items)
+                if len(items) < self.page_size:
+                    return pages
+            offset = offsets[-1] + self.page_size
+
+        self._warn_truncated()
+        return pages
+
+    def _warn_truncated(self):
+        """Сообщает, что история обрезана ограничением max_pages"""
+        print(f"⚠ История чата обрезана: скачано {self.max_pages} страниц после первой "
+              f"(по {self.page_size} сообщений), остальные пропущены")
+
+    def _add_keys(self, items: List[Any], seen: Set[Hashable]) -> bool:
+        """
+        Добавляет идентификаторы элементов страницы в seen
+
+        Returns:
+            False, если все идентификаторы уже встречались; True - если есть
+            новые или идентификаторов нет (повтор не определить)
+        """
+        if self.key is None:
+            return True
+        keys = [key for key in map(self.key, items) if key is not None]
+        if not keys:
+            return True
+        new = any(key not in seen for key in keys)
+        seen.update(keys)
+        return new
+
+
+def item_id(item: Any) -> Optional[str]:
+    """Идентификатор элемента (поле id) для дедупликации страниц"""
+    if isinstance(item, dict) and item.get('id') is not None:
+        return str(item['id'])
+    return None
+
+
+def make_session(max_workers: int, headers: Dict[str, str]) -> 'requests.Session':
+    """
+    Создает сессию с пулом соединений на max_workers параллельных запросов
+
+    Args:
+        max_workers: Количество параллельных запросов страниц
+        headers: Заголовки всех запросов сессии
+
+    Returns:
+        Настроенная requests.Session
+    """
+    import requests
+
+    session = requests.Session()
+    session.headers.update(headers)
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=max_workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def merge_pages(pages: Iterable[List[Any]],
+                key: Callable[[Any], Optional[Hashable]]) -> Iterator[Any]:
+    """
+    Объединяет страницы в порядке истории, убирая дубликаты
+
+    Страницы по смещению могут пересекаться, если за время скачивания
+    в чат добавились сообщения.
+
+    Args:
+        pages: Элементы страниц
+        key: Идентификатор элемента (None - элемент не проверяется на дубликаты)
+
+    Yields:
+        Элементы без повторов
+    """
+    seen = set()
+    for items in pages:
+        for item in items:
+            item_key = key(item)
+            if item_key is not None:
+                if item_key in seen:
+                    continue
+                seen.add(item_key)
+            yield item
+
+
+def pagination_info(data: Dict[str, Any]) -> Tuple[Optional[int], Optional[str]]:
+    """
+    Находит в ответе общее количество элементов и курсор следующей страницы
+
+    Returns:
+        (total или None, курсор или None)
+    """
+    total = None
+    for key in TOTAL_KEYS:
+        value = data.get(key)
+        if isinstance(value, int) and not isinstance(value, bool) or \
+                (isinstance(value, str) and value.isdigit()):
+            total = int(value)
+            break
+
+    cursor = None
+    for key in CURSOR_KEYS:
+        if data.get(key):
+            cursor = str(data[key])
+            break
+
+    return (total, cursor)
@@ -0,0 +1,153 @@
+"""ChatTextParser - разбор текста сообщений виджета HyperComments"""
+
+import re
+from collections import OrderedDict
+from typing import Iterable, Iterator, List, Optional
+
+from .chat_message import ChatMessage
+
+
+# Время (HH:MM) и автор ("Имя Фамилия (Компания)") в начале строки - одним проходом
+HEADER_PATTERN = re.compile(
+    r'(\d{1,2}:\d{2})?'
+    r'([А-ЯЁA-Z][а-яёa-z]+(?:\s+[А-ЯЁA-Z][а-яёa-z]+)*(?:\s*\([^)]+\))?)?'
+)
+
+MODERATOR_PREFIX = 'Модератор'
+
+# Реакции, которые виджет дописывает в конец текста сообщения
+TRAILING_EMOJI = '👍👎❤️🤩🔥😍👋😋😆🥰🤣🤔🤯😱🤬😢😈🤷‍♂️💯🎉💔🤝🏆🗿'
+
+MIN_TEXT_LENGTH = 4
+
+
+class SeenHashes:
+    """
+    Множество хешей уже обработанных строк
+
+    Хранит только хеши, а не сами строки, поэтому память на дедупликацию
+    не зависит от длины сообщений.
+    """
+
+    def __init__(self):
+        self._hashes = set()
+
+    def add(self, raw: str) -> bool:
+        """
+        Запоминает строку
+
+        Returns:
+            True если строка встретилась впервые
+        """
+        key = hash(raw)
+        if key in self._hashes:
+            return False
+        self._hashes.add(key)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+
+class BoundedSeenHashes(SeenHashes):
+    """
+    LRU хешей ограниченного размера для многочасовых трансляций
+
+    Повторно встреченный хеш становится самым свежим, а при переполнении
+    вытесняется самый давний - память остается постоянной.
+    """
+
+    DEFAULT_MAX_SIZE = 100_000
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE):
+        """
+        Args:
+            max_size: Максимальное количество хранимых хешей
+        """
+        self.max_size = max_size
+        self._hashes = OrderedDict()
+
+    def add(self, raw: str) -> bool:
+        key = hash(raw)
+        if key in self._hashes:
+            self._hashes.move_to_end(key)
+            return False
+        self._hashes[key] = None
+        if len(self._hashes) > self.max_size:
+            self._hashes.popitem(last=False)
+        return True
+
+
+class ChatTextParser:
+    """
+    Разбирает сырой текст сообщений виджета в ChatMessage
+
+    Формат строки: "15:00Антон Середкин (Базис)МодераторТекст сообщения👍".
+    Дубликаты отбрасываются между вызовами parse_batch, поэтому один
+    экземпляр можно использовать для нескольких порций одного чата.
+    """
+
+    def __init__(self, seen: Optional[SeenHashes] = None):
+        """
+        Args:
+            seen: Хранилище хешей для дедупликации (по умолчанию - неограниченное)
+        """
+        self.seen = seen if seen is not None else SeenHashes()
+
+    def parse_one(self, raw: str) -> Optional[ChatMessage]:
+        """
+        Разбирает одну строку без проверки на дубликаты
+
+        Returns:
+            ChatMessage или None если в строке нет текста сообщения
+        """
+        header = HEADER_PATTERN.match(raw)
+        time_str, author = header.groups()
+        text = raw[header.end():]
+
+        if author:
+            text = text.strip()
+        else:
+            author = "Unknown"
+
+        if text.startswith(MODERATOR_PREFIX):
+            text = text[len(MODERATOR_PREFIX):].lstrip()
+
+        text = text.rstrip(TRAILING_EMOJI).strip()
+
+        if len(text) < MIN_TEXT_LENGTH:
+            return None
+
+        return ChatMessage(timestamp=time_str or "", username=author, message=text)
+
+    def iter_parse(self, raw_messages: Iterable[str]) -> Iterator[ChatMessage]:
+        """
+        Разбирает строки по мере поступления, пропуская дубликаты
+
+        Args:
+            raw_messages: Сырые строки сообщений
+
+        Yields:
+            Новые сообщения
+        """
+        seen_add = self.seen.add
+        parse_one = self.parse_one
+
+        for raw in raw_messages:
+            if not seen_add(raw):
+                continue
+            message = parse_one(raw)
+            if message is not None:
+                yield message
+
+    def parse_batch(self, raw_messages: Iterable[str]) -> List[ChatMessage]:
+        """
+        Разбирает порцию строк
+
+        Args:
+            raw_messages: Сырые строки сообщений
+
+        Returns:
+            Список новых сообщений в исходном порядке
+        """
+        return list(self.iter_parse(raw_messages))
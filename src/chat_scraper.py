@@ -2,28 +2,20 @@
 
 import time
 from typing import List, Optional
-from dataclasses import dataclass
 
 try:
-    from selenium import webdriver
     from selenium.webdriver.common.by import By
     from selenium.webdriver.support.ui import WebDriverWait
     from selenium.webdriver.support import expected_conditions as EC
-    from selenium.webdriver.chrome.options import Options
-    from selenium.webdriver.chrome.service import Service
     from selenium.common.exceptions import TimeoutException, NoSuchElementException
     SELENIUM_AVAILABLE = True
 except ImportError:
     SELENIUM_AVAILABLE = False
 
-
-@dataclass
-class ChatMessage:
-    """Сообщение чата"""
-    timestamp: str
-    username: str
-    message: str
-    user_id: Optional[str] = None
+from .browser_profile import ChatBrowserProfile
+from .chat_message import ChatMessage
+from .live_chat import LiveChatRecorder
+from .hooks import DownloadHooks
 
 
 class ChatScraperError(Exception):
@@ -34,10 +26,11 @@ class ChatScraperError(Exception):
 class ChatScraper:
     """Извлекает чат используя Selenium"""
     
-    def __init__(self, headless: bool = True):
+    def __init__(self, headless: bool = True, lightweight: bool = True):
         """
         Args:
             headless: Запускать браузер в фоновом режиме
+            lightweight: Не загружать видео, картинки и шрифты (только чат)
         """
         if not SELENIUM_AVAILABLE:
             raise ChatScraperError(
@@ -45,6 +38,7 @@ class ChatScraper:
             )
         
         self.headless = headless
+        self.lightweight = lightweight
     
     def scrape_chat(self, video_id: str, code: Optional[str] = None, timeout: int = 15) -> List[ChatMessage]:
         """
@@ -70,18 +64,9 @@ class ChatScraper:
         
         driver = None
         try:
-            # Настройка Chrome
-            options = Options()
-            if self.headless:
-                options.add_argument('--headless')
-            options.add_argument('--no-sandbox')
-            options.add_argument('--disable-dev-shm-usage')
-            options.add_argument('--disable-gpu')
-            options.add_argument('--window-size=1920,1080')
-            options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
-            
-            # Создаем драйвер
-            driver = webdriver.Chrome(options=options)
+            # Настройка Chrome и создание драйвера
+            profile = ChatBrowserProfile(self.headless, self.lightweight)
+            driver = profile.create_driver()
             driver.get(url)
             
             print("Ожидание загрузки виджета чата...")
@@ -140,6 +125,46 @@ class ChatScraper:
                 driver.quit()
                 print("Браузер закрыт")
     
+    def record_live(self, video_id: str, code: Optional[str], output_path: str,
+                    duration: Optional[float] = None, timeout: int = 15,
+                    hooks: Optional[DownloadHooks] = None) -> int:
+        """
+        Записывает чат идущей трансляции в JSONL по мере появления сообщений
+        
+        Args:
+            video_id: ID видео
+            code: Код доступа (опционально)
+            output_path: JSONL файл для записи (дописывается)
+            duration: Длительность записи в секундах (None - до Ctrl+C)
+            timeout: Таймаут ожидания виджета чата (секунды)
+            hooks: Обратные вызовы (on_chat_messages)
+            
+        Returns:
+            Количество записанных сообщений
+            
+        Raises:
+            ChatScraperError: Если виджет чата не загрузился
+        """
+        url = f"https://facecast.net/w/{video_id}"
+        if code:
+            url += f"?key={code}"
+        
+        print(f"Запись чата трансляции: {url}")
+        
+        driver = None
+        try:
+            driver = ChatBrowserProfile(self.headless, self.lightweight).create_driver()
+            driver.get(url)
+            WebDriverWait(driver, timeout).until(
+                EC.presence_of_element_located((By.ID, "hypercomments_widget"))
+            )
+            return LiveChatRecorder(output_path, hooks=hooks).record(driver, duration)
+        except TimeoutException:
+            raise ChatScraperError("Виджет чата не загрузился за отведенное время")
+        finally:
+            if driver:
+                driver.quit()
+    
     def _extract_messages(self, driver) -> List[ChatMessage]:
         """Извлекает сообщения используя основные селекторы HyperComments"""
         messages = []
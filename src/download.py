@@ -2,18 +2,42 @@
 
 import sys
 import argparse
-import requests
+import importlib
+from typing import Optional, Sequence
 
+# Здесь только легкие модули. Тяжелые зависимости (requests, bs4, selenium,
+# http.server) импортируются на этапах, которым они нужны, поэтому --help,
+# подкоманды и ошибка в URL не тратят на них время запуска
+# (см. python -m benchmarks.startup)
 from .url_parser import URLParser, URLParseError
-from .metadata import VideoMetadataExtractor, MetadataExtractionError
-from .m3u8_parser import M3U8Parser, M3U8ParseError
-from .downloader import VideoDownloader, DownloadError
+from .events import EventHooks, EventStreamError, open_emitter
+from .hooks import DownloadHooks, HookList, as_hook_list, hooked_get
+from .timing import StageTimer, RunProfiler, format_timings
+from .download_result import DownloadResult
 from .file_manager import FileManager
-from .chat_downloader import ChatDownloader, ChatDownloadError
+from .tuning import TuningProfile, TuningError, host_of
+
+
+# Параллельных запросов страниц истории чата по умолчанию - то же, что
+# PageFetcher.DEFAULT_WORKERS; chat_pagination (и concurrent.futures) здесь
+# не импортируется ради одной константы
+CHAT_WORKERS = 4
+
+
+# Подкоманды: имя -> (модуль с функцией main(argv), описание)
+SUBCOMMANDS = {
+    'index': ('.chat_index', 'индекс архива чатов: ingest / search'),
+    'verify': ('.ts_verify', 'проверка целостности MPEG-TS и перекачка поврежденных сегментов'),
+    'tune': ('.tuning', 'подбор количества потоков для хоста CDN события'),
+}
 
 
 def main():
     """Главная функция CLI"""
+    if len(sys.argv) > 1 and sys.argv[1] in SUBCOMMANDS:
+        module = importlib.import_module(SUBCOMMANDS[sys.argv[1]][0], __package__)
+        sys.exit(module.main(sys.argv[2:]))
+    
     parser = argparse.ArgumentParser(
         description='Скачивание видео с facecast.net и opendemo.ru',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -24,7 +48,9 @@ def main():
   %(prog)s https://opendemo.ru/live?id=zfvfh8&code=1 -o ./videos
   %(prog)s https://opendemo.ru/live?id=zfvfh8&code=1 -o ./videos -f video.mp4
   %(prog)s https://opendemo.ru/live?id=zfvfh8&code=1 -w 10  # 10 параллельных потоков
-        """
+
+Подкоманды (%(prog)s <подкоманда> --help):
+""" + "\n".join(f"  {name:8} {description}" for name, (_, description) in SUBCOMMANDS.items())
     )
     
     parser.add_argument(
@@ -46,8 +72,68 @@ def main():
     parser.add_argument(
         '-w', '--workers',
         type=int,
-        default=5,
-        help='Количество параллельных потоков для скачивания (по умолчанию: 5)'
+        help='Количество параллельных потоков для скачивания (по умолчанию: из профиля `tune` для хоста CDN, иначе 5)'
+    )
+    
+    parser.add_argument(
+        '--remux',
+        action='store_true',
+        help='Перепаковывать MPEG-TS в MP4 во время скачивания (требует ffmpeg)'
+    )
+    
+    parser.add_argument(
+        '--cache-dir',
+        help='Директория локального кэша сегментов (общего для всех запусков)'
+    )
+    
+    parser.add_argument(
+        '--cache-size',
+        default='20G',
+        help='Максимальный размер кэша сегментов, например 500M или 50G (по умолчанию: 20G)'
+    )
+    
+    parser.add_argument(
+        '--cache-ignore-param',
+        action='append',
+        default=[],
+        metavar='NAME',
+        help='Параметр URL сегмента, не влияющий на содержимое (токен CDN), - не учитывается в ключе кэша; можно указать несколько раз'
+    )
+    
+    parser.add_argument(
+        '--preallocate',
+        action='store_true',
+        help='Узнать размеры сегментов HEAD запросами, выделить место под файл заранее и писать сегменты сразу на свои места'
+    )
+    
+    parser.add_argument(
+        '--progress',
+        choices=['human', 'json'],
+        default='human',
+        help='Формат прогресса: human - для человека, json - события JSON lines в stdout (остальной вывод уходит в stderr)'
+    )
+    
+    parser.add_argument(
+        '--progress-fd',
+        type=int,
+        help='Писать события JSON lines в открытый файловый дескриптор'
+    )
+    
+    parser.add_argument(
+        '--progress-socket',
+        help='Писать события JSON lines в Unix сокет по указанному пути'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        metavar='PATH',
+        help='Профилировать запуск (cProfile, все потоки): PATH - профиль pstats, PATH.txt - текстовый отчет'
+    )
+    
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        help='Отдавать метрики в формате Prometheus на http://127.0.0.1:PORT/metrics'
     )
     
     parser.add_argument(
@@ -58,22 +144,124 @@ def main():
     
     parser.add_argument(
         '--chat-format',
-        choices=['txt', 'json', 'html', 'all'],
+        choices=['txt', 'json', 'jsonl', 'html', 'all'],
         default='txt',
         help='Формат сохранения чата (по умолчанию: txt)'
     )
     
+    parser.add_argument(
+        '--chat-compress',
+        choices=['gzip', 'zstd'],
+        help='Сжимать файлы чата (zstd требует пакет zstandard)'
+    )
+    
+    parser.add_argument(
+        '--chat-workers',
+        type=int,
+        default=CHAT_WORKERS,
+        help=f'Количество параллельных запросов страниц истории чата (по умолчанию: {CHAT_WORKERS})'
+    )
+    
+    parser.add_argument(
+        '--chat-rate-limit',
+        type=float,
+        help='Максимум запросов истории чата в секунду (по умолчанию: без ограничения)'
+    )
+    
+    parser.add_argument(
+        '--chat-tz',
+        metavar='TZ',
+        help='Часовой пояс времени сообщений чата для привязки к видео: Europe/Moscow, UTC или +03:00 (по умолчанию: локальный пояс системы)'
+    )
+    
     parser.add_argument(
         '--chat-only',
         action='store_true',
         help='Скачать только чат без видео (для отладки)'
     )
     
+    parser.add_argument(
+        '--live-chat',
+        action='store_true',
+        help='Записывать чат идущей трансляции в JSONL до Ctrl+C (требует Selenium, включает --chat-only)'
+    )
+    
+    parser.add_argument(
+        '--live-chat-duration',
+        type=float,
+        help='Длительность записи чата трансляции в секундах (по умолчанию: до Ctrl+C)'
+    )
+    
     args = parser.parse_args()
     
+    if args.chat_tz:
+        from .chat_alignment import parse_timezone, ChatAlignmentError
+        try:
+            parse_timezone(args.chat_tz)
+        except ChatAlignmentError as e:
+            parser.error(str(e))
+    
+    try:
+        events = open_emitter(args.progress == 'json', args.progress_fd, args.progress_socket)
+    except EventStreamError as e:
+        parser.error(str(e))
+    if args.progress == 'json':
+        # stdout занят событиями - человекочитаемый вывод уходит в stderr
+        sys.stdout = sys.stderr
+    
+    hooks = []
+    if events.enabled:
+        hooks.append(EventHooks(events))
+    
+    if args.metrics_port is not None:
+        from .metrics import MetricsServer, MetricsHooks, MetricsError
+        try:
+            metrics_server = MetricsServer(args.metrics_port)
+            metrics_server.start()
+            print(f"✓ Метрики: http://{metrics_server.host}:{metrics_server.port}/metrics")
+            hooks.append(MetricsHooks())
+        except MetricsError as e:
+            parser.error(str(e))
+    
+    profiler = None
+    if args.profile:
+        profiler = RunProfiler()
+        profiler.start()
+    
     # Запускаем процесс скачивания
     try:
-        result = download_video(args.url, args.output_dir, args.filename, args.workers, args.save_chat, args.chat_format, args.chat_only)
+        result = download_video(
+            args.url,
+            output_dir=args.output_dir,
+            filename=args.filename,
+            workers=args.workers,
+            save_chat=args.save_chat,
+            chat_format=args.chat_format,
+            chat_only=args.chat_only or args.live_chat,
+            chat_compress=args.chat_compress,
+            live_chat=args.live_chat,
+            live_chat_duration=args.live_chat_duration,
+            chat_workers=args.chat_workers,
+            chat_rate_limit=args.chat_rate_limit,
+            remux=args.remux,
+            cache_dir=args.cache_dir,
+            cache_size=args.cache_size,
+            preallocate=args.preallocate,
+            hooks=hooks,
+            chat_tz=args.chat_tz,
+            cache_ignore_params=args.cache_ignore_param,
+        )
+        
+        events.emit('result', success=result.success, output_path=result.output_path,
+                    error=result.error_message,
+                    timings=[timing.to_dict() for timing in result.timings or []])
+        events.close()
+        
+        if result.timings:
+            print(f"\n{format_timings(result.timings)}")
+        if profiler:
+            profiler.stop()
+            print(f"✓ Профиль: {args.profile}, отчет: {profiler.save(args.profile)}")
         
         if result.success:
             print(f"\n{'='*60}")
@@ -88,16 +276,18 @@ def main():
             sys.exit(1)
             
     except KeyboardInterrupt:
+        events.emit('result', success=False, output_path=None, error='interrupted')
         print("\n\nСкачивание прервано пользователем")
         sys.exit(1)
     except Exception as e:
+        events.emit('result', success=False, output_path=None, error=str(e))
         print(f"\n{'='*60}")
         print(f"✗ Неожиданная ошибка: {e}")
         print(f"{'='*60}")
         sys.exit(1)
 
 
-def download_video(url: str, output_dir: str = '.', filename: str = None, workers: int = 5, save_chat: bool = False, chat_format: str = 'txt', chat_only: bool = False):
+def download_video(url: str, output_dir: str = '.', filename: str = None, workers: Optional[int] = None, save_chat: bool = False, chat_format: str = 'txt', chat_only: bool = False, chat_compress: str = None, live_chat: bool = False, live_chat_duration: float = None, chat_workers: int = CHAT_WORKERS, chat_rate_limit: float = None, remux: bool = False, cache_dir: str = None, cache_size: str = '20G', preallocate: bool = False, hooks: Optional[Sequence[DownloadHooks]] = None, chat_tz: Optional[str] = None, cache_ignore_params: Sequence[str] = ()):
     """
     Скачивает видео с facecast.net
     
@@ -105,22 +295,69 @@ def download_video(url: str, output_dir: str = '.', filename: str = None, worker
         url: URL видео
         output_dir: Директория для сохранения
         filename: Имя файла (опционально)
-        workers: Количество параллельных потоков
+        workers: Количество параллельных потоков (None - из профиля подбора для хоста
+            CDN сегментов, см. `facecast-dl tune`, иначе VideoDownloader.DEFAULT_WORKERS)
         save_chat: Сохранить чат
         chat_format: Формат чата
         chat_only: Скачать только чат без видео
+        chat_compress: Сжатие файлов чата ('gzip', 'zstd' или None)
+        live_chat: Записывать чат идущей трансляции по мере появления сообщений
+        live_chat_duration: Длительность записи чата трансляции (секунды)
+        chat_workers: Количество параллельных запросов страниц истории чата
+        chat_rate_limit: Максимум запросов истории чата в секунду
+        remux: Перепаковывать HLS поток в MP4 через ffmpeg во время скачивания
+        cache_dir: Директория кэша сегментов (None - без кэша)
+        cache_size: Максимальный размер кэша ("20G", "500M" или число байт)
+        preallocate: Узнать размеры сегментов заранее и писать их сразу на свои места
+        hooks: Обратные вызовы этапов, запросов и сегментов (см. DownloadHooks)
+        chat_tz: Часовой пояс времени сообщений чата (Europe/Moscow, UTC, +03:00;
+            None - локальный пояс системы), см. ChatAlignment
+        cache_ignore_params: Параметры URL сегмента, не учитываемые в ключе кэша
+            (кроме известных подписей CDN, см. SegmentCache)
         
     Returns:
-        DownloadResult
+        DownloadResult (timings - время по этапам)
     """
-    from .downloader import DownloadResult
+    hooks = as_hook_list(hooks)
+    timer = StageTimer()
+    try:
+        result = _download_video(
+            url, output_dir=output_dir, filename=filename, workers=workers,
+            save_chat=save_chat, chat_format=chat_format, chat_only=chat_only,
+            chat_compress=chat_compress, live_chat=live_chat, live_chat_duration=live_chat_duration,
+            chat_workers=chat_workers, chat_rate_limit=chat_rate_limit, remux=remux,
+            cache_dir=cache_dir, cache_size=cache_size, preallocate=preallocate,
+            hooks=hooks, timer=timer, chat_tz=chat_tz, cache_ignore_params=cache_ignore_params,
+        )
+    finally:
+        timer.stop()
+    result.timings = timer.stages
+    return result
+
+
+def _tuned_workers(segment_url: str) -> int:
+    """Количество потоков из профиля подбора для хоста CDN сегментов"""
+    from .downloader import VideoDownloader
     
+    try:
+        workers = TuningProfile.load().workers_for(segment_url)
+    except TuningError as e:
+        print(f"⚠ {e}")
+        workers = None
+    if workers:
+        print(f"✓ Потоков: {workers} (профиль подбора для {host_of(segment_url)})")
+        return workers
+    return VideoDownloader.DEFAULT_WORKERS
+
+
+def _download_video(url: str, output_dir: str, filename: str, workers: Optional[int], save_chat: bool, chat_format: str, chat_only: bool, chat_compress: str, live_chat: bool, live_chat_duration: float, chat_workers: int, chat_rate_limit: float, remux: bool, cache_dir: str, cache_size: str, preallocate: bool, hooks: HookList, timer: StageTimer, chat_tz: Optional[str], cache_ignore_params: Sequence[str]):
+    """Этапы download_video; переход между этапами отмечается в timer"""
     print("="*60)
     print("Facecast Video Downloader")
     print("="*60)
     
     # Шаг 1: Парсинг URL
-    print("\n[1/5] Парсинг URL...")
+    _stage(hooks, timer, 1, 5, 'url', "Парсинг URL...")
     try:
         url_parser = URLParser()
         video_id, code = url_parser.parse(url)
@@ -135,10 +372,12 @@ def download_video(url: str, output_dir: str = '.', filename: str = None, worker
         )
     
     # Шаг 2: Получение метаданных видео
-    extractor = VideoMetadataExtractor()
+    from .metadata import VideoMetadataExtractor, MetadataExtractionError
+    
+    extractor = VideoMetadataExtractor(hooks)
     
     if chat_only:
-        print("\n[2/5] Режим только чата - пропуск получения видеопотока")
+        _stage(hooks, timer, 2, 5, 'metadata', "Режим только чата - пропуск получения видеопотока", skipped=True)
         # Получаем только event_id для чата
         event_id = extractor.get_event_id(video_id, code)
         if event_id:
@@ -147,7 +386,7 @@ def download_video(url: str, output_dir: str = '.', filename: str = None, worker
             print(f"⚠ Event ID не найден, используем Video ID: {video_id}")
             event_id = video_id
     else:
-        print("\n[2/5] Получение метаданных видео...")
+        _stage(hooks, timer, 2, 5, 'metadata', "Получение метаданных видео...")
         try:
             video_info = extractor.extract_stream_url(video_id, code)
             print(f"✓ Найден видеопоток: {video_info.stream_type}")
@@ -161,7 +400,7 @@ def download_video(url: str, output_dir: str = '.', filename: str = None, worker
     
     # Шаг 3: Подготовка выходного файла
     if chat_only:
-        print("\n[3/5] Режим только чата - пропуск подготовки видеофайла")
+        _stage(hooks, timer, 3, 5, 'output', "Режим только чата - пропуск подготовки видеофайла", skipped=True)
         # Создаем путь для чата
         if filename:
             base_name = filename.rsplit('.', 1)[0] if '.' in filename else filename
@@ -171,7 +410,7 @@ def download_video(url: str, output_dir: str = '.', filename: str = None, worker
         FileManager.ensure_directory(output_dir)
         print(f"✓ Чат будет сохранен: {output_path}.{chat_format}")
     else:
-        print("\n[3/5] Подготовка выходного файла...")
+        _stage(hooks, timer, 3, 5, 'output', "Подготовка выходного файла...")
         try:
             if filename:
                 output_path = FileManager.get_absolute_path(
@@ -191,19 +430,37 @@ def download_video(url: str, output_dir: str = '.', filename: str = None, worker
             )
     
     # Шаг 4: Обработка видеопотока
+    segments = None
+    bandwidth = None
     if chat_only:
-        print("\n[4/5] Режим только чата - пропуск")
-        print("\n[5/5] Режим только чата - пропуск")
+        _stage(hooks, timer, 4, 5, 'playlist', "Режим только чата - пропуск", skipped=True)
+        _stage(hooks, timer, 5, 5, 'download', "Режим только чата - пропуск", skipped=True)
         # Создаем фиктивный результат для продолжения к скачиванию чата
         result = DownloadResult(success=True, output_path=output_path, error_message=None)
     else:
-        downloader = VideoDownloader(max_workers=workers)
+        import requests
+        from .downloader import VideoDownloader
+        from .m3u8_parser import M3U8Parser, M3U8ParseError
+        from .output_sink import FFmpegSink, create_sink
+        from .segment_sizes import SizeProbe
+        from .segment_validator import SegmentValidator
+        from .segment_cache import SegmentCache, SegmentCacheError, parse_size
+        
+        cache = None
+        if cache_dir:
+            try:
+                cache = SegmentCache(cache_dir, max_size=parse_size(cache_size), volatile_params=cache_ignore_params)
+                print(f"✓ Кэш сегментов: {cache_dir}")
+            except (SegmentCacheError, ValueError) as e:
+                print(f"⚠ Кэш сегментов отключен: {e}")
+        downloader = VideoDownloader(max_workers=workers or VideoDownloader.DEFAULT_WORKERS,
+                                     cache=cache, hooks=hooks, timer=timer)
     
         if video_info.stream_type == 'm3u8':
-            print("\n[4/5] Парсинг M3U8 плейлиста...")
+            _stage(hooks, timer, 4, 5, 'playlist', "Парсинг M3U8 плейлиста...")
             try:
                 # Загружаем M3U8 плейлист
-                response = requests.get(video_info.stream_url, timeout=30)
+                response = hooked_get(downloader.session, video_info.stream_url, hooks, 'playlist', timeout=30)
                 response.raise_for_status()
                 m3u8_content = response.text
                 
@@ -212,14 +469,14 @@ def download_video(url: str, output_dir: str = '.', filename: str = None, worker
                 # Проверяем, является ли это master playlist
                 if parser.is_master_playlist(m3u8_content):
                     print("  Обнаружен master playlist, выбираем лучшее качество...")
-                    best_quality_url = parser.select_best_quality(m3u8_content)
+                    best_quality_url, bandwidth = parser.select_best_variant(m3u8_content)
                     
                     # Преобразуем в абсолютный URL если нужно
                     from urllib.parse import urljoin
                     best_quality_url = urljoin(video_info.stream_url, best_quality_url)
                     
                     # Загружаем плейлист с лучшим качеством
-                    response = requests.get(best_quality_url, timeout=30)
+                    response = hooked_get(downloader.session, best_quality_url, hooks, 'playlist', timeout=30)
                     response.raise_for_status()
                     m3u8_content = response.text
                     base_url = best_quality_url
@@ -227,8 +484,24 @@ def download_video(url: str, output_dir: str = '.', filename: str = None, worker
                     base_url = video_info.stream_url
                 
                 # Парсим сегменты
-                segment_urls = parser.parse(m3u8_content, base_url)
+                segments = parser.parse_segments(m3u8_content, base_url)
+                segment_urls = [segment.url for segment in segments]
+                if parser.is_live(m3u8_content):
+                    # Плейлист читается один раз: из скользящего окна получилась бы
+                    # молча обрезанная запись
+                    return DownloadResult(
+                        success=False,
+                        output_path=None,
+                        error_message="Трансляция еще идет: в плейлисте нет #EXT-X-ENDLIST, "
+                                      "а старые сегменты уходят из его окна. Запись живого потока "
+                                      "не поддерживается - скачайте видео после окончания трансляции "
+                                      "(чат трансляции записывает --live-chat)"
+                    )
                 print(f"✓ Найдено сегментов: {len(segment_urls)}")
+                if any(segment.encrypted for segment in segments):
+                    # Зашифрованные сегменты проверяются только по длине и контрольной сумме
+                    print("  ⚠ Сегменты зашифрованы (#EXT-X-KEY) - проверка формата отключена")
+                    downloader.validator = SegmentValidator(check_format=False)
                 
             except M3U8ParseError as e:
                 return DownloadResult(
@@ -243,21 +516,55 @@ def download_video(url: str, output_dir: str = '.', filename: str = None, worker
                     error_message=f"Ошибка загрузки плейлиста: {e}"
                 )
             
+            if workers is None and segment_urls:
+                downloader.set_max_workers(_tuned_workers(segment_urls[0]))
+            
             # Шаг 5: Скачивание сегментов
-            print("\n[5/5] Скачивание видео...")
-            result = downloader.download_segments(segment_urls, output_path)
+            _stage(hooks, timer, 5, 5, 'download', "Скачивание видео...")
+            if remux and not FFmpegSink.is_available():
+                print("⚠ ffmpeg не найден - видео будет сохранено как склейка MPEG-TS")
+                remux = False
+            elif remux:
+                print("  Перепаковка в MP4 через ffmpeg во время скачивания")
+            sizes = estimated_size = None
+            if preallocate and not remux:
+                sizes = SizeProbe(downloader.session).probe(segment_urls)
+                if sizes:
+                    print(f"  Размер видео: {sum(sizes) / 1024 ** 2:.1f} МБ - сегменты пишутся сразу на свои места")
+                else:
+                    # Без точных размеров pwrite невозможен - место выделяется по оценке
+                    estimated_size = SizeProbe.estimate_total(segments, bandwidth)
+                    if estimated_size:
+                        print(f"  ⚠ Сервер не сообщает размеры сегментов, оценка: {estimated_size / 1024 ** 2:.1f} МБ")
+            sink = create_sink(output_path, remux, sizes, estimated_size)
+            result = downloader.download_segments(segment_urls, output_path, sink)
             
         else:
             # Прямая ссылка
-            print("\n[4/5] Пропуск (прямая ссылка)")
-            print("\n[5/5] Скачивание видео...")
+            _stage(hooks, timer, 4, 5, 'playlist', "Пропуск (прямая ссылка)", skipped=True)
+            _stage(hooks, timer, 5, 5, 'download', "Скачивание видео...")
             result = downloader.download_direct(video_info.stream_url, output_path)
     
     # Шаг 6: Сохранение чата (если запрошено или chat_only режим)
     if (save_chat or chat_only) and result.success:
-        print("\n[6/6] Сохранение чата...")
+        _stage(hooks, timer, 6, 6, 'chat', "Сохранение чата...")
         try:
-            chat_downloader = ChatDownloader()
+            if live_chat:
+                import os
+                chat_path = f"{os.path.splitext(output_path)[0]}_chat_live.jsonl"
+                if 'opendemo.ru' in url:
+                    from .opendemo_chat import OpendemoChat
+                    OpendemoChat().record_live(video_id, code, chat_path, live_chat_duration, hooks=hooks)
+                else:
+                    from .chat_scraper import ChatScraper
+                    ChatScraper().record_live(video_id, code, chat_path, live_chat_duration, hooks=hooks)
+                return result
+            
+            from .chat_downloader import ChatDownloader
+            from .chat_export import export_chat, output_path_for
+            from .chat_alignment import ChatAlignment, ChatAlignmentError, parse_timezone
+            
+            chat_downloader = ChatDownloader(max_workers=chat_workers, rate_limit=chat_rate_limit, hooks=hooks)
             # Получаем event_id из extractor или через API
             event_id = extractor.event_id if hasattr(extractor, 'event_id') and extractor.event_id else extractor.get_event_id(video_id, code)
             
@@ -278,14 +585,18 @@ def download_video(url: str, output_dir: str = '.', filename: str = None, worker
                     formats = [chat_format]
                 
                 for fmt in formats:
-                    chat_path = f"{base_name}_chat.{fmt}"
-                    if fmt == 'txt':
-                        chat_downloader.save_chat_txt(messages, chat_path)
-                    elif fmt == 'json':
-                        chat_downloader.save_chat_json(messages, chat_path)
-                    elif fmt == 'html':
-                        chat_downloader.save_chat_html(messages, chat_path)
+                    chat_path = output_path_for(f"{base_name}_chat", fmt, chat_compress)
+                    export_chat(messages, chat_path, fmt, compression=chat_compress)
                     print(f"✓ Чат сохранен: {chat_path} ({len(messages)} сообщений)")
+                
+                if segments:
+                    align_path = f"{base_name}_chat_align.json"
+                    try:
+                        alignment = ChatAlignment(segments, chat_tz=parse_timezone(chat_tz) if chat_tz else None)
+                        aligned = alignment.save(messages, align_path)
+                        print(f"✓ Привязка чата к видео: {align_path} ({aligned}/{len(messages)} сообщений)")
+                    except ChatAlignmentError as e:
+                        print(f"⚠ Привязка чата к видео не построена: {e}")
             else:
                 print("⚠ Чат недоступен или пуст")
                 print("  Возможные причины:")
@@ -298,5 +609,13 @@ def download_video(url: str, output_dir: str = '.', filename: str = None, worker
     return result
 
 
+def _stage(hooks: DownloadHooks, timer: StageTimer, step: int, total: int, name: str, title: str,
+           skipped: bool = False):
+    """Печатает заголовок этапа, начинает его замер и отправляет событие перехода"""
+    timer.start(name)
+    print(f"\n[{step}/{total}] {title}")
+    hooks.on_stage(name, step, total, title, skipped)
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,15 @@
+"""DownloadResult - результат скачивания"""
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+from .timing import StageTiming
+
+
+@dataclass
+class DownloadResult:
+    """Результат скачивания"""
+    success: bool
+    output_path: Optional[str]
+    error_message: Optional[str]
+    timings: Optional[List[StageTiming]] = None  # время по этапам (download_video)
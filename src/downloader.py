@@ -2,21 +2,22 @@
 
 import os
 import time
+import sqlite3
 import requests
-from typing import List, Optional
-from dataclasses import dataclass
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterable, List, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 import threading
 
 from .progress import ProgressTracker
-
-
-@dataclass
-class DownloadResult:
-    """Результат скачивания"""
-    success: bool
-    output_path: Optional[str]
-    error_message: Optional[str]
+from .output_sink import OutputSink, OrderedFileSink, PositionalFileSink, OutputSinkError
+from .segment_journal import SegmentJournal
+from .segment_validator import SegmentValidator, SegmentValidationError
+from .segment_cache import SegmentCache, SegmentCacheError
+from .segment_sizes import SizeProbe
+from .hooks import DownloadHooks, as_hook_list, hooked_get
+from .timing import StageTimer
+# DownloadResult вынесен в легкий модуль, чтобы CLI не загружал requests раньше времени
+from .download_result import DownloadResult
 
 
 class DownloadError(Exception):
@@ -31,22 +32,64 @@ class VideoDownloader:
     RETRY_DELAY = 1  # секунды
     TIMEOUT = 30
     DEFAULT_WORKERS = 5
+    DIRECT_CHUNK_SIZE = 1024 * 1024
+    # Задач в работе и в очереди пула на один поток
+    QUEUED_PER_WORKER = 2
+    # Сколько байт может ждать в приемнике более ранние сегменты
+    MAX_PENDING_BYTES = 64 * 1024 * 1024
     
-    def __init__(self, max_workers: int = DEFAULT_WORKERS):
+    def __init__(self, max_workers: int = DEFAULT_WORKERS,
+                 validator: Optional[SegmentValidator] = None,
+                 cache: Optional[SegmentCache] = None,
+                 hooks: Union[DownloadHooks, Iterable[DownloadHooks], None] = None,
+                 timer: Optional[StageTimer] = None):
+        """
+        Args:
+            max_workers: Количество параллельных потоков
+            validator: Проверка сегментов после скачивания (по умолчанию - SegmentValidator())
+            cache: Локальный кэш сегментов (проверяется до обращения к сети)
+            hooks: Обратные вызовы (запросы, повторы, запись сегментов) - см. DownloadHooks
+            timer: Замер этапов - завершение записи отмечается как этап 'merge'
+        """
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
-        self.max_workers = max_workers
+        self.set_max_workers(max_workers)
+        self.validator = validator if validator is not None else SegmentValidator()
+        self.validation_failures = 0
+        self.cache = cache
+        self.hooks = as_hook_list(hooks)
+        self.timer = timer
         self.progress_lock = threading.Lock()
     
-    def download_segments(self, segment_urls: List[str], output_path: str) -> DownloadResult:
+    def set_max_workers(self, max_workers: int):
+        """Задает количество потоков (до начала скачивания) и размер пула соединений"""
+        self.max_workers = max_workers
+        # Пул соединений рассчитан и на параллельные HEAD запросы SizeProbe
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(max_workers, SizeProbe.DEFAULT_WORKERS))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+    
+    def download_segments(self, segment_urls: List[str], output_path: str,
+                          sink: Optional[OutputSink] = None) -> DownloadResult:
         """
         Скачивает все сегменты параллельно и объединяет их в один файл
         
+        Сегменты передаются в приемник по мере скачивания. OrderedFileSink
+        держит в памяти только те, что пришли раньше предыдущих;
+        PositionalFileSink (размеры известны заранее) пишет каждый сразу
+        на его место в файле.
+        
+        Задачи ставятся в пул по мере освобождения потоков (не больше
+        max_workers * QUEUED_PER_WORKER сразу), а пока в приемнике ждут
+        MAX_PENDING_BYTES и больше, новые не ставятся. Поэтому память не
+        зависит от длины видео, даже если ранний сегмент задерживается.
+        
         Args:
             segment_urls: Список URL сегментов
             output_path: Путь для сохранения результата
+            sink: Приемник сегментов (по умолчанию - OrderedFileSink(output_path))
             
         Returns:
             DownloadResult с информацией о результате
@@ -58,55 +101,88 @@ class VideoDownloader:
                 error_message="Список сегментов пуст"
             )
         
+        if sink is None:
+            sink = OrderedFileSink(output_path)
+        
         print(f"\nНайдено сегментов: {len(segment_urls)}")
         print(f"Параллельных потоков: {self.max_workers}")
-        progress = ProgressTracker(len(segment_urls), "Скачивание сегментов")
+        total_bytes = sink.total_size if isinstance(sink, PositionalFileSink) else None
+        progress = ProgressTracker(len(segment_urls), "Скачивание сегментов", total_bytes)
+        self.hooks.on_download_start(len(segment_urls), total_bytes, self.max_workers, output_path)
         
-        # Словарь для хранения скачанных сегментов с их индексами
-        segments_data = {}
         error_message = None
         
         try:
+            sink.open()
+            progress.start()
+            
             # Скачиваем сегменты параллельно
+            queue_limit = self.max_workers * self.QUEUED_PER_WORKER
             with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                # Создаем задачи для скачивания
-                future_to_index = {
-                    executor.submit(self.download_segment, url): i 
-                    for i, url in enumerate(segment_urls)
-                }
+                pending = {}  # задача -> номер сегмента
+                next_index = 0
                 
-                # Обрабатываем завершенные задачи
-                for future in as_completed(future_to_index):
-                    index = future_to_index[future]
-                    try:
-                        segment_data = future.result()
-                        segments_data[index] = segment_data
-                        
-                        with self.progress_lock:
+                while not error_message:
+                    # Добавляем задачи; хотя бы одна выполняется всегда, иначе буфер не освободится
+                    while next_index < len(segment_urls) and (not pending or (
+                            len(pending) < queue_limit and sink.pending_bytes < self.MAX_PENDING_BYTES)):
+                        future = executor.submit(self._download_counted, segment_urls[next_index], progress)
+                        pending[future] = next_index
+                        next_index += 1
+                    if not pending:
+                        break
+                    
+                    # Обрабатываем завершенные задачи
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        index = pending.pop(future)
+                        try:
+                            # Приемник сам выстраивает сегменты по порядку
+                            data, latency = future.result()
+                            sink.write(index, data)
                             progress.update()
+                            self.hooks.on_segment_written(index, len(data), latency)
                             
-                    except DownloadError as e:
-                        error_message = f"Не удалось скачать сегмент {index+1}/{len(segment_urls)}: {e}"
-                        # Отменяем оставшиеся задачи
-                        for f in future_to_index:
-                            f.cancel()
-                        break
+                        except DownloadError as e:
+                            error_message = f"Не удалось скачать сегмент {index+1}/{len(segment_urls)}: {e}"
+                            self.hooks.on_segment_failed(index, e)
+                            break
+                        except OutputSinkError as e:
+                            error_message = f"Ошибка записи видео: {e}"
+                            break
+                
+                if error_message:
+                    # Отменяем оставшиеся задачи
+                    for future in pending:
+                        future.cancel()
+            
+            progress.stop()
             
             if error_message:
+                sink.abort()
+                self.hooks.on_download_end(False, error_message)
                 return DownloadResult(
                     success=False,
                     output_path=None,
                     error_message=error_message
                 )
             
-            # Записываем сегменты в правильном порядке
-            print("\nОбъединение сегментов...")
-            with open(output_path, 'wb') as output_file:
-                for i in range(len(segment_urls)):
-                    if i in segments_data:
-                        output_file.write(segments_data[i])
+            if self.cache and self.cache.hits:
+                print(f"\n✓ Сегментов из кэша: {self.cache.hits}/{len(segment_urls)}")
+            if self.validation_failures:
+                print(f"\n⚠ Повторно запрошено сегментов после ошибок проверки: {self.validation_failures}")
+            
+            print("\nЗавершение записи...")
+            if self.timer:
+                self.timer.start('merge')
+            sink.close()
+            
+            if sink.RAW_OUTPUT:
+                journal = SegmentJournal.from_sizes(segment_urls, sink.segment_sizes)
+                journal.save(SegmentJournal.path_for(output_path))
             
             progress.complete(f"Видео успешно сохранено: {output_path}")
+            self.hooks.on_download_end(True, None)
             
             return DownloadResult(
                 success=True,
@@ -114,17 +190,28 @@ class VideoDownloader:
                 error_message=None
             )
             
-        except IOError as e:
+        except (OutputSinkError, IOError) as e:
+            progress.stop()
+            sink.abort()
+            self.hooks.on_download_end(False, f"Ошибка записи файла: {e}")
             return DownloadResult(
                 success=False,
                 output_path=None,
                 error_message=f"Ошибка записи файла: {e}"
             )
+        except BaseException as e:
+            progress.stop()
+            sink.abort()
+            self.hooks.on_download_end(False, str(e) or type(e).__name__)
+            raise
     
     def download_segment(self, url: str, retry_count: int = RETRY_COUNT) -> bytes:
         """
         Скачивает один сегмент с повторными попытками
         
+        Каждый ответ проверяется validator; не прошедший проверку сегмент
+        запрашивается повторно без паузы.
+        
         Args:
             url: URL сегмента
             retry_count: Количество попыток
@@ -135,16 +222,35 @@ class VideoDownloader:
         Raises:
             DownloadError: Если не удалось скачать после всех попыток
         """
+        if self.cache:
+            data = self._read_cache(url)
+            if data is not None:
+                self.hooks.on_cache_hit(url, len(data))
+                return data
+        
         last_error = None
         
         for attempt in range(retry_count):
             try:
-                response = self.session.get(url, timeout=self.TIMEOUT)
+                response = hooked_get(self.session, url, self.hooks, 'segment', timeout=self.TIMEOUT)
                 response.raise_for_status()
-                return response.content
+                data = response.content
+                self.validator.validate(data, response.headers)
+                if self.cache:
+                    self._write_cache(url, data)
+                return data
+                
+            except SegmentValidationError as e:
+                # Обрезанный ответ или страница ошибки - сразу запрашиваем сегмент заново
+                last_error = e
+                with self.progress_lock:
+                    self.validation_failures += 1
+                self.hooks.on_retry(url, attempt + 1, 'validation', e)
+                continue
                 
             except requests.RequestException as e:
                 last_error = e
+                self.hooks.on_retry(url, attempt + 1, 'http', e)
                 if attempt < retry_count - 1:
                     time.sleep(self.RETRY_DELAY * (attempt + 1))
                 continue
@@ -153,6 +259,38 @@ class VideoDownloader:
             f"Не удалось скачать сегмент после {retry_count} попыток: {last_error}"
         )
     
+    def _download_counted(self, url: str, progress: ProgressTracker) -> Tuple[bytes, float]:
+        """
+        Скачивает сегмент и учитывает его байты в счетчике своего потока
+        
+        Returns:
+            (данные сегмента, время получения вместе с повторами в секундах)
+        """
+        started = time.monotonic()
+        data = self.download_segment(url)
+        progress.update(nbytes=len(data), count=0)
+        return data, time.monotonic() - started
+    
+    def _read_cache(self, url: str) -> Optional[bytes]:
+        """Сегмент из кэша, если он есть и проходит проверку формата"""
+        try:
+            data = self.cache.get(url)
+            if data is not None:
+                self.validator.validate(data)
+            return data
+        except SegmentValidationError:
+            return None
+        except (SegmentCacheError, OSError, sqlite3.Error):
+            # Кэш - только ускорение, его ошибки не прерывают скачивание
+            return None
+    
+    def _write_cache(self, url: str, data: bytes):
+        """Сохраняет скачанный сегмент в кэш"""
+        try:
+            self.cache.put(url, data)
+        except (SegmentCacheError, OSError, sqlite3.Error):
+            pass
+    
     def download_direct(self, url: str, output_path: str) -> DownloadResult:
         """
         Скачивает видео по прямой ссылке
@@ -172,18 +310,13 @@ class VideoDownloader:
             
             total_size = int(response.headers.get('content-length', 0))
             
-            with open(output_path, 'wb') as f:
-                if total_size > 0:
-                    downloaded = 0
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-                            downloaded += len(chunk)
-                            percentage = (downloaded / total_size) * 100
-                            print(f"\rПрогресс: {percentage:.1f}%", end='')
-                    print()
-                else:
-                    f.write(response.content)
+            with open(output_path, 'wb') as f, \
+                    ProgressTracker(1, "Прогресс", total_size or None) as progress:
+                for chunk in response.iter_content(chunk_size=self.DIRECT_CHUNK_SIZE):
+                    if chunk:
+                        f.write(chunk)
+                        progress.update(nbytes=len(chunk), count=0)
+                progress.update()
             
             print(f"✓ Видео успешно сохранено: {output_path}")
             
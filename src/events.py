@@ -0,0 +1,152 @@
+"""EventEmitter - машиночитаемый поток событий скачивания (JSON lines)"""
+
+import os
+import sys
+import json
+import time
+import socket
+import threading
+from typing import Optional, TextIO
+
+from .hooks import DownloadHooks
+
+
+class EventStreamError(Exception):
+    """Ошибка открытия потока событий"""
+    pass
+
+
+class EventEmitter:
+    """
+    Получатель событий по умолчанию - ничего не делает
+
+    События скачивания приходят через EventHooks; итоговое событие
+    'result' CLI отправляет сам.
+    """
+
+    enabled = False
+
+    def emit(self, event: str, **fields):
+        """
+        Отправляет событие
+
+        Args:
+            event: Тип события ('stage', 'segment', 'retry', 'result', ...)
+            **fields: Поля события (должны сериализоваться в JSON)
+        """
+        pass
+
+    def close(self):
+        """Закрывает поток событий"""
+        pass
+
+
+class JSONLinesEmitter(EventEmitter):
+    """
+    Пишет каждое событие отдельной строкой JSON
+
+    Формат строки: {"ts": <unix time>, "event": "<тип>", ...поля}.
+    Если читатель отключился (закрыт pipe или сокет), события молча
+    перестают отправляться - скачивание из-за этого не прерывается.
+    """
+
+    enabled = True
+
+    def __init__(self, stream: TextIO, owned: bool = False):
+        """
+        Args:
+            stream: Текстовый поток для записи
+            owned: Закрывать поток в close()
+        """
+        self.stream = stream
+        self.owned = owned
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, **fields):
+        if not self.enabled:
+            return
+        record = {'ts': round(time.time(), 3), 'event': event}
+        record.update(fields)
+        line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+        with self._lock:
+            try:
+                self.stream.write(line)
+                self.stream.flush()
+            except (OSError, ValueError):
+                self.enabled = False
+
+    def close(self):
+        self.enabled = False
+        if self.owned:
+            try:
+                self.stream.close()
+            except OSError:
+                pass
+
+
+NULL_EMITTER = EventEmitter()
+
+
+class EventHooks(DownloadHooks):
+    """Переводит обратные вызовы скачивания в события потока"""
+
+    def __init__(self, emitter: EventEmitter):
+        """
+        Args:
+            emitter: Куда отправлять события
+        """
+        self.emitter = emitter
+
+    def on_stage(self, name, step, total, title, skipped):
+        self.emitter.emit('stage', step=step, total=total, name=name, title=title, skipped=skipped)
+
+    def on_download_start(self, segments, total_bytes, workers, output_path):
+        self.emitter.emit('download_start', segments=segments, total_bytes=total_bytes,
+                          workers=workers, output_path=output_path)
+
+    def on_retry(self, url, attempt, reason, error):
+        self.emitter.emit('retry', url=url, attempt=attempt, reason=reason, error=str(error))
+
+    def on_segment_written(self, index, nbytes, latency):
+        self.emitter.emit('segment', index=index, bytes=nbytes, latency=round(latency, 3))
+
+    def on_segment_failed(self, index, error):
+        self.emitter.emit('segment_failed', index=index, error=str(error))
+
+
+def open_emitter(stdout: bool = False, fd: Optional[int] = None,
+                 socket_path: Optional[str] = None) -> EventEmitter:
+    """
+    Открывает поток событий по параметрам командной строки
+
+    Args:
+        stdout: Писать события в stdout (--progress json)
+        fd: Номер открытого файлового дескриптора (--progress-fd)
+        socket_path: Путь к Unix сокету (--progress-socket)
+
+    Returns:
+        JSONLinesEmitter или NULL_EMITTER, если поток не запрошен
+
+    Raises:
+        EventStreamError: Если дескриптор или сокет недоступны
+    """
+    if fd is not None:
+        try:
+            return JSONLinesEmitter(os.fdopen(fd, 'w', encoding='utf-8', buffering=1), owned=True)
+        except OSError as e:
+            raise EventStreamError(f"Дескриптор {fd} недоступен: {e}")
+
+    if socket_path:
+        if not hasattr(socket, 'AF_UNIX'):
+            raise EventStreamError("Unix сокеты не поддерживаются в этой системе")
+        try:
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.connect(socket_path)
+        except OSError as e:
+            raise EventStreamError(f"Не удалось подключиться к {socket_path}: {e}")
+        return JSONLinesEmitter(connection.makefile('w', encoding='utf-8'), owned=True)
+
+    if stdout:
+        return JSONLinesEmitter(sys.stdout)
+
+    return NULL_EMITTER
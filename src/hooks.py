@@ -0,0 +1,172 @@
+"""DownloadHooks - обратные вызовы для встраивания загрузчика в сервисы"""
+
+import time
+from typing import TYPE_CHECKING, Iterable, Optional
+
+if TYPE_CHECKING:
+    import requests
+
+
+class DownloadHooks:
+    """
+    Набор обратных вызовов скачивания; все методы по умолчанию пустые
+
+    Подкласс переопределяет только нужные методы. Вызовы идут из рабочих
+    потоков скачивания, поэтому реализация должна быть потокобезопасной.
+    on_request_start вызывается в потоке запроса до его отправки - задержка
+    в нем (например, ограничение скорости по хосту) задерживает сам запрос.
+
+    Пример:
+        class SlowHostLogger(DownloadHooks):
+            def on_request_end(self, url, kind, status, nbytes, latency, error):
+                if latency > 5:
+                    log.warning("медленный ответ %s: %.1f с", url, latency)
+
+        downloader = VideoDownloader(hooks=[SlowHostLogger()])
+    """
+
+    def on_stage(self, name: str, step: int, total: int, title: str, skipped: bool):
+        """Начало этапа download_video ('url', 'metadata', 'playlist', 'download', ...)"""
+        pass
+
+    def on_download_start(self, segments: int, total_bytes: Optional[int], workers: int, output_path: str):
+        """Начало скачивания сегментов (total_bytes - если размеры известны заранее)"""
+        pass
+
+    def on_request_start(self, url: str, kind: str):
+        """
+        HTTP запрос вот-вот будет отправлен
+
+        Args:
+            url: URL запроса
+            kind: 'segment', 'playlist' или 'metadata'
+        """
+        pass
+
+    def on_request_end(self, url: str, kind: str, status: Optional[int], nbytes: int,
+                       latency: float, error: Optional[Exception]):
+        """
+        HTTP запрос завершен
+
+        Args:
+            url: URL запроса
+            kind: 'segment', 'playlist' или 'metadata'
+            status: HTTP статус (None - ответ не получен)
+            nbytes: Размер тела ответа
+            latency: Время запроса вместе с чтением тела (секунды)
+            error: Исключение requests, если запрос не удался
+        """
+        pass
+
+    def on_retry(self, url: str, attempt: int, reason: str, error: Exception):
+        """Сегмент будет запрошен повторно (reason: 'http' или 'validation')"""
+        pass
+
+    def on_cache_hit(self, url: str, nbytes: int):
+        """Сегмент взят из локального кэша без запроса"""
+        pass
+
+    def on_segment_written(self, index: int, nbytes: int, latency: float):
+        """Сегмент передан в приемник (latency - время его получения)"""
+        pass
+
+    def on_segment_failed(self, index: int, error: Exception):
+        """Сегмент не удалось скачать после всех попыток"""
+        pass
+
+    def on_download_end(self, success: bool, error: Optional[str]):
+        """Скачивание сегментов завершено"""
+        pass
+
+    def on_chat_messages(self, source: str, count: int):
+        """Получены сообщения чата ('hypercomments', 'api', 'html', 'live')"""
+        pass
+
+
+HOOK_NAMES = [name for name in vars(DownloadHooks) if name.startswith('on_')]
+
+
+def _noop(*args, **kwargs):
+    pass
+
+
+class HookList(DownloadHooks):
+    """
+    Рассылает вызовы нескольким DownloadHooks
+
+    Для каждого метода заранее отбираются только те обработчики, что его
+    переопределяют: без обработчиков вызов - пустая функция, с одним -
+    его метод напрямую.
+    """
+
+    def __init__(self, hooks: Optional[Iterable[DownloadHooks]] = None):
+        """
+        Args:
+            hooks: Обработчики (порядок вызова - порядок в списке);
+                вложенные HookList разворачиваются в свои обработчики
+        """
+        self.hooks = []
+        for hook in hooks or ():
+            if isinstance(hook, HookList):
+                self.hooks.extend(hook.hooks)
+            elif hook is not None:
+                self.hooks.append(hook)
+        for name in HOOK_NAMES:
+            handlers = [
+                getattr(hook, name) for hook in self.hooks
+                if getattr(type(hook), name) is not getattr(DownloadHooks, name)
+            ]
+            if not handlers:
+                setattr(self, name, _noop)
+            elif len(handlers) == 1:
+                setattr(self, name, handlers[0])
+            else:
+                setattr(self, name, self._fan_out(handlers))
+
+    def __bool__(self) -> bool:
+        return bool(self.hooks)
+
+    @staticmethod
+    def _fan_out(handlers):
+        def call(*args, **kwargs):
+            for handler in handlers:
+                handler(*args, **kwargs)
+        return call
+
+
+def as_hook_list(hooks) -> HookList:
+    """HookList из списка обработчиков, одного обработчика или None"""
+    if isinstance(hooks, HookList):
+        return hooks
+    if isinstance(hooks, DownloadHooks):
+        return HookList([hooks])
+    return HookList(hooks)
+
+
+def hooked_get(session: 'requests.Session', url: str, hooks: DownloadHooks, kind: str,
+               **kwargs) -> 'requests.Response':
+    """
+    session.get с вызовом on_request_start / on_request_end
+
+    Тело ответа читается целиком, чтобы latency и nbytes включали передачу.
+
+    Raises:
+        requests.RequestException: Если запрос не удался
+    """
+    import requests
+
+    hooks.on_request_start(url, kind)
+    started = time.monotonic()
+    status = None
+    nbytes = 0
+    error = None
+    try:
+        response = session.get(url, **kwargs)
+        status = response.status_code
+        nbytes = len(response.content)
+        return response
+    except requests.RequestException as e:
+        error = e
+        raise
+    finally:
+        hooks.on_request_end(url, kind, status, nbytes, time.monotonic() - started, error)
@@ -0,0 +1,208 @@
+"""HyperCommentsClient для получения истории чата напрямую через HTTP"""
+
+import re
+import json
+import os
+import requests
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from .chat_message import ChatMessage
+from .chat_pagination import (
+    Page, PageFetcher, RateLimiter, item_id, make_session, merge_pages, pagination_info
+)
+
+
+class HyperCommentsError(Exception):
+    """Ошибка получения чата через API HyperComments"""
+    pass
+
+
+class HyperCommentsClient:
+    """
+    Читает историю чата из JSON API бэкенда HyperComments
+
+    Первая страница запрашивается последовательно. Если ответ содержит
+    общее количество сообщений, остальные страницы скачиваются параллельно
+    по смещению; если содержит курсор - страницы читаются по цепочке
+    (см. PageFetcher).
+    """
+
+    BASE_URL = "https://c1api.hypercomments.com/1.0"
+    HISTORY_PATH = "/comments/list"
+    PAGE_SIZE = 100
+    TIMEOUT = 30
+    DEFAULT_WORKERS = PageFetcher.DEFAULT_WORKERS
+
+    WIDGET_ID_PATTERN = re.compile(r'widget_id\s*["\']?\s*[:=]\s*["\']?(\d+)')
+    XID_PATTERN = re.compile(r'\bxid\s*["\']?\s*[:=]\s*["\']([^"\']+)["\']')
+
+    def __init__(self, widget_id: str, base_url: str = BASE_URL,
+                 max_workers: int = DEFAULT_WORKERS, page_size: int = PAGE_SIZE,
+                 record_dir: Optional[str] = None, rate_limit: Optional[float] = None):
+        """
+        Args:
+            widget_id: Идентификатор виджета HyperComments
+            base_url: Адрес API (для тестов - адрес локального сервера)
+            max_workers: Количество параллельных запросов страниц
+            page_size: Количество сообщений на странице
+            record_dir: Директория для записи ответов (для ChatReplayServer)
+            rate_limit: Максимум запросов в секунду (None - без ограничения)
+        """
+        self.widget_id = str(widget_id)
+        self.base_url = base_url.rstrip('/')
+        self.max_workers = max(1, max_workers)
+        self.page_size = page_size
+        self.record_dir = record_dir
+        self.rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+        self.session = make_session(self.max_workers, {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Accept': 'application/json'
+        })
+
+    @classmethod
+    def discover(cls, html_content: str, page_url: str) -> Optional[Tuple[str, str]]:
+        """
+        Находит параметры виджета в HTML страницы видео
+
+        Args:
+            html_content: HTML страницы с виджетом
+            page_url: URL страницы (используется как xid по умолчанию)
+
+        Returns:
+            (widget_id, xid) или None если виджет не найден
+        """
+        widget_match = cls.WIDGET_ID_PATTERN.search(html_content)
+        if not widget_match:
+            return None
+
+        xid_match = cls.XID_PATTERN.search(html_content)
+        xid = xid_match.group(1) if xid_match else page_url
+        return (widget_match.group(1), xid)
+
+    def fetch_history(self, xid: str) -> List[ChatMessage]:
+        """
+        Скачивает всю историю чата
+
+        Args:
+            xid: Идентификатор страницы (ветки комментариев) в HyperComments
+
+        Returns:
+            Список сообщений в хронологическом порядке
+
+        Raises:
+            HyperCommentsError: Если не удалось получить первую страницу
+        """
+        fetcher = PageFetcher(
+            lambda offset=0, cursor=None: Page(*self._page_info(self._fetch_page(xid, offset, cursor))),
+            page_size=self.page_size,
+            max_workers=self.max_workers,
+            rate_limiter=self.rate_limiter,
+            key=item_id
+        )
+        return self._merge_pages(fetcher.fetch())
+
+    def _fetch_page(self, xid: str, offset: int = 0, cursor: Optional[str] = None) -> Any:
+        """Запрашивает одну страницу истории"""
+        params = {
+            'widget_id': self.widget_id,
+            'xid': xid,
+            'limit': self.page_size,
+        }
+        if cursor:
+            params['cursor'] = cursor
+        else:
+            params['offset'] = offset
+
+        url = f"{self.base_url}{self.HISTORY_PATH}"
+        try:
+            response = self.session.get(url, params=params, timeout=self.TIMEOUT)
+            response.raise_for_status()
+            data = response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise HyperCommentsError(f"Не удалось получить страницу чата: {e}")
+
+        if self.record_dir:
+            self._record(params, data)
+
+        return data
+
+    def _page_info(self, data: Any) -> Tuple[List[Dict], Optional[int], Optional[str]]:
+        """
+        Извлекает из ответа сообщения, общее количество и курсор
+
+        Returns:
+            (элементы страницы, total или None, курсор следующей страницы или None)
+        """
+        if isinstance(data, list):
+            return (data, None, None)
+        if not isinstance(data, dict):
+            return ([], None, None)
+
+        if data.get('result') == 'error':
+            raise HyperCommentsError(f"API вернул ошибку: {data.get('description', data)}")
+
+        items = []
+        for key in ('data', 'comments', 'messages', 'items'):
+            if isinstance(data.get(key), list):
+                items = data[key]
+                break
+
+        total, cursor = pagination_info(data)
+        return (items, total, cursor)
+
+    def _merge_pages(self, pages: List[List[Dict]]) -> List[ChatMessage]:
+        """Объединяет страницы в порядке запроса, убирая дубликаты"""
+        messages = []
+        items = (item for page in pages for item in page if isinstance(item, dict))
+
+        for item in merge_pages([items], key=item_id):
+            message = self._parse_item(item)
+            if message:
+                messages.append(message)
+
+        return messages
+
+    def _parse_item(self, item: Dict) -> Optional[ChatMessage]:
+        """Преобразует комментарий HyperComments в ChatMessage"""
+        text = item.get('text') or item.get('message') or item.get('body') or ''
+        if not text:
+            return None
+
+        username = item.get('nick') or item.get('name') or item.get('author') or 'Unknown'
+        user_id = item.get('user_id') or item.get('uid')
+
+        return ChatMessage(
+            timestamp=self._format_time(item.get('time') or item.get('date') or item.get('created_at')),
+            username=str(username),
+            message=str(text),
+            user_id=str(user_id) if user_id else None
+        )
+
+    @staticmethod
+    def _format_time(value: Any) -> str:
+        """Приводит время комментария (unix-время в с или мс) к ISO формату в UTC"""
+        if value is None:
+            return ''
+        try:
+            seconds = float(value)
+        except (TypeError, ValueError):
+            return str(value)
+        if seconds > 1e11:  # миллисекунды
+            seconds /= 1000
+        return datetime.fromtimestamp(seconds, timezone.utc).isoformat(timespec='seconds')
+
+    def _record(self, params: Dict, data: Any):
+        """Сохраняет ответ в формате записей ChatReplayServer"""
+        os.makedirs(self.record_dir, exist_ok=True)
+        name = '_'.join(f"{key}-{params[key]}" for key in ('offset', 'cursor') if key in params)
+        name = re.sub(r'[^\w.-]', '_', name)
+        path = os.path.join(self.record_dir, f"{name}.json")
+        record = {
+            'path': self.HISTORY_PATH,
+            'query': {key: str(value) for key, value in params.items()},
+            'status': 200,
+            'body': data,
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False)
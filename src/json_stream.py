@@ -0,0 +1,387 @@
+"""JSONArrayStream - потоковое чтение массива из большого JSON документа"""
+
+import re
+import json
+import codecs
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+
+# Структурные символы, на которых останавливается сканер
+STRUCTURAL = re.compile(r'[\[\]{}",:]')
+SCALAR_END = re.compile(r'[\s,\]}]')
+
+# Строковые значения верхнего уровня длиннее этого не сохраняются в meta
+MAX_META_STRING = 4096
+
+# Сколько текста массива-кандидата держать в буфере в ожидании массива
+# с более высоким приоритетом
+MAX_LOOKAHEAD = 1024 * 1024
+
+UTF8_DECODER = codecs.getincrementaldecoder('utf-8')
+
+
+class JSONStreamError(ValueError):
+    """Ошибка потокового разбора JSON (как и json.JSONDecodeError - ValueError)"""
+    pass
+
+
+class JSONArrayStream:
+    """
+    Находит в потоке JSON массив сообщений и отдает его элементы по одному
+
+    Массив - это либо сам документ верхнего уровня, либо значение ключа
+    из keys. Ключи объекта верхнего уровня проверяются в порядке keys
+    (по умолчанию chat, messages, items, data - как при разборе ответа
+    целиком), и только если ни под одним из них нет массива, берется
+    первый такой ключ на любой глубине. В памяти одновременно находится
+    текущий элемент, непрочитанный остаток последнего фрагмента и не
+    больше MAX_LOOKAHEAD текста кандидата, поэтому пиковая память не
+    зависит от размера ответа.
+
+    В meta собираются скалярные поля объекта верхнего уровня и объекта,
+    содержащего массив (например, total или next_cursor) - поля после
+    массива доступны после окончания итерации.
+
+    Пример:
+        response = session.get(url, stream=True)
+        stream = JSONArrayStream(response.iter_content(65536, decode_unicode=True))
+        for item in stream:
+            ...
+    """
+
+    DEFAULT_KEYS = ('chat', 'messages', 'items', 'data')
+
+    def __init__(self, chunks: Iterable[Union[str, bytes]], keys: Sequence[str] = DEFAULT_KEYS):
+        """
+        Args:
+            chunks: Фрагменты документа (str или байты UTF-8; символ может
+                быть разрезан между фрагментами)
+            keys: Имена ключей, значение которых считается массивом сообщений,
+                в порядке приоритета
+        """
+        self._chunks = iter(chunks)
+        self.keys = tuple(keys)
+        self.meta: Dict[str, Any] = {}
+        self.found_key: Optional[str] = None
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        self._stack = []
+        # Начало массива-кандидата: буфер не обрезается дальше этой позиции
+        self._pin: Optional[int] = None
+        self._decoder = None
+
+    def __iter__(self) -> Iterator[Any]:
+        if self._find_array():
+            yield from self._iter_items()
+            self._read_trailing_meta()
+
+    # --- буфер ---
+
+    def _fill(self, keep_from: int) -> int:
+        """
+        Дочитывает следующий фрагмент, отбрасывая обработанную часть буфера
+
+        Args:
+            keep_from: Позиция, начиная с которой буфер нужно сохранить
+
+        Returns:
+            Сдвиг позиций (на сколько уменьшились индексы в буфере)
+        """
+        if self._eof:
+            raise JSONStreamError("Неожиданный конец JSON документа")
+        while True:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                self._eof = True
+                # Незавершенный многобайтовый символ в конце - UnicodeDecodeError
+                chunk = self._decoder.decode(b'', final=True) if self._decoder else ''
+            else:
+                if isinstance(chunk, bytes):
+                    if self._decoder is None:
+                        self._decoder = UTF8_DECODER()
+                    chunk = self._decoder.decode(chunk)
+            if chunk or self._eof:
+                break
+
+        if self._pin is not None:
+            keep_from = min(keep_from, self._pin)
+            self._pin -= keep_from
+        self._buf = self._buf[keep_from:] + chunk
+        self._pos -= keep_from
+        if self._eof and not chunk and self._pos >= len(self._buf):
+            raise JSONStreamError("Неожиданный конец JSON документа")
+        return keep_from
+
+    def _next_significant(self) -> Optional[str]:
+        """Пропускает пробелы и возвращает следующий символ (None - конец документа)"""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in ' \t\r\n':
+                self._pos += 1
+            if self._pos < len(self._buf):
+                char = self._buf[self._pos]
+                self._pos += 1
+                return char
+            try:
+                self._fill(self._pos)
+            except JSONStreamError:
+                return None
+
+    def _skip_string(self, start: int) -> int:
+        """
+        Пропускает строку, открывающая кавычка которой стоит перед self._pos
+
+        Args:
+            start: Позиция, которую нужно сохранить в буфере
+
+        Returns:
+            Новое значение start с учетом сдвига буфера
+        """
+        while True:
+            end = self._buf.find('"', self._pos)
+            if end == -1:
+                self._pos = len(self._buf)
+                start -= self._fill(start)
+                continue
+            backslash = end - 1
+            while backslash >= start and self._buf[backslash] == '\\':
+                backslash -= 1
+            self._pos = end + 1
+            if (end - 1 - backslash) % 2 == 0:
+                return start
+
+    def _read_string(self) -> str:
+        """Читает и декодирует строку (открывающая кавычка уже прочитана)"""
+        start = self._skip_string(self._pos - 1)
+        return json.loads(self._buf[start:self._pos])
+
+    def _read_scalar(self) -> Any:
+        """Читает число, true, false или null (первый символ уже прочитан)"""
+        start = self._pos - 1
+        while True:
+            match = SCALAR_END.search(self._buf, self._pos)
+            if match:
+                self._pos = match.start()
+                break
+            self._pos = len(self._buf)
+            try:
+                start -= self._fill(start)
+            except JSONStreamError:
+                break
+        try:
+            return json.loads(self._buf[start:self._pos])
+        except ValueError:
+            raise JSONStreamError(f"Некорректное значение: {self._buf[start:self._pos][:50]}")
+
+    # --- разбор ---
+
+    def _find_array(self) -> bool:
+        """
+        Сканирует документ до открывающей скобки нужного массива
+
+        Массив с наивысшим приоритетом (корневой или keys[0] на верхнем
+        уровне) выбирается сразу. Остальные подходящие массивы - кандидаты:
+        лучший из них остается в буфере, и если до конца объекта верхнего
+        уровня не нашлось массива приоритетнее, разбор возвращается к его
+        началу. Кандидат длиннее MAX_LOOKAHEAD выбирается, не дожидаясь
+        конца объекта.
+
+        Returns:
+            True если массив найден
+        """
+        stack = []
+        # Скалярные поля каждого открытого объекта (None для массивов)
+        frames = []
+        expect_key = False
+        key = None
+        # (приоритет, ключ, стек, meta) кандидата; его начало - self._pin
+        candidate = None
+
+        while True:
+            if candidate and self._pos - self._pin > MAX_LOOKAHEAD:
+                return self._select(candidate)
+
+            char = self._next_significant()
+            if char is None:
+                return self._select(candidate)
+
+            if char == '[':
+                rank = self._rank(stack, key)
+                if rank == 0:
+                    self._pin = None
+                    return self._select((rank, key if stack else None, stack, self._frames_meta(frames)),
+                                        rewind=False)
+                if rank is not None and (candidate is None or rank < candidate[0]):
+                    self._pin = self._pos - 1
+                    candidate = (rank, key, list(stack), self._frames_meta(frames))
+                stack.append('[')
+                frames.append(None)
+            elif char == '{':
+                stack.append('{')
+                frames.append({})
+                expect_key = True
+                key = None
+            elif char in ']}':
+                if not stack:
+                    raise JSONStreamError("Непарная закрывающая скобка")
+                stack.pop()
+                frames.pop()
+                if not stack:
+                    return self._select(candidate)
+            elif char == ',':
+                expect_key = stack[-1] == '{' if stack else False
+            elif char == ':':
+                expect_key = False
+            elif char == '"':
+                if expect_key:
+                    key = self._read_string()
+                elif stack and stack[-1] == '{':
+                    start = self._skip_string(self._pos - 1)
+                    if self._pos - start <= MAX_META_STRING:
+                        frames[-1][key] = json.loads(self._buf[start:self._pos])
+                else:
+                    self._skip_string(self._pos)
+            else:
+                value = self._read_scalar()
+                if stack and stack[-1] == '{':
+                    frames[-1][key] = value
+
+    def _rank(self, stack: List[str], key: Optional[str]) -> Optional[int]:
+        """
+        Приоритет массива, который открывается в текущей позиции
+
+        Returns:
+            0 - корневой массив или keys[0] на верхнем уровне, i - keys[i]
+            на верхнем уровне, len(keys) - ключ из keys глубже,
+            None - массив не подходит
+        """
+        if not stack:
+            return 0
+        if stack[-1] != '{' or key not in self.keys:
+            return None
+        if len(stack) == 1:
+            return self.keys.index(key)
+        return len(self.keys)
+
+    @staticmethod
+    def _frames_meta(frames: List[Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Скалярные поля объекта верхнего уровня и объекта, содержащего массив"""
+        meta = {}
+        for frame in frames[:1] + frames[-1:]:
+            if frame:
+                meta.update(frame)
+        return meta
+
+    def _select(self, candidate: Optional[Tuple], rewind: bool = True) -> bool:
+        """
+        Выбирает массив для чтения элементов
+
+        Args:
+            candidate: (приоритет, ключ, стек, meta) или None
+            rewind: Вернуться к началу кандидата (self._pin)
+
+        Returns:
+            True если массив выбран
+        """
+        if candidate is None:
+            return False
+        _, self.found_key, self._stack, meta = candidate
+        self.meta.update(meta)
+        if rewind:
+            self._pos = self._pin + 1
+        self._pin = None
+        return True
+
+    def _iter_items(self) -> Iterator[Any]:
+        """Отдает элементы массива, открывающая скобка которого уже прочитана"""
+        while True:
+            char = self._next_significant()
+            if char is None:
+                raise JSONStreamError("Массив не закрыт")
+            if char == ']':
+                return
+            if char == ',':
+                continue
+            self._pos -= 1
+            yield json.loads(self._read_element())
+
+    def _read_element(self) -> str:
+        """Возвращает текст одного элемента массива, не разбирая его"""
+        start = self._pos
+        depth = 0
+
+        while True:
+            match = STRUCTURAL.search(self._buf, self._pos)
+            if not match:
+                self._pos = len(self._buf)
+                start -= self._fill(start)
+                continue
+
+            char = match.group()
+            self._pos = match.end()
+
+            if char == '"':
+                start = self._skip_string(start)
+            elif char in '[{':
+                depth += 1
+            elif char in ']}':
+                if depth == 0:
+                    self._pos -= 1
+                    return self._buf[start:self._pos]
+                depth -= 1
+            elif char == ',' and depth == 0:
+                self._pos -= 1
+                return self._buf[start:self._pos]
+
+    def _read_trailing_meta(self):
+        """Дочитывает скалярные поля после массива (total, next_cursor)"""
+        if self.found_key is None:
+            return
+        try:
+            self._scan_tail()
+        except JSONStreamError:
+            pass
+
+    def _scan_tail(self):
+        """
+        Дочитывает документ после массива
+
+        Сохраняет скалярные поля объекта, содержащего массив, и объекта
+        верхнего уровня - в них обычно лежат сведения о пагинации.
+        """
+        stack = list(self._stack)
+        container_depth = len(stack)
+        expect_key = False
+        key = None
+
+        while True:
+            char = self._next_significant()
+            if char is None:
+                return
+            record = stack and stack[-1] == '{' and len(stack) in (1, container_depth)
+
+            if char in '[{':
+                stack.append(char)
+                expect_key = char == '{'
+            elif char in ']}':
+                stack.pop()
+                if not stack:
+                    return
+            elif char == ',':
+                expect_key = stack[-1] == '{'
+            elif char == ':':
+                expect_key = False
+            elif char == '"':
+                if expect_key:
+                    key = self._read_string()
+                elif record:
+                    start = self._skip_string(self._pos - 1)
+                    if self._pos - start <= MAX_META_STRING:
+                        self.meta[key] = json.loads(self._buf[start:self._pos])
+                else:
+                    self._skip_string(self._pos)
+            else:
+                value = self._read_scalar()
+                if record:
+                    self.meta[key] = value
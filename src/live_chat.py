@@ -0,0 +1,180 @@
+"""LiveChatRecorder - запись чата во время трансляции"""
+
+import json
+import time
+import threading
+from typing import List, Optional
+
+from .chat_message import ChatMessage
+from .chat_parser import ChatTextParser, BoundedSeenHashes
+from .hooks import DownloadHooks, as_hook_list
+
+
+# Устанавливает MutationObserver на виджет. Узлы складываются в очередь,
+# а текст читается при выгрузке - к этому моменту виджет успевает его отрисовать.
+INSTALL_OBSERVER_SCRIPT = """
+var selector = arguments[0];
+var widget = document.getElementById('hypercomments_widget');
+if (!widget) { return false; }
+if (window.__facecastLiveChat) { return true; }
+
+var state = {queue: []};
+function collect(node) {
+    if (node.nodeType !== 1) { return; }
+    if (node.matches(selector)) { state.queue.push(node); }
+    var nested = node.querySelectorAll(selector);
+    for (var i = 0; i < nested.length; i++) { state.queue.push(nested[i]); }
+}
+
+var existing = widget.querySelectorAll(selector);
+for (var i = 0; i < existing.length; i++) { state.queue.push(existing[i]); }
+
+state.observer = new MutationObserver(function(mutations) {
+    for (var m = 0; m < mutations.length; m++) {
+        var added = mutations[m].addedNodes;
+        for (var n = 0; n < added.length; n++) { collect(added[n]); }
+    }
+});
+state.observer.observe(widget, {childList: true, subtree: true});
+window.__facecastLiveChat = state;
+return true;
+"""
+
+# Забирает накопленные узлы; null означает, что страница перезагрузилась
+DRAIN_QUEUE_SCRIPT = """
+var state = window.__facecastLiveChat;
+if (!state) { return null; }
+var nodes = state.queue.splice(0, state.queue.length);
+var texts = [];
+for (var i = 0; i < nodes.length; i++) {
+    var text = (nodes[i].innerText || nodes[i].textContent || '').trim();
+    if (text.length > 5) { texts.push(text); }
+}
+return texts;
+"""
+
+
+class LiveChatRecorder:
+    """
+    Дописывает новые сообщения виджета в JSONL файл по мере появления
+
+    Дедупликация идет по ограниченному LRU хешей, а запись на диск -
+    пачками, поэтому потребление памяти и число системных вызовов
+    не растут с длительностью трансляции.
+    """
+
+    DEFAULT_SELECTOR = 'div[class*="Message"]'
+    POLL_INTERVAL = 2.0
+    FLUSH_INTERVAL = 10.0
+    FLUSH_SIZE = 500
+
+    def __init__(self, output_path: str, selector: str = DEFAULT_SELECTOR,
+                 poll_interval: float = POLL_INTERVAL, flush_interval: float = FLUSH_INTERVAL,
+                 flush_size: int = FLUSH_SIZE,
+                 dedupe_size: int = BoundedSeenHashes.DEFAULT_MAX_SIZE,
+                 hooks: Optional[DownloadHooks] = None):
+        """
+        Args:
+            output_path: JSONL файл (дописывается, если существует)
+            selector: CSS селектор элементов сообщений внутри виджета
+            poll_interval: Период опроса очереди (секунды)
+            flush_interval: Максимальная задержка записи на диск (секунды)
+            flush_size: Количество сообщений, после которого запись выполняется сразу
+            dedupe_size: Размер LRU хешей для дедупликации
+            hooks: Обратные вызовы (on_chat_messages при каждой записи на диск)
+        """
+        self.output_path = output_path
+        self.selector = selector
+        self.poll_interval = poll_interval
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.parser = ChatTextParser(seen=BoundedSeenHashes(dedupe_size))
+        self.message_count = 0
+        self.hooks = as_hook_list(hooks)
+        self._pending: List[str] = []
+        self._last_flush = time.monotonic()
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        """Останавливает запись (можно вызывать из другого потока)"""
+        self._stop_event.set()
+
+    def record(self, driver, duration: Optional[float] = None) -> int:
+        """
+        Записывает чат, пока не истечет duration, не вызван stop() или Ctrl+C
+
+        Драйвер должен находиться в контексте документа с виджетом
+        (для opendemo.ru - внутри iframe facecast).
+
+        Args:
+            driver: Экземпляр Selenium WebDriver
+            duration: Длительность записи в секундах (None - без ограничения)
+
+        Returns:
+            Количество записанных сообщений
+        """
+        deadline = time.monotonic() + duration if duration else None
+
+        with open(self.output_path, 'a', encoding='utf-8') as f:
+            try:
+                self._install(driver)
+                while not self._stop_event.is_set():
+                    self._poll(driver)
+                    self._maybe_flush(f)
+
+                    if deadline and time.monotonic() >= deadline:
+                        break
+                    self._stop_event.wait(self.poll_interval)
+            except KeyboardInterrupt:
+                print("\nЗапись чата остановлена пользователем")
+            finally:
+                # Забираем то, что успело накопиться, и сбрасываем буфер
+                try:
+                    self._poll(driver)
+                except Exception:
+                    pass
+                self._flush(f)
+
+        return self.message_count
+
+    def _install(self, driver):
+        """Устанавливает наблюдатель на виджет"""
+        if not driver.execute_script(INSTALL_OBSERVER_SCRIPT, self.selector):
+            raise RuntimeError("Виджет чата hypercomments_widget не найден на странице")
+
+    def _poll(self, driver):
+        """Забирает новые сообщения из очереди браузера"""
+        raw_messages = driver.execute_script(DRAIN_QUEUE_SCRIPT)
+        if raw_messages is None:
+            # Страница перезагрузилась - наблюдатель нужно поставить заново
+            self._install(driver)
+            raw_messages = driver.execute_script(DRAIN_QUEUE_SCRIPT) or []
+
+        for message in self.parser.iter_parse(raw_messages):
+            self._pending.append(self._serialize(message))
+
+    def _maybe_flush(self, f):
+        """Пишет буфер на диск, если он заполнен или пора по времени"""
+        if len(self._pending) >= self.flush_size or \
+                time.monotonic() - self._last_flush >= self.flush_interval:
+            self._flush(f)
+
+    def _flush(self, f):
+        """Записывает накопленные сообщения одной операцией"""
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+
+        f.write(''.join(self._pending))
+        f.flush()
+        self.message_count += len(self._pending)
+        self.hooks.on_chat_messages('live', len(self._pending))
+        print(f"  Записано сообщений: {self.message_count}")
+        self._pending.clear()
+
+    @staticmethod
+    def _serialize(message: ChatMessage) -> str:
+        """Строка JSONL для сообщения"""
+        record = message.to_dict()
+        record['received_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+        return json.dumps(record, ensure_ascii=False) + '\n'
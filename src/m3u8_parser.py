@@ -1,10 +1,21 @@
 """M3U8Parser для парсинга HLS плейлистов"""
 
 import re
-from typing import List, Optional
+from datetime import datetime
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
 from urllib.parse import urljoin, urlparse
 
 
+@dataclass
+class Segment:
+    """Сегмент медиа-плейлиста"""
+    url: str
+    duration: float  # секунды из #EXTINF
+    program_date_time: Optional[datetime] = None  # из #EXT-X-PROGRAM-DATE-TIME
+    encrypted: bool = False  # действует #EXT-X-KEY с METHOD отличным от NONE
+
+
 class M3U8ParseError(Exception):
     """Ошибка парсинга M3U8"""
     pass
@@ -24,6 +35,22 @@ class M3U8Parser:
         Returns:
             Список абсолютных URL сегментов
             
+        Raises:
+            M3U8ParseError: Если не удалось распарсить плейлист
+        """
+        return [segment.url for segment in self.parse_segments(m3u8_content, base_url)]
+    
+    def parse_segments(self, m3u8_content: str, base_url: str) -> List[Segment]:
+        """
+        Парсит M3U8 плейлист вместе с длительностями и временем сегментов
+        
+        Args:
+            m3u8_content: Содержимое M3U8 файла
+            base_url: Базовый URL для преобразования относительных путей
+            
+        Returns:
+            Список сегментов в порядке воспроизведения
+            
         Raises:
             M3U8ParseError: Если не удалось распарсить плейлист
         """
@@ -31,23 +58,67 @@ class M3U8Parser:
             raise M3U8ParseError("M3U8 содержимое пустое")
         
         lines = m3u8_content.strip().split('\n')
-        segment_urls = []
+        segments = []
+        duration = 0.0
+        program_date_time = None
+        encrypted = False
         
         for line in lines:
             line = line.strip()
             
-            # Пропускаем пустые строки и комментарии
-            if not line or line.startswith('#'):
+            # Пропускаем пустые строки
+            if not line:
+                continue
+            
+            if line.startswith('#EXTINF:'):
+                duration = self._parse_duration(line)
+                continue
+            
+            if line.startswith('#EXT-X-PROGRAM-DATE-TIME:'):
+                program_date_time = self._parse_date_time(line.split(':', 1)[1])
+                continue
+            
+            # Ключ действует на все последующие сегменты до следующего #EXT-X-KEY
+            if line.startswith('#EXT-X-KEY:'):
+                encrypted = 'METHOD=NONE' not in line
+                continue
+            
+            # Остальные теги и комментарии
+            if line.startswith('#'):
                 continue
             
             # Это URL сегмента
             absolute_url = self._resolve_url(line, base_url)
-            segment_urls.append(absolute_url)
+            segments.append(Segment(absolute_url, duration, program_date_time, encrypted))
+            duration = 0.0
+            program_date_time = None
         
-        if not segment_urls:
+        if not segments:
             raise M3U8ParseError("В M3U8 плейлисте не найдено сегментов")
         
-        return segment_urls
+        return segments
+    
+    def _parse_duration(self, line: str) -> float:
+        """Извлекает длительность из строки #EXTINF:<секунды>,<название>"""
+        value = line[len('#EXTINF:'):].split(',', 1)[0]
+        try:
+            return float(value)
+        except ValueError:
+            return 0.0
+    
+    def _parse_date_time(self, value: str) -> Optional[datetime]:
+        """Разбирает ISO 8601 дату из #EXT-X-PROGRAM-DATE-TIME"""
+        value = value.strip()
+        if value.endswith('Z'):
+            value = value[:-1] + '+00:00'
+        # Смещение без двоеточия (+0300) не поддерживается fromisoformat до Python 3.11
+        value = re.sub(r'([+-]\d{2})(\d{2})$', r'\1:\2', value)
+        # Дробная часть секунд должна содержать 3 или 6 цифр
+        value = re.sub(r'\.(\d+)', lambda m: '.' + (m.group(1) + '000000')[:6], value)
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
     
     def _resolve_url(self, url: str, base_url: str) -> str:
         """
@@ -77,6 +148,21 @@ class M3U8Parser:
         Returns:
             URL плейлиста с наивысшим качеством
             
+        Raises:
+            M3U8ParseError: Если не удалось найти варианты качества
+        """
+        return self.select_best_variant(master_playlist)[0]
+    
+    def select_best_variant(self, master_playlist: str) -> Tuple[str, int]:
+        """
+        Выбирает вариант с наивысшим качеством вместе с его BANDWIDTH
+        
+        Args:
+            master_playlist: Содержимое master M3U8 плейлиста
+            
+        Returns:
+            (URL плейлиста, BANDWIDTH в бит/с)
+            
         Raises:
             M3U8ParseError: Если не удалось найти варианты качества
         """
@@ -111,7 +197,7 @@ class M3U8Parser:
                 "Не удалось найти варианты качества в master плейлисте"
             )
         
-        return best_url
+        return best_url, best_bandwidth
     
     def is_master_playlist(self, m3u8_content: str) -> bool:
         """
@@ -124,3 +210,20 @@ class M3U8Parser:
             True если это master playlist, False если обычный
         """
         return '#EXT-X-STREAM-INF:' in m3u8_content
+    
+    def is_live(self, m3u8_content: str) -> bool:
+        """
+        Проверяет, что media playlist еще не завершен (идет трансляция)
+        
+        В живом плейлисте нет #EXT-X-ENDLIST: сервер дописывает новые
+        сегменты, а старые уходят из окна плейлиста.
+        
+        Args:
+            m3u8_content: Содержимое media playlist
+            
+        Returns:
+            True если плейлист без #EXT-X-ENDLIST и не объявлен как VOD
+        """
+        if '#EXT-X-ENDLIST' in m3u8_content:
+            return False
+        return not re.search(r'^#EXT-X-PLAYLIST-TYPE:\s*VOD\s*$', m3u8_content, re.MULTILINE)
@@ -3,10 +3,11 @@
 import re
 import json
 import requests
-from bs4 import BeautifulSoup
 from typing import Optional, Tuple
 from dataclasses import dataclass
 
+from .hooks import DownloadHooks, as_hook_list, hooked_get
+
 
 @dataclass
 class VideoInfo:
@@ -27,7 +28,12 @@ class VideoMetadataExtractor:
     BASE_URL = "https://facecast.net"
     TIMEOUT = 30
     
-    def __init__(self):
+    def __init__(self, hooks: Optional[DownloadHooks] = None):
+        """
+        Args:
+            hooks: Обратные вызовы (on_request_start / on_request_end, kind='metadata')
+        """
+        self.hooks = as_hook_list(hooks)
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
@@ -54,7 +60,7 @@ class VideoMetadataExtractor:
             url += f"?key={code}"
         
         try:
-            response = self.session.get(url, timeout=self.TIMEOUT)
+            response = hooked_get(self.session, url, self.hooks, 'metadata', timeout=self.TIMEOUT)
             response.raise_for_status()
         except requests.RequestException as e:
             raise MetadataExtractionError(
@@ -129,6 +135,9 @@ class VideoMetadataExtractor:
                 # Если не удалось распарсить, продолжаем другими методами
                 pass
         
+        # BeautifulSoup тяжелый - импортируется, только если данных события на странице нет
+        from bs4 import BeautifulSoup
+        
         soup = BeautifulSoup(html_content, 'html.parser')
         
         # Поиск в script tags с JSON
@@ -182,7 +191,7 @@ class VideoMetadataExtractor:
             url += f"?key={code}"
         
         try:
-            response = self.session.get(url, timeout=self.TIMEOUT)
+            response = hooked_get(self.session, url, self.hooks, 'metadata', timeout=self.TIMEOUT)
             response.raise_for_status()
             html_content = response.text
             
@@ -0,0 +1,303 @@
+"""Метрики скачивания в текстовом формате Prometheus"""
+
+import math
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from .hooks import DownloadHooks
+
+
+# Границы гистограммы времени запроса сегмента (секунды)
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class MetricsError(Exception):
+    """Ошибка сервера метрик"""
+    pass
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metric:
+    """Базовый класс метрики с набором меток"""
+
+    TYPE = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """
+        Args:
+            name: Имя метрики (facecast_...)
+            documentation: Описание для # HELP
+            labelnames: Имена меток
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Метрика {self.name} ожидает метки {self.labelnames}, получено {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+    def samples(self) -> Iterable[str]:
+        """Строки значений в формате Prometheus"""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        """Описание метрики и все ее значения"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}"]
+        lines.extend(self.samples())
+        return lines
+
+
+class Counter(Metric):
+    """Монотонно растущий счетчик"""
+
+    TYPE = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{self._labels(key)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    """Значение, которое может расти и уменьшаться"""
+
+    TYPE = 'gauge'
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    """Распределение значений по корзинам (накопительно, как в Prometheus)"""
+
+    TYPE = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((key, (list(state[0]), state[1], state[2])) for key, state in self._values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = self._labels(key, ('le', _format_value(bound)))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{self._labels(key)} {_format_value(total)}"
+            yield f"{self.name}_count{self._labels(key)} {count}"
+
+
+class MetricsRegistry:
+    """Набор метрик процесса"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        """
+        Добавляет метрику
+
+        Raises:
+            ValueError: Если метрика с таким именем уже есть
+        """
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+SEGMENT_LATENCY = REGISTRY.histogram(
+    'facecast_segment_request_seconds', 'Время HTTP запроса сегмента', ['host'])
+DOWNLOADED_BYTES = REGISTRY.counter(
+    'facecast_downloaded_bytes_total', 'Получено байт сегментов', ['source'])
+SEGMENTS = REGISTRY.counter(
+    'facecast_segments_total', 'Обработано сегментов', ['result'])
+IN_FLIGHT = REGISTRY.gauge(
+    'facecast_inflight_requests', 'Выполняющиеся HTTP запросы сегментов')
+RETRIES = REGISTRY.counter(
+    'facecast_retries_total', 'Повторные запросы сегментов', ['host', 'reason'])
+QUEUE_DEPTH = REGISTRY.gauge(
+    'facecast_segment_queue_depth', 'Сегменты, еще не переданные в приемник')
+CHAT_MESSAGES = REGISTRY.counter(
+    'facecast_chat_messages_total', 'Получено сообщений чата', ['source'])
+
+
+class MetricsHooks(DownloadHooks):
+    """Обновляет метрики процесса по обратным вызовам скачивания"""
+
+    def on_download_start(self, segments, total_bytes, workers, output_path):
+        QUEUE_DEPTH.set(segments)
+
+    def on_request_start(self, url, kind):
+        if kind == 'segment':
+            IN_FLIGHT.inc()
+
+    def on_request_end(self, url, kind, status, nbytes, latency, error):
+        if kind != 'segment':
+            return
+        IN_FLIGHT.dec()
+        SEGMENT_LATENCY.observe(latency, host=urlsplit(url).hostname or '')
+        DOWNLOADED_BYTES.inc(nbytes, source='network')
+
+    def on_retry(self, url, attempt, reason, error):
+        RETRIES.inc(host=urlsplit(url).hostname or '', reason=reason)
+
+    def on_cache_hit(self, url, nbytes):
+        DOWNLOADED_BYTES.inc(nbytes, source='cache')
+
+    def on_segment_written(self, index, nbytes, latency):
+        QUEUE_DEPTH.dec()
+        SEGMENTS.inc(result='written')
+
+    def on_segment_failed(self, index, error):
+        SEGMENTS.inc(result='failed')
+
+    def on_download_end(self, success, error):
+        QUEUE_DEPTH.set(0)
+
+    def on_chat_messages(self, source, count):
+        CHAT_MESSAGES.inc(count, source=source)
+
+
+class MetricsServer:
+    """
+    HTTP сервер, отдающий метрики на /metrics
+
+    Работает в фоновом потоке и по умолчанию слушает только localhost.
+
+    Пример:
+        server = MetricsServer(9464)
+        server.start()
+        # curl http://127.0.0.1:9464/metrics
+    """
+
+    def __init__(self, port: int, host: str = '127.0.0.1', registry: MetricsRegistry = REGISTRY):
+        """
+        Args:
+            port: Порт (0 - выбрать свободный)
+            host: Адрес для прослушивания
+            registry: Набор метрик
+        """
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def start(self):
+        """
+        Запускает сервер в фоновом потоке
+
+        Raises:
+            MetricsError: Если порт занят или недоступен
+        """
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            raise MetricsError(f"Не удалось открыть порт метрик {self.host}:{self.port}: {e}")
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name='metrics', daemon=True).start()
+
+    def stop(self):
+        """Останавливает сервер"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,505 @@
+"""Приемники скачанных сегментов: файл или ffmpeg"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+
+class OutputSinkError(Exception):
+    """Ошибка записи видео в приемник"""
+    pass
+
+
+class OutputSink:
+    """
+    Приемник скачанных сегментов
+
+    Сегменты передаются в write() в порядке завершения скачивания;
+    где и как они окажутся в итоговом файле, решает приемник.
+    """
+
+    # Файл содержит сегменты как есть - для него сохраняется журнал границ
+    RAW_OUTPUT = False
+
+    def __init__(self, output_path: str):
+        """
+        Args:
+            output_path: Путь к итоговому файлу
+        """
+        self.output_path = output_path
+        self.bytes_written = 0
+        self.segment_sizes: List[int] = []
+        self._closed = False
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    @property
+    def pending_count(self) -> int:
+        """Количество сегментов, ожидающих записи в памяти"""
+        return 0
+
+    @property
+    def pending_bytes(self) -> int:
+        """Объем сегментов, ожидающих записи в памяти"""
+        return 0
+
+    def open(self):
+        """Открывает приемник"""
+        raise NotImplementedError
+
+    def write(self, index: int, data: bytes):
+        """
+        Передает сегмент в приемник
+
+        Args:
+            index: Номер сегмента (с 0)
+            data: Содержимое сегмента
+
+        Raises:
+            OutputSinkError: Если запись не удалась
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Завершает запись (все сегменты уже переданы)"""
+        raise NotImplementedError
+
+    def abort(self):
+        """Прерывает запись и удаляет неполный файл"""
+        raise NotImplementedError
+
+
+class OrderedSink(OutputSink):
+    """
+    Принимает сегменты в любом порядке и пишет их строго по номерам
+
+    Сегмент, пришедший раньше предыдущих, ждет в памяти, пока не будет
+    записан весь префикс. Запись идет сразу по мере скачивания, поэтому
+    после последнего сегмента файл уже готов.
+
+    Пример:
+        with OrderedFileSink('video.mp4') as sink:
+            sink.write(1, data1)
+            sink.write(0, data0)  # записываются 0 и 1
+    """
+
+    def __init__(self, output_path: str):
+        """
+        Args:
+            output_path: Путь к итоговому файлу
+        """
+        super().__init__(output_path)
+        self.next_index = 0
+        self._pending: Dict[int, bytes] = {}
+        self._pending_bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending_count(self) -> int:
+        """Количество сегментов, ожидающих записи"""
+        return len(self._pending)
+
+    @property
+    def pending_bytes(self) -> int:
+        return self._pending_bytes
+
+    def write(self, index: int, data: bytes):
+        with self._lock:
+            if index < self.next_index or index in self._pending:
+                return
+            self._pending[index] = data
+            self._pending_bytes += len(data)
+            while self.next_index in self._pending:
+                chunk = self._pending.pop(self.next_index)
+                self._pending_bytes -= len(chunk)
+                self._write(chunk)
+                self.bytes_written += len(chunk)
+                self.segment_sizes.append(len(chunk))
+                self.next_index += 1
+
+    def _write(self, data: bytes):
+        """Пишет очередной сегмент"""
+        raise NotImplementedError
+
+    def _check_complete(self):
+        """Проверяет, что не осталось сегментов, ожидающих предыдущих"""
+        if self._pending:
+            missing = self.next_index + 1
+            raise OutputSinkError(
+                f"Сегмент {missing} не получен, {len(self._pending)} сегментов не записаны"
+            )
+
+
+class OrderedFileSink(OrderedSink):
+    """
+    Пишет сегменты как есть (MPEG-TS склейка) в файл
+
+    Границы сегментов сохраняются в журнал рядом с файлом
+    (см. SegmentJournal) - по нему verify находит поврежденные сегменты.
+    """
+
+    RAW_OUTPUT = True
+    BUFFER_SIZE = 1024 * 1024
+
+    def __init__(self, output_path: str, preallocate: Optional[int] = None):
+        """
+        Args:
+            output_path: Путь к итоговому файлу
+            preallocate: Ожидаемый размер файла для выделения места заранее
+                (оценка; лишнее место обрезается при закрытии)
+        """
+        super().__init__(output_path)
+        self.preallocate = preallocate
+        self._file = None
+
+    def open(self):
+        try:
+            self._file = open(self.output_path, 'wb', buffering=self.BUFFER_SIZE)
+            if self.preallocate:
+                preallocate(self._file.fileno(), self.preallocate)
+        except OSError as e:
+            raise OutputSinkError(f"Не удалось открыть файл {self.output_path}: {e}")
+
+    def _write(self, data: bytes):
+        try:
+            self._file.write(data)
+        except OSError as e:
+            raise OutputSinkError(f"Ошибка записи файла: {e}")
+
+    def close(self):
+        if self._closed:
+            return
+        try:
+            self._check_complete()
+            if self.preallocate:
+                self._file.flush()
+                self._file.truncate(self.bytes_written)
+            self._file.close()
+        except OutputSinkError:
+            self.abort()
+            raise
+        except OSError as e:
+            self.abort()
+            raise OutputSinkError(f"Ошибка записи файла: {e}")
+        self._closed = True
+
+    def abort(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._file:
+            self._file.close()
+        _remove_quietly(self.output_path)
+
+
+class PositionalFileSink(OutputSink):
+    """
+    Пишет каждый сегмент сразу на его итоговое место (os.pwrite)
+
+    Размеры сегментов известны заранее (HEAD запросы), поэтому файл
+    выделяется целиком одним вызовом posix_fallocate, а сегменты не ждут
+    предыдущих в памяти. Если размер пришедшего сегмента не совпал с
+    ожидаемым, он дописывается во временный файл рядом с итоговым, и при
+    закрытии файл собирается заново одним последовательным проходом.
+    Такие сегменты не держатся в памяти, сколько бы их ни было.
+
+    Если закрыть файл не удалось, неполный файл удаляется.
+    """
+
+    RAW_OUTPUT = True
+    COPY_BUFFER = 4 * 1024 * 1024
+
+    def __init__(self, output_path: str, sizes: List[int]):
+        """
+        Args:
+            output_path: Путь к итоговому файлу
+            sizes: Ожидаемые размеры сегментов в байтах
+        """
+        super().__init__(output_path)
+        self.sizes = list(sizes)
+        self.offsets: List[int] = []
+        offset = 0
+        for size in self.sizes:
+            self.offsets.append(offset)
+            offset += size
+        self.total_size = offset
+        self.segment_sizes = list(self.sizes)
+        self._written = set()
+        # Номер сегмента -> (смещение, размер) во временном файле
+        self._mismatched: Dict[int, Tuple[int, int]] = {}
+        self._spill = None
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+
+    @staticmethod
+    def is_supported() -> bool:
+        """os.pwrite есть только на POSIX системах"""
+        return hasattr(os, 'pwrite')
+
+    def open(self):
+        try:
+            self._fd = os.open(self.output_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+            preallocate(self._fd, self.total_size)
+        except OSError as e:
+            raise OutputSinkError(f"Не удалось открыть файл {self.output_path}: {e}")
+
+    def write(self, index: int, data: bytes):
+        with self._lock:
+            if index in self._written:
+                return
+            self._written.add(index)
+            if len(data) != self.sizes[index]:
+                self._spill_segment(index, data)
+                self.segment_sizes[index] = len(data)
+                return
+
+        view = memoryview(data)
+        offset = self.offsets[index]
+        try:
+            while view:
+                written = os.pwrite(self._fd, view, offset)
+                view = view[written:]
+                offset += written
+        except OSError as e:
+            raise OutputSinkError(f"Ошибка записи файла: {e}")
+
+        with self._lock:
+            self.bytes_written += len(data)
+
+    def close(self):
+        if self._closed:
+            return
+
+        missing = len(self.sizes) - len(self._written)
+        try:
+            if missing:
+                raise OutputSinkError(f"Не получено сегментов: {missing}")
+            if self._mismatched:
+                self._relayout()
+        except OutputSinkError:
+            self.abort()
+            raise
+        self._closed = True
+        self._close_files()
+
+    def abort(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._close_files()
+        _remove_quietly(self.output_path)
+
+    def _close_files(self):
+        """Закрывает итоговый и временный файлы"""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        if self._spill:
+            self._spill.close()
+            self._spill = None
+
+    def _spill_segment(self, index: int, data: bytes):
+        """Дописывает сегмент неожиданного размера во временный файл (под self._lock)"""
+        try:
+            if self._spill is None:
+                directory = os.path.dirname(os.path.abspath(self.output_path))
+                self._spill = tempfile.TemporaryFile(dir=directory, prefix='.mismatched-')
+            offset = self._spill.seek(0, os.SEEK_END)
+            self._spill.write(data)
+        except OSError as e:
+            raise OutputSinkError(f"Ошибка записи временного файла: {e}")
+        self._mismatched[index] = (offset, len(data))
+
+    def _relayout(self):
+        """Собирает файл заново с фактическими размерами сегментов"""
+        temp_path = self.output_path + '.relayout'
+        try:
+            self._spill.flush()
+            spill_fd = self._spill.fileno()
+            with open(temp_path, 'wb') as target:
+                for index, (offset, size) in enumerate(zip(self.offsets, self.sizes)):
+                    fd = self._fd
+                    if index in self._mismatched:
+                        fd = spill_fd
+                        offset, size = self._mismatched[index]
+                    while size:
+                        chunk = os.pread(fd, min(size, self.COPY_BUFFER), offset)
+                        if not chunk:
+                            raise OutputSinkError("Неожиданный конец файла при пересборке")
+                        target.write(chunk)
+                        offset += len(chunk)
+                        size -= len(chunk)
+            os.replace(temp_path, self.output_path)
+        except OutputSinkError:
+            _remove_quietly(temp_path)
+            raise
+        except OSError as e:
+            _remove_quietly(temp_path)
+            raise OutputSinkError(f"Ошибка пересборки файла: {e}")
+        self.bytes_written = sum(self.segment_sizes)
+        self._mismatched.clear()
+
+
+class FFmpegSink(OrderedSink):
+    """
+    Перепаковывает MPEG-TS в MP4 на лету через ffmpeg
+
+    Сегменты подаются на stdin процесса `ffmpeg -f mpegts -i pipe:0 -c copy`,
+    который пишет фрагментированный MP4 (fMP4). Перекодирования нет, а
+    фрагментированный формат не требует второго прохода по файлу для
+    записи индекса (moov), поэтому итоговый MP4 готов вместе с последним
+    сегментом.
+    """
+
+    MOVFLAGS = '+frag_keyframe+empty_moov+default_base_moof'
+
+    def __init__(self, output_path: str, ffmpeg_path: Optional[str] = None):
+        """
+        Args:
+            output_path: Путь к итоговому MP4
+            ffmpeg_path: Путь к ffmpeg (по умолчанию ищется в PATH)
+        """
+        super().__init__(output_path)
+        self.ffmpeg_path = ffmpeg_path or shutil.which('ffmpeg')
+        self._process: Optional[subprocess.Popen] = None
+        self._stderr = None
+
+    @staticmethod
+    def is_available() -> bool:
+        """Проверяет, что ffmpeg установлен"""
+        return shutil.which('ffmpeg') is not None
+
+    def command(self) -> List[str]:
+        """Командная строка ffmpeg"""
+        return [
+            self.ffmpeg_path, '-hide_banner', '-loglevel', 'error', '-y',
+            '-f', 'mpegts', '-i', 'pipe:0',
+            '-map', '0', '-c', 'copy',
+            '-bsf:a', 'aac_adtstoasc',
+            '-movflags', self.MOVFLAGS,
+            '-f', 'mp4', self.output_path,
+        ]
+
+    def open(self):
+        if not self.ffmpeg_path:
+            raise OutputSinkError("ffmpeg не найден. Установите ffmpeg или уберите --remux")
+
+        # stderr во временный файл: канал мог бы заполниться и остановить ffmpeg
+        self._stderr = tempfile.TemporaryFile()
+        try:
+            self._process = subprocess.Popen(
+                self.command(),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=self._stderr
+            )
+        except OSError as e:
+            self._stderr.close()
+            raise OutputSinkError(f"Не удалось запустить ffmpeg: {e}")
+
+    def _write(self, data: bytes):
+        try:
+            self._process.stdin.write(data)
+        except (BrokenPipeError, OSError):
+            raise OutputSinkError(f"ffmpeg завершился с ошибкой: {self._read_stderr()}")
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        returncode = self._process.wait()
+        message = self._read_stderr()
+        self._stderr.close()
+
+        if returncode != 0:
+            _remove_quietly(self.output_path)
+            raise OutputSinkError(f"ffmpeg завершился с кодом {returncode}: {message}")
+        try:
+            self._check_complete()
+        except OutputSinkError:
+            _remove_quietly(self.output_path)
+            raise
+
+    def abort(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._process:
+            self._process.kill()
+            self._process.wait()
+            try:
+                self._process.stdin.close()
+            except OSError:
+                pass
+        if self._stderr:
+            self._stderr.close()
+        _remove_quietly(self.output_path)
+
+    def _read_stderr(self) -> str:
+        """Последние строки вывода ffmpeg"""
+        self._stderr.seek(0)
+        lines = self._stderr.read().decode('utf-8', errors='replace').strip().splitlines()
+        return '; '.join(lines[-3:]) or 'нет вывода'
+
+
+def create_sink(output_path: str, remux: bool = False, sizes: Optional[List[int]] = None,
+                estimated_size: Optional[int] = None) -> OutputSink:
+    """
+    Выбирает приемник для скачиваемого видео
+
+    Args:
+        output_path: Путь к итоговому файлу
+        remux: Перепаковывать MPEG-TS в MP4 через ffmpeg
+        sizes: Точные размеры сегментов (запись сразу на свои места)
+        estimated_size: Оценка размера файла для выделения места заранее
+
+    Returns:
+        FFmpegSink, PositionalFileSink или OrderedFileSink
+    """
+    if remux:
+        return FFmpegSink(output_path)
+    if sizes and PositionalFileSink.is_supported():
+        return PositionalFileSink(output_path, sizes)
+    return OrderedFileSink(output_path, preallocate=estimated_size)
+
+
+def preallocate(fd: int, size: int):
+    """
+    Выделяет место под файл заранее (меньше фрагментация на HDD)
+
+    Если файловая система не поддерживает fallocate, файл просто
+    расширяется до нужного размера.
+    """
+    if size <= 0:
+        return
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return
+        except OSError:
+            pass
+    os.ftruncate(fd, size)
+
+
+def _remove_quietly(path: str):
+    """Удаляет файл, игнорируя ошибки"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
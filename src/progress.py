@@ -1,77 +1,244 @@
 """ProgressTracker для отображения прогресса скачивания"""
 
 import sys
-from typing import Optional
+import time
+import threading
+from typing import List, Optional, TextIO
+
+
+def format_bytes(size: float) -> str:
+    """Размер в удобных единицах: 512 КБ, 3.4 МБ, 1.20 ГБ"""
+    if size >= 1024 ** 3:
+        return f"{size / 1024 ** 3:.2f} ГБ"
+    if size >= 1024 ** 2:
+        return f"{size / 1024 ** 2:.1f} МБ"
+    return f"{size / 1024:.0f} КБ"
+
+
+def format_duration(seconds: float) -> str:
+    """Длительность в виде M:SS или H:MM:SS"""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
 
 
 class ProgressTracker:
-    """Отслеживает и отображает прогресс скачивания"""
-    
-    def __init__(self, total: int, description: str = "Скачивание"):
+    """
+    Отслеживает и отображает прогресс скачивания
+
+    Рабочие потоки только увеличивают собственные счетчики (без блокировок
+    и без вывода), а отрисовкой занимается отдельный поток несколько раз
+    в секунду. Скорость - экспоненциальное скользящее среднее байт/с,
+    по ней считается оставшееся время.
+
+    Если вывод не терминал (перенаправлен в файл или лог), вместо
+    перерисовки строки печатаются отдельные строки раз в LOG_INTERVAL секунд.
+
+    Пример:
+        progress = ProgressTracker(len(urls), "Скачивание", total_bytes)
+        progress.start()
+        ...
+        progress.update(nbytes=len(data))  # из любого потока
+        ...
+        progress.complete("Готово")
+    """
+
+    RENDER_INTERVAL = 0.25  # секунды между перерисовками в терминале
+    LOG_INTERVAL = 10.0  # секунды между строками в не-терминальном выводе
+    RATE_SMOOTHING = 0.3  # вес нового замера в скользящем среднем скорости
+    BAR_LENGTH = 30
+
+    def __init__(self, total: int, description: str = "Скачивание",
+                 total_bytes: Optional[int] = None, stream: Optional[TextIO] = None):
         """
         Инициализирует трекер прогресса
-        
+
         Args:
             total: Общее количество элементов
             description: Описание процесса
+            total_bytes: Общий объем в байтах, если известен заранее
+            stream: Куда выводить прогресс (по умолчанию - sys.stdout)
         """
         self.total = total
-        self.current = 0
         self.description = description
-        
-    def update(self, current: Optional[int] = None):
-        """
-        Обновляет отображение прогресса
-        
-        Args:
-            current: Текущее значение (если None, увеличивает на 1)
-        """
-        if current is not None:
-            self.current = current
-        else:
-            self.current += 1
-        
-        percentage = self._calculate_percentage()
-        self._display(percentage)
-    
-    def _calculate_percentage(self) -> float:
-        """
-        Вычисляет процент выполнения
-        
-        Returns:
-            Процент от 0 до 100
-        """
-        if self.total == 0:
-            return 100.0
-        
-        percentage = (self.current / self.total) * 100
-        return min(100.0, max(0.0, percentage))
-    
-    def _display(self, percentage: float):
+        self.total_bytes = total_bytes
+        self.stream = stream
+
+        self.rate = 0.0  # байт/с, скользящее среднее
+        self._cells: List[List[int]] = []
+        self._local = threading.local()
+        self._stop = threading.Event()
+        self._ticker: Optional[threading.Thread] = None
+        self._started_at = None
+        self._last_sample = (0.0, 0)
+        self._last_log = 0.0
+        self._line_length = 0
+        self._finished = False
+
+    @property
+    def current(self) -> int:
+        """Количество завершенных элементов"""
+        return sum(cell[0] for cell in list(self._cells))
+
+    @property
+    def bytes_done(self) -> int:
+        """Количество полученных байт"""
+        return sum(cell[1] for cell in list(self._cells))
+
+    def start(self):
+        """Запускает поток отрисовки"""
+        if self._ticker is not None:
+            return
+        self._started_at = time.monotonic()
+        self._last_sample = (self._started_at, 0)
+        self._last_log = self._started_at
+        self._ticker = threading.Thread(target=self._run, name='progress', daemon=True)
+        self._ticker.start()
+
+    def stop(self):
+        """Останавливает поток отрисовки и выводит итоговое состояние"""
+        if self._finished:
+            return
+        self._finished = True
+        self._stop.set()
+        if self._ticker is not None:
+            self._ticker.join()
+        self._render(final=True)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def update(self, nbytes: int = 0, count: int = 1):
         """
-        Отображает прогресс в консоли
-        
+        Учитывает завершенные элементы и полученные байты
+
+        Безопасно вызывать из любого потока: каждый поток увеличивает
+        только свой счетчик, вывода здесь нет.
+
         Args:
-            percentage: Процент выполнения
+            nbytes: Сколько байт добавилось
+            count: Сколько элементов завершено (0 - только байты)
         """
-        bar_length = 40
-        filled_length = int(bar_length * percentage / 100)
-        bar = '█' * filled_length + '░' * (bar_length - filled_length)
-        
-        sys.stdout.write(
-            f'\r{self.description}: [{bar}] {self.current}/{self.total} ({percentage:.1f}%)'
-        )
-        sys.stdout.flush()
-        
-        if self.current >= self.total:
-            sys.stdout.write('\n')
-            sys.stdout.flush()
-    
+        cell = getattr(self._local, 'cell', None)
+        if cell is None:
+            cell = self._local.cell = [0, 0]
+            self._cells.append(cell)
+        cell[0] += count
+        cell[1] += nbytes
+
     def complete(self, message: str = "Завершено успешно!"):
         """
         Отображает сообщение о завершении
-        
+
         Args:
             message: Сообщение о завершении
         """
+        self.stop()
         print(f"\n✓ {message}")
+
+    def _run(self):
+        """Поток отрисовки"""
+        while not self._stop.wait(self.RENDER_INTERVAL):
+            self._render()
+
+    def _output(self) -> TextIO:
+        return self.stream if self.stream is not None else sys.stdout
+
+    def _sample_rate(self, now: float, done_bytes: int):
+        """Обновляет скользящее среднее скорости"""
+        last_time, last_bytes = self._last_sample
+        elapsed = now - last_time
+        if elapsed <= 0:
+            return
+        instant = (done_bytes - last_bytes) / elapsed
+        if self.rate:
+            self.rate += self.RATE_SMOOTHING * (instant - self.rate)
+        else:
+            self.rate = instant
+        self._last_sample = (now, done_bytes)
+
+    def _calculate_percentage(self, current: int, done_bytes: int) -> float:
+        """
+        Вычисляет процент выполнения (по байтам, если их общий объем известен)
+
+        Returns:
+            Процент от 0 до 100
+        """
+        if self.total_bytes:
+            percentage = done_bytes / self.total_bytes * 100
+        elif self.total:
+            percentage = current / self.total * 100
+        else:
+            return 100.0
+        return min(100.0, max(0.0, percentage))
+
+    def _eta(self, current: int, done_bytes: int) -> Optional[float]:
+        """Оставшееся время в секундах или None, если оценить нельзя"""
+        if self.rate <= 0:
+            return None
+        if self.total_bytes:
+            remaining = self.total_bytes - done_bytes
+        elif current and self.total:
+            # Средний размер уже скачанных элементов
+            remaining = done_bytes / current * (self.total - current)
+        else:
+            return None
+        return max(0.0, remaining / self.rate)
+
+    def _render(self, final: bool = False):
+        """Отображает прогресс в консоли"""
+        if self._started_at is None:
+            return
+        now = time.monotonic()
+        current = self.current
+        done_bytes = self.bytes_done
+        self._sample_rate(now, done_bytes)
+
+        percentage = self._calculate_percentage(current, done_bytes)
+        parts = []
+        if self.total > 1:
+            parts.append(f"{current}/{self.total}")
+        if self.total_bytes:
+            parts.append(f"{format_bytes(done_bytes)}/{format_bytes(self.total_bytes)}")
+        elif done_bytes:
+            parts.append(format_bytes(done_bytes))
+
+        if final:
+            elapsed = now - self._started_at
+            if elapsed > 0 and done_bytes:
+                parts.append(f"{format_bytes(done_bytes / elapsed)}/с в среднем")
+            parts.append(f"за {format_duration(elapsed)}")
+        else:
+            if self.rate > 0:
+                parts.append(f"{format_bytes(self.rate)}/с")
+            eta = self._eta(current, done_bytes)
+            if eta is not None:
+                parts.append(f"осталось {format_duration(eta)}")
+        status = ' '.join(parts)
+
+        stream = self._output()
+        try:
+            interactive = stream.isatty()
+        except (AttributeError, ValueError):
+            interactive = False
+
+        if interactive:
+            filled_length = int(self.BAR_LENGTH * percentage / 100)
+            bar = '█' * filled_length + '░' * (self.BAR_LENGTH - filled_length)
+            line = f"{self.description}: [{bar}] {percentage:5.1f}% {status}"
+            padding = ' ' * max(0, self._line_length - len(line))
+            self._line_length = len(line)
+            stream.write(f"\r{line}{padding}" + ('\n' if final else ''))
+            stream.flush()
+        elif final or now - self._last_log >= self.LOG_INTERVAL:
+            self._last_log = now
+            stream.write(f"{self.description}: {percentage:.1f}% {status}\n")
+            stream.flush()
@@ -0,0 +1,265 @@
+"""SegmentCache - локальный кэш сегментов, общий для всех запусков"""
+
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Iterable, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_objects_last_used ON objects (last_used);
+
+CREATE TABLE IF NOT EXISTS urls (
+    url_key TEXT PRIMARY KEY,
+    digest TEXT NOT NULL REFERENCES objects (digest) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_urls_digest ON urls (digest);
+"""
+
+# Параметры подписанных ссылок CDN, которые меняются между запусками,
+# но не влияют на содержимое сегмента. Только известные схемы подписи:
+# общие имена (token, e, hash, sid) бывают и выбором содержимого, а два
+# разных сегмента с одним ключом кэша испортили бы видео. Параметры
+# конкретного сервера добавляются через SegmentCache(volatile_params=...).
+VOLATILE_PARAMS = {'hdnts', 'hdnea', '__token__'}  # Akamai EdgeAuth
+VOLATILE_PREFIXES = ('x-amz-', 'x-goog-')  # S3 и GCS presigned URL
+# Подпись CloudFront удаляется, только если есть вся подпись целиком
+CLOUDFRONT_PARAMS = {'policy', 'expires', 'signature', 'key-pair-id'}
+CLOUDFRONT_REQUIRED = {'signature', 'key-pair-id'}
+
+SIZE_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)B?\s*$', re.IGNORECASE)
+SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+
+class SegmentCacheError(Exception):
+    """Ошибка кэша сегментов"""
+    pass
+
+
+def normalize_url(url: str, volatile_params: Iterable[str] = ()) -> str:
+    """
+    Ключ кэша для URL сегмента
+
+    Схема и хост приводятся к нижнему регистру, порт по умолчанию и
+    фрагмент отбрасываются, параметры подписи CDN удаляются, остальные
+    параметры сортируются.
+
+    Args:
+        url: URL сегмента
+        volatile_params: Дополнительные параметры, не влияющие на содержимое
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and not (scheme == 'http' and parts.port == 80 or scheme == 'https' and parts.port == 443):
+        host = f"{host}:{parts.port}"
+
+    params = parse_qsl(parts.query, keep_blank_values=True)
+    volatile = VOLATILE_PARAMS | {name.lower() for name in volatile_params}
+    if CLOUDFRONT_REQUIRED <= {key.lower() for key, _ in params}:
+        volatile |= CLOUDFRONT_PARAMS
+    query = sorted(
+        (key, value) for key, value in params
+        if key.lower() not in volatile and not key.lower().startswith(VOLATILE_PREFIXES)
+    )
+    return urlunsplit((scheme, host, parts.path or '/', urlencode(query), ''))
+
+
+def parse_size(value: str) -> int:
+    """
+    Разбирает размер вида "500M", "20G", "1.5T" или число байт
+
+    Raises:
+        ValueError: Если строка не является размером
+    """
+    match = SIZE_PATTERN.match(str(value))
+    if not match:
+        raise ValueError(f"Некорректный размер: {value}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+
+
+class SegmentCache:
+    """
+    Кэш сегментов на диске с вытеснением давно не использованных (LRU)
+
+    Содержимое хранится по SHA-256 (objects/ab/abcd...), поэтому одинаковые
+    сегменты под разными URL занимают место один раз. Индекс - SQLite база
+    в режиме WAL, так что кэшем могут одновременно пользоваться несколько
+    процессов.
+    """
+
+    DEFAULT_MAX_SIZE = 20 * 1024 ** 3
+    INDEX_NAME = 'index.db'
+
+    def __init__(self, cache_dir: str, max_size: int = DEFAULT_MAX_SIZE, verify: bool = True,
+                 volatile_params: Iterable[str] = ()):
+        """
+        Args:
+            cache_dir: Директория кэша (создается при необходимости)
+            max_size: Максимальный размер содержимого в байтах
+            verify: Проверять SHA-256 при чтении
+            volatile_params: Параметры URL, которые меняются между запусками,
+                но не влияют на содержимое (в дополнение к VOLATILE_PARAMS)
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.verify = verify
+        self.volatile_params = frozenset(name.lower() for name in volatile_params)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        try:
+            os.makedirs(os.path.join(cache_dir, 'objects'), exist_ok=True)
+            self.connection = sqlite3.connect(os.path.join(cache_dir, self.INDEX_NAME),
+                                              check_same_thread=False, timeout=30)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.execute('PRAGMA foreign_keys=ON')
+            self.connection.executescript(SCHEMA)
+        except (OSError, sqlite3.Error) as e:
+            raise SegmentCacheError(f"Не удалось открыть кэш {cache_dir}: {e}")
+
+    def close(self):
+        """Закрывает индекс"""
+        self.connection.close()
+
+    def __enter__(self) -> 'SegmentCache':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def total_size(self) -> int:
+        """Размер содержимого кэша в байтах"""
+        with self._lock:
+            return self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM objects').fetchone()[0]
+
+    def get(self, url: str) -> Optional[bytes]:
+        """
+        Возвращает сегмент из кэша
+
+        Returns:
+            Содержимое или None, если сегмента нет (или он поврежден)
+        """
+        key = normalize_url(url, self.volatile_params)
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT o.digest, o.size FROM urls u JOIN objects o ON o.digest = u.digest WHERE u.url_key = ?',
+                (key,)
+            ).fetchone()
+        if row is None:
+            self._count(hit=False)
+            return None
+
+        digest, size = row
+        try:
+            with open(self._object_path(digest), 'rb') as f:
+                data = f.read()
+        except OSError:
+            data = None
+
+        if data is None or len(data) != size or (self.verify and hashlib.sha256(data).hexdigest() != digest):
+            self._forget(digest)
+            self._count(hit=False)
+            return None
+
+        with self._lock, self.connection:
+            self.connection.execute('UPDATE objects SET last_used = ? WHERE digest = ?', (time.time(), digest))
+        self._count(hit=True)
+        return data
+
+    def put(self, url: str, data: bytes) -> str:
+        """
+        Сохраняет сегмент и при необходимости вытесняет старые
+
+        Returns:
+            SHA-256 содержимого
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+
+        with self._lock, self.connection:
+            self.connection.execute(
+                'INSERT INTO objects (digest, size, last_used) VALUES (?, ?, ?) '
+                'ON CONFLICT (digest) DO UPDATE SET last_used = excluded.last_used',
+                (digest, len(data), time.time())
+            )
+            self.connection.execute(
+                'INSERT INTO urls (url_key, digest) VALUES (?, ?) '
+                'ON CONFLICT (url_key) DO UPDATE SET digest = excluded.digest',
+                (normalize_url(url, self.volatile_params), digest)
+            )
+
+        self.evict()
+        return digest
+
+    def evict(self, max_size: Optional[int] = None) -> Tuple[int, int]:
+        """
+        Удаляет давно не использованные сегменты, пока кэш больше лимита
+
+        Returns:
+            (количество удаленных сегментов, освобождено байт)
+        """
+        limit = self.max_size if max_size is None else max_size
+        removed = freed = 0
+
+        with self._lock:
+            total = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM objects').fetchone()[0]
+            if total <= limit:
+                return (0, 0)
+
+            victims = []
+            for digest, size in self.connection.execute('SELECT digest, size FROM objects ORDER BY last_used'):
+                if total - freed <= limit:
+                    break
+                victims.append(digest)
+                freed += size
+
+            with self.connection:
+                self.connection.executemany('DELETE FROM objects WHERE digest = ?', [(d,) for d in victims])
+            removed = len(victims)
+
+        for digest in victims:
+            try:
+                os.remove(self._object_path(digest))
+            except OSError:
+                pass
+
+        return (removed, freed)
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _forget(self, digest: str):
+        """Удаляет поврежденную запись"""
+        with self._lock, self.connection:
+            self.connection.execute('DELETE FROM objects WHERE digest = ?', (digest,))
+        try:
+            os.remove(self._object_path(digest))
+        except OSError:
+            pass
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, 'objects', digest[:2], digest)
@@ -0,0 +1,139 @@
+"""SegmentJournal - границы сегментов внутри скачанного файла"""
+
+import os
+import json
+from dataclasses import dataclass
+from bisect import bisect_right
+from typing import List, Optional, Tuple
+
+
+class SegmentJournalError(Exception):
+    """Ошибка чтения журнала сегментов"""
+    pass
+
+
+@dataclass
+class SegmentEntry:
+    """Сегмент в итоговом файле"""
+    url: str
+    offset: int
+    size: int
+
+    @property
+    def end(self) -> int:
+        return self.offset + self.size
+
+
+class SegmentJournal:
+    """
+    Журнал "номер сегмента -> URL и диапазон байт в файле"
+
+    Сохраняется рядом с видео (<видео>.segments.json) и позволяет
+    проверке целостности найти и перекачать только поврежденные сегменты.
+
+    Формат файла:
+        {"version": 1, "segments": [{"url": "...", "offset": 0, "size": 1880}, ...]}
+    """
+
+    VERSION = 1
+    SUFFIX = '.segments.json'
+
+    def __init__(self, entries: List[SegmentEntry]):
+        self.entries = entries
+        self._offsets = [entry.offset for entry in entries]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __getitem__(self, index: int) -> SegmentEntry:
+        return self.entries[index]
+
+    @property
+    def total_size(self) -> int:
+        """Ожидаемый размер файла"""
+        return self.entries[-1].end if self.entries else 0
+
+    @classmethod
+    def path_for(cls, output_path: str) -> str:
+        """Путь к журналу для файла видео"""
+        return output_path + cls.SUFFIX
+
+    @classmethod
+    def from_sizes(cls, urls: List[str], sizes: List[int]) -> 'SegmentJournal':
+        """
+        Строит журнал по размерам сегментов в порядке записи
+
+        Args:
+            urls: URL сегментов
+            sizes: Размеры сегментов в байтах
+        """
+        entries = []
+        offset = 0
+        for url, size in zip(urls, sizes):
+            entries.append(SegmentEntry(url=url, offset=offset, size=size))
+            offset += size
+        return cls(entries)
+
+    @classmethod
+    def load(cls, path: str) -> 'SegmentJournal':
+        """
+        Читает журнал
+
+        Raises:
+            SegmentJournalError: Если файл отсутствует или поврежден
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            entries = [SegmentEntry(url=item['url'], offset=int(item['offset']), size=int(item['size']))
+                       for item in data['segments']]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            raise SegmentJournalError(f"Не удалось прочитать журнал сегментов {path}: {e}")
+        return cls(entries)
+
+    @classmethod
+    def find(cls, output_path: str) -> Optional['SegmentJournal']:
+        """Читает журнал рядом с видео, если он есть"""
+        path = cls.path_for(output_path)
+        if not os.path.exists(path):
+            return None
+        return cls.load(path)
+
+    def save(self, path: str):
+        """Сохраняет журнал (атомарно, через временный файл)"""
+        data = {
+            'version': self.VERSION,
+            'segments': [
+                {'url': entry.url, 'offset': entry.offset, 'size': entry.size}
+                for entry in self.entries
+            ],
+        }
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(temp_path, path)
+
+    def segments_in_range(self, start: int, end: int) -> range:
+        """
+        Номера сегментов, пересекающихся с диапазоном байт [start, end)
+
+        Returns:
+            Диапазон номеров (пустой, если диапазон вне файла)
+        """
+        if not self.entries or end <= start:
+            return range(0)
+        first = max(0, bisect_right(self._offsets, start) - 1)
+        last = bisect_right(self._offsets, end - 1) - 1
+        return range(first, last + 1)
+
+    def replace_sizes(self, new_sizes: List[Tuple[int, int]]) -> 'SegmentJournal':
+        """
+        Возвращает журнал с новыми размерами сегментов (после починки)
+
+        Args:
+            new_sizes: Пары (номер сегмента, новый размер)
+        """
+        sizes = [entry.size for entry in self.entries]
+        for index, size in new_sizes:
+            sizes[index] = size
+        return self.from_sizes([entry.url for entry in self.entries], sizes)
@@ -0,0 +1,74 @@
+"""SizeProbe - размеры сегментов до начала скачивания"""
+
+import requests
+from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+from .m3u8_parser import Segment
+
+
+class SizeProbe:
+    """
+    Узнает точные размеры сегментов HEAD запросами через общую сессию
+
+    Запросы идут параллельно и переиспользуют соединения пула, поэтому
+    проход по тысячам сегментов занимает секунды. Если сервер не отдает
+    Content-Length хотя бы для одного сегмента, точные размеры неизвестны.
+    """
+
+    DEFAULT_WORKERS = 16
+    TIMEOUT = 15
+
+    def __init__(self, session: requests.Session, max_workers: int = DEFAULT_WORKERS):
+        """
+        Args:
+            session: Сессия с пулом соединений (та же, что для скачивания)
+            max_workers: Количество параллельных HEAD запросов
+        """
+        self.session = session
+        self.max_workers = max(1, max_workers)
+
+    def probe(self, urls: List[str]) -> Optional[List[int]]:
+        """
+        Запрашивает размеры всех сегментов
+
+        Returns:
+            Размеры в порядке urls или None, если хотя бы один неизвестен
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            sizes = list(executor.map(self._content_length, urls))
+        if any(size is None for size in sizes):
+            return None
+        return sizes
+
+    def _content_length(self, url: str) -> Optional[int]:
+        try:
+            response = self.session.head(url, timeout=self.TIMEOUT, allow_redirects=True)
+            response.raise_for_status()
+        except requests.RequestException:
+            return None
+        # Размер сжатого при передаче тела не совпадет с размером сегмента
+        if response.headers.get('Content-Encoding', 'identity').lower() != 'identity':
+            return None
+        try:
+            size = int(response.headers['Content-Length'])
+        except (KeyError, ValueError):
+            return None
+        return size if size > 0 else None
+
+    @staticmethod
+    def estimate_total(segments: List[Segment], bandwidth: Optional[int]) -> Optional[int]:
+        """
+        Оценка размера файла как BANDWIDTH x сумма #EXTINF
+
+        Args:
+            segments: Сегменты медиа-плейлиста
+            bandwidth: BANDWIDTH выбранного варианта (бит/с) из master playlist
+
+        Returns:
+            Размер в байтах или None, если оценить нельзя
+        """
+        duration = sum(segment.duration for segment in segments)
+        if not bandwidth or duration <= 0:
+            return None
+        return int(bandwidth * duration / 8)
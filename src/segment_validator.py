@@ -0,0 +1,145 @@
+"""SegmentValidator - проверка сегмента сразу после скачивания"""
+
+import base64
+import hashlib
+from typing import Mapping, Optional
+
+
+TS_PACKET_SIZE = 188
+TS_SYNC_BYTE = 0x47
+
+# Типы боксов, с которых может начинаться сегмент fMP4 (CMAF)
+FMP4_BOX_TYPES = {b'ftyp', b'styp', b'moof', b'moov', b'sidx', b'emsg', b'prft', b'mdat'}
+
+ID3_HEADER_SIZE = 10
+
+
+class SegmentValidationError(Exception):
+    """Скачанный сегмент поврежден или не является видео"""
+    pass
+
+
+class SegmentValidator:
+    """
+    Дешевые проверки ответа сервера на запрос сегмента
+
+    - длина тела совпадает с Content-Length (обрезанный ответ);
+    - тело начинается с сигнатуры MPEG-TS (0x47 каждые 188 байт),
+      fMP4 (бокс ftyp/styp/moof/...), ID3 + TS/ADTS или ADTS -
+      страница ошибки CDN со статусом 200 не пройдет;
+    - MD5 совпадает с Content-MD5 или x-goog-hash, если сервер их отдает.
+
+    В HLS нет стандартного тега с контрольной суммой сегмента, поэтому
+    суммы берутся из заголовков ответа.
+    """
+
+    def __init__(self, check_format: bool = True, check_checksum: bool = True):
+        """
+        Args:
+            check_format: Проверять сигнатуру формата (отключается для
+                зашифрованных сегментов #EXT-X-KEY)
+            check_checksum: Проверять MD5 из заголовков ответа
+        """
+        self.check_format = check_format
+        self.check_checksum = check_checksum
+
+    def validate(self, data: bytes, headers: Optional[Mapping[str, str]] = None):
+        """
+        Проверяет сегмент
+
+        Args:
+            data: Тело ответа
+            headers: Заголовки ответа (регистронезависимый словарь requests)
+
+        Raises:
+            SegmentValidationError: Если сегмент не прошел проверку
+        """
+        headers = headers or {}
+        if not data:
+            raise SegmentValidationError("пустой ответ")
+
+        self._check_length(data, headers)
+        if self.check_format:
+            self._check_format(data, headers)
+        if self.check_checksum:
+            self._check_md5(data, headers)
+
+    @staticmethod
+    def _check_length(data: bytes, headers: Mapping[str, str]):
+        """Сверяет длину с Content-Length (если тело не было сжато при передаче)"""
+        declared = headers.get('Content-Length')
+        encoding = headers.get('Content-Encoding', 'identity').lower()
+        if declared is None or encoding != 'identity':
+            return
+        try:
+            declared = int(declared)
+        except ValueError:
+            return
+        if len(data) != declared:
+            raise SegmentValidationError(f"получено {len(data)} байт из {declared} (Content-Length)")
+
+    def _check_format(self, data: bytes, headers: Mapping[str, str]):
+        """
+        Проверяет, что тело - MPEG-TS, fMP4 или аудио, а не страница ошибки
+
+        Решает сигнатура тела: Content-Type используется только для
+        сообщения об ошибке, если тело не похоже на медиа. Серверы отдают
+        .ts с типом из таблиц mime.types (text/vnd.trolltech.linguist -
+        файлы переводов Qt), и такой сегмент не должен отбрасываться.
+        """
+        body = self._skip_id3(data) if data[:3] == b'ID3' else data
+
+        if body[:1] == bytes([TS_SYNC_BYTE]):
+            self._check_ts(body)
+            return
+        if body[4:8] in FMP4_BOX_TYPES:
+            return
+        if len(body) >= 2 and body[0] == 0xFF and body[1] & 0xF0 == 0xF0:
+            return  # ADTS (аудио-сегменты)
+
+        content_type = headers.get('Content-Type', '').lower()
+        if content_type.startswith(('text/', 'application/json')) or data.lstrip()[:1] in (b'<', b'{'):
+            raise SegmentValidationError(
+                f"вместо видео получен текст ({content_type or 'без Content-Type'}): {data[:60]!r}"
+            )
+        raise SegmentValidationError(f"неизвестный формат сегмента (начало: {body[:8].hex()})")
+
+    @staticmethod
+    def _check_ts(data: bytes):
+        """Синхробайт в начале каждого 188-байтного пакета"""
+        if len(data) % TS_PACKET_SIZE:
+            raise SegmentValidationError(
+                f"размер {len(data)} не кратен {TS_PACKET_SIZE} - последний пакет обрезан"
+            )
+        if data[::TS_PACKET_SIZE].strip(bytes([TS_SYNC_BYTE])):
+            raise SegmentValidationError("потеря синхронизации MPEG-TS внутри сегмента")
+
+    @staticmethod
+    def _skip_id3(data: bytes) -> bytes:
+        """Пропускает ID3 тег (размер - syncsafe integer)"""
+        if len(data) < ID3_HEADER_SIZE:
+            raise SegmentValidationError("обрезанный ID3 тег")
+        size = 0
+        for byte in data[6:10]:
+            size = (size << 7) | (byte & 0x7F)
+        return data[ID3_HEADER_SIZE + size:]
+
+    @staticmethod
+    def _check_md5(data: bytes, headers: Mapping[str, str]):
+        """Сверяет MD5 с Content-MD5 или x-goog-hash: md5=..."""
+        expected = headers.get('Content-MD5')
+        if not expected:
+            for part in headers.get('x-goog-hash', '').split(','):
+                name, _, value = part.strip().partition('=')
+                if name == 'md5':
+                    expected = value
+                    break
+        if not expected:
+            return
+
+        try:
+            expected_digest = base64.b64decode(expected.strip(), validate=True)
+        except ValueError:
+            return
+        if hashlib.md5(data).digest() != expected_digest:
+            raise SegmentValidationError("MD5 сегмента не совпадает с заголовком ответа")
@@ -0,0 +1 @@
+"""Локальные серверы-заглушки для тестов и бенчмарков"""
@@ -0,0 +1,115 @@
+"""ChatReplayServer - локальный сервер, воспроизводящий записанные ответы API чата"""
+
+import os
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qsl
+
+
+class ChatReplayServer:
+    """
+    Отдает записанные JSON-ответы по пути и параметрам запроса
+
+    Запись - это словарь {'path': ..., 'query': {...}, 'status': 200, 'body': ...}.
+    Запрос совпадает с записью, если путь равен и все параметры записи
+    присутствуют в запросе с теми же значениями.
+
+    Пример:
+        with ChatReplayServer.from_directory('recordings') as server:
+            client = HyperCommentsClient('123', base_url=server.base_url)
+            messages = client.fetch_history('event')
+    """
+
+    def __init__(self, records: List[Dict[str, Any]], host: str = '127.0.0.1', port: int = 0):
+        """
+        Args:
+            records: Список записей ответов
+            host: Адрес для прослушивания
+            port: Порт (0 - выбрать свободный)
+        """
+        self.records = records
+        self.requests_log: List[Tuple[str, Dict[str, str]]] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_directory(cls, directory: str, **kwargs) -> 'ChatReplayServer':
+        """
+        Загружает записи из *.json файлов директории
+
+        Args:
+            directory: Директория с записями (например, record_dir клиента)
+        """
+        records = []
+        for name in sorted(os.listdir(directory)):
+            if name.endswith('.json'):
+                with open(os.path.join(directory, name), encoding='utf-8') as f:
+                    records.append(json.load(f))
+        return cls(records, **kwargs)
+
+    @property
+    def base_url(self) -> str:
+        """Базовый URL сервера"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'ChatReplayServer':
+        """Запускает сервер в фоновом потоке"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Останавливает сервер"""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> 'ChatReplayServer':
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def find_record(self, path: str, query: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """Ищет запись, соответствующую запросу"""
+        for record in self.records:
+            if record.get('path') != path:
+                continue
+            expected = record.get('query') or {}
+            if all(query.get(key) == str(value) for key, value in expected.items()):
+                return record
+        return None
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                query = dict(parse_qsl(parts.query))
+                with server._lock:
+                    server.requests_log.append((parts.path, query))
+
+                record = server.find_record(parts.path, query)
+                if record is None:
+                    status, body = 404, {'result': 'error', 'description': 'no recording'}
+                else:
+                    status, body = record.get('status', 200), record.get('body')
+
+                payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,434 @@
+"""HLSStandInServer - локальный HLS сервер с синтетическими сегментами"""
+
+import time
+import random
+import socket
+import struct
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+TS_PACKET_SIZE = 188
+TS_PAYLOAD_SIZE = 184
+PAYLOAD_PID = 0x100
+# Число пакетов сегмента кратно 16, поэтому счетчик непрерывности
+# продолжается между сегментами без разрывов
+CC_PERIOD = 16
+# Пауза между пакетами при капельной отдаче - заметно меньше таймаута чтения клиента
+STALL_INTERVAL = 0.5
+
+
+@dataclass
+class HLSConfig:
+    """Параметры синтетического потока и поведения сервера"""
+    segments: int = 100
+    segment_size: int = 1024 * 1024  # байт (округляется до целого числа пакетов)
+    segment_duration: float = 4.0  # секунды #EXTINF
+    latency: float = 0.0  # задержка перед ответом на сегмент (секунды)
+    jitter: float = 0.0  # случайная добавка к задержке, 0..jitter (секунды)
+    bandwidth: Optional[int] = None  # ограничение скорости одного ответа (байт/с)
+    error_rate: float = 0.0  # доля ответов 503 на запрос сегмента
+    truncate_rate: float = 0.0  # доля ответов, оборванных на середине тела
+    reset_rate: float = 0.0  # доля соединений, сброшенных (RST) на середине тела
+    stall_rate: float = 0.0  # доля ответов, тело которых сначала отдается по пакету (slow loris)
+    stall: float = 5.0  # длительность капельной отдачи (секунды)
+    burst_status: int = 503  # статус ответов во время всплеска ошибок
+    burst_every: Optional[float] = None  # период всплесков ошибок (секунды)
+    burst_length: float = 0.0  # длительность всплеска (секунды)
+    edges: int = 1  # число узлов CDN, сегмент i отдает узел i % edges
+    dark_edge: Optional[int] = None  # узел, который перестает отвечать
+    dark_after: float = 0.0  # когда узел отключается (секунды)
+    dark_for: Optional[float] = None  # на сколько отключается (None - до остановки сервера)
+    live: bool = False  # живой плейлист: скользящее окно без #EXT-X-ENDLIST
+    live_window: int = 10  # сегментов в окне живого плейлиста
+    live_advance: Optional[float] = None  # окно сдвигается на сегмент раз в столько секунд (по умолчанию segment_duration)
+    live_purge: float = 5.0  # через сколько секунд вышедший из окна сегмент удаляется (404)
+    variants: Sequence[int] = (800_000, 2_500_000)  # BANDWIDTH вариантов master playlist
+    seed: int = 1
+
+    @property
+    def packets_per_segment(self) -> int:
+        packets = max(CC_PERIOD, self.segment_size // TS_PACKET_SIZE)
+        return packets - packets % CC_PERIOD
+
+    @property
+    def actual_segment_size(self) -> int:
+        return self.packets_per_segment * TS_PACKET_SIZE
+
+
+class HLSStandInServer:
+    """
+    Отдает master/media плейлисты и MPEG-TS сегменты, созданные на лету
+
+    Пути:
+        /w/<event_id>             - страница события со ссылкой на master playlist
+                                    (для download_video, см. VideoMetadataExtractor.BASE_URL)
+        /master.m3u8              - master playlist с вариантами config.variants
+        /v<N>/index.m3u8          - media playlist варианта N
+        /v<N>/seg<I>.ts           - сегмент I (GET и HEAD)
+
+    Сегменты - корректный MPEG-TS: синхробайт в каждом пакете и непрерывный
+    счетчик, так что их принимает SegmentValidator и проверяет verify.
+    Содержимое сегментов различается, поэтому кэш не схлопывает их в один.
+
+    Сбои (ошибки, обрывы, сбросы соединения, капельная отдача, всплески
+    ошибок, отключение узла, сдвиг живого плейлиста) задаются в HLSConfig.
+    Время всплесков, отключения узла и сдвига окна отсчитывается от первого
+    запроса к серверу. При edges > 1 каждый узел слушает свой порт, а media
+    playlist содержит абсолютные URL сегментов на узлах по очереди.
+
+    Пример:
+        with HLSStandInServer(HLSConfig(segments=50, latency=0.05)) as server:
+            urls = server.segment_urls()
+            VideoDownloader(8).download_segments(urls, 'out.ts')
+    """
+
+    def __init__(self, config: Optional[HLSConfig] = None, host: str = '127.0.0.1', port: int = 0):
+        """
+        Args:
+            config: Параметры потока (по умолчанию - HLSConfig())
+            host: Адрес для прослушивания
+            port: Порт (0 - выбрать свободный)
+        """
+        self.config = config or HLSConfig()
+        self.stats: Dict[str, int] = {
+            'requests': 0, 'errors': 0, 'truncated': 0, 'bytes': 0,
+            'resets': 0, 'stalled': 0, 'burst': 0, 'dark': 0, 'expired': 0,
+        }
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._origin: Optional[float] = None
+        self._headers = self._packet_headers()
+        handler = self._make_handler()
+        self._servers = []
+        for edge in range(max(1, self.config.edges)):
+            edge_server = ThreadingHTTPServer((host, port if edge == 0 else 0), handler)
+            edge_server.daemon_threads = True
+            edge_server.request_queue_size = 128
+            edge_server.edge = edge
+            self._servers.append(edge_server)
+        self._server = self._servers[0]
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def base_url(self) -> str:
+        """Базовый URL сервера"""
+        return self.edge_url(0)
+
+    def edge_url(self, edge: int) -> str:
+        """Базовый URL узла edge"""
+        host, port = self._servers[edge].server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def master_url(self) -> str:
+        return f"{self.base_url}/master.m3u8"
+
+    def media_url(self, variant: int = -1) -> str:
+        """URL media playlist варианта (по умолчанию - с наибольшим BANDWIDTH)"""
+        return f"{self.base_url}/v{variant % len(self.config.variants)}/index.m3u8"
+
+    def segment_url(self, index: int, variant: int = -1) -> str:
+        """URL сегмента index (на узле index % edges)"""
+        variant = variant % len(self.config.variants)
+        return f"{self.edge_url(index % len(self._servers))}/v{variant}/seg{index}.ts"
+
+    def segment_urls(self, variant: int = -1) -> List[str]:
+        """URL всех сегментов варианта"""
+        return [self.segment_url(i, variant) for i in range(self.config.segments)]
+
+    def start(self) -> 'HLSStandInServer':
+        """Запускает сервер в фоновых потоках (по потоку на узел)"""
+        for edge_server in self._servers:
+            thread = threading.Thread(target=edge_server.serve_forever, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        """Останавливает сервер"""
+        for edge_server in self._servers:
+            edge_server.shutdown()
+            edge_server.server_close()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def serve_forever(self):
+        """Обслуживает запросы в текущем потоке (для запуска в отдельном процессе)"""
+        for edge_server in self._servers[1:]:
+            thread = threading.Thread(target=edge_server.serve_forever, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self._server.serve_forever()
+
+    def __enter__(self) -> 'HLSStandInServer':
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def segment(self, index: int) -> bytes:
+        """Содержимое сегмента index"""
+        payload = bytes([index % 251 + 1]) * TS_PAYLOAD_SIZE
+        marker = index.to_bytes(4, 'big')
+        # Первый пакет несет номер сегмента, чтобы содержимое сегментов различалось
+        first = self._headers[0] + marker + payload[4:]
+        return first + b''.join(header + payload for header in self._headers[1:])
+
+    def master_playlist(self) -> str:
+        lines = ['#EXTM3U']
+        for number, bandwidth in enumerate(self.config.variants):
+            lines.append(f'#EXT-X-STREAM-INF:BANDWIDTH={bandwidth}')
+            lines.append(f'v{number}/index.m3u8')
+        return '\n'.join(lines) + '\n'
+
+    def media_playlist(self, variant: int = -1) -> str:
+        """
+        Media playlist варианта
+
+        В режиме live содержит только текущее окно сегментов и получает
+        #EXT-X-ENDLIST, лишь когда окно дошло до последнего сегмента.
+        """
+        config = self.config
+        first, end = self.live_window() if config.live else (0, config.segments)
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        lines = [
+            '#EXTM3U',
+            '#EXT-X-VERSION:3',
+            f'#EXT-X-TARGETDURATION:{int(config.segment_duration + 0.999)}',
+            f'#EXT-X-MEDIA-SEQUENCE:{first}',
+        ]
+        for i in range(first, end):
+            moment = start + timedelta(seconds=i * config.segment_duration)
+            lines.append(f'#EXT-X-PROGRAM-DATE-TIME:{moment.isoformat(timespec="milliseconds")}')
+            lines.append(f'#EXTINF:{config.segment_duration:.3f},')
+            lines.append(self.segment_url(i, variant) if len(self._servers) > 1 else f'seg{i}.ts')
+        if end == config.segments:
+            lines.append('#EXT-X-ENDLIST')
+        return '\n'.join(lines) + '\n'
+
+    def live_window(self) -> Tuple[int, int]:
+        """Текущее окно живого плейлиста: (первый сегмент, конец окна)"""
+        config = self.config
+        shifted = int(self._elapsed() / self._live_advance)
+        end = min(config.segments, config.live_window + shifted)
+        return max(0, end - config.live_window), end
+
+    @property
+    def _live_advance(self) -> float:
+        return self.config.live_advance or self.config.segment_duration
+
+    def _segment_state(self, index: int) -> Optional[str]:
+        """None - сегмент доступен, 'pending' - еще не опубликован, 'expired' - удален"""
+        if not self.config.live:
+            return None
+        first, end = self.live_window()
+        if index >= end:
+            return 'pending'
+        # Сегмент index выходит из окна, когда оно сдвигается в (index + 1)-й раз
+        left_at = (index + 1) * self._live_advance
+        if index < first and self._elapsed() >= left_at + self.config.live_purge:
+            return 'expired'
+        return None
+
+    def event_page(self) -> str:
+        return (f'<html><head><script>var playlist = "{self.master_url}";</script></head>'
+                f'<body><video></video></body></html>')
+
+    def _packet_headers(self) -> Tuple[bytes, ...]:
+        headers = []
+        for number in range(self.config.packets_per_segment):
+            headers.append(bytes([
+                0x47,
+                (0x40 if number == 0 else 0x00) | (PAYLOAD_PID >> 8),
+                PAYLOAD_PID & 0xFF,
+                0x10 | number % CC_PERIOD,
+            ]))
+        return tuple(headers)
+
+    def _draw(self) -> Tuple[float, Optional[str]]:
+        """
+        Задержка и сбой для очередного запроса сегмента
+
+        Returns:
+            (задержка, None или 'error' / 'truncate' / 'reset' / 'stall')
+        """
+        config = self.config
+        with self._lock:
+            delay = config.latency + (self._rng.random() * config.jitter if config.jitter else 0.0)
+            fault = None
+            if config.error_rate > 0 and self._rng.random() < config.error_rate:
+                fault = 'error'
+            elif config.truncate_rate > 0 and self._rng.random() < config.truncate_rate:
+                fault = 'truncate'
+            elif config.reset_rate > 0 and self._rng.random() < config.reset_rate:
+                fault = 'reset'
+            elif config.stall_rate > 0 and self._rng.random() < config.stall_rate:
+                fault = 'stall'
+        return delay, fault
+
+    def _elapsed(self) -> float:
+        """Секунды от первого запроса к серверу"""
+        with self._lock:
+            if self._origin is None:
+                self._origin = time.monotonic()
+            return time.monotonic() - self._origin
+
+    def _in_burst(self) -> bool:
+        config = self.config
+        return bool(config.burst_every) and self._elapsed() % config.burst_every < config.burst_length
+
+    def _is_dark(self, edge: int) -> bool:
+        config = self.config
+        if config.dark_edge is None or edge != config.dark_edge:
+            return False
+        elapsed = self._elapsed() - config.dark_after
+        return elapsed >= 0 and (config.dark_for is None or elapsed < config.dark_for)
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_HEAD(self):
+                self._respond(send_body=False)
+
+            def do_GET(self):
+                self._respond(send_body=True)
+
+            def _respond(self, send_body: bool):
+                server._count('requests')
+                if server._is_dark(self.server.edge):
+                    # Узел недоступен - соединение закрывается без ответа
+                    server._count('dark')
+                    self.close_connection = True
+                    return
+                path = self.path.split('?', 1)[0]
+
+                if path == '/master.m3u8':
+                    return self._send_text(server.master_playlist(), 'application/vnd.apple.mpegurl', send_body)
+                if path.startswith('/w/'):
+                    return self._send_text(server.event_page(), 'text/html; charset=utf-8', send_body)
+
+                parts = path.strip('/').split('/')
+                if len(parts) == 2 and parts[0].startswith('v') and parts[0][1:].isdigit():
+                    if parts[1] == 'index.m3u8':
+                        playlist = server.media_playlist(int(parts[0][1:]))
+                        return self._send_text(playlist, 'application/vnd.apple.mpegurl', send_body)
+                    name = parts[1]
+                    if name.startswith('seg') and name.endswith('.ts') and name[3:-3].isdigit():
+                        index = int(name[3:-3])
+                        state = server._segment_state(index) if index < server.config.segments else 'missing'
+                        if state == 'expired':
+                            server._count('expired')
+                        if state is None:
+                            return self._send_segment(index, send_body)
+
+                self.send_error(404)
+
+            def _send_text(self, text: str, content_type: str, send_body: bool):
+                body = text.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(body)
+
+            def _send_segment(self, index: int, send_body: bool):
+                if not send_body:
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'video/mp2t')
+                    self.send_header('Content-Length', str(server.config.actual_segment_size))
+                    self.end_headers()
+                    return
+
+                delay, fault = server._draw()
+                if delay:
+                    time.sleep(delay)
+                if server._in_burst():
+                    server._count('burst')
+                    self.send_response(server.config.burst_status)
+                    self.send_header('Retry-After', '1')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                if fault == 'error':
+                    server._count('errors')
+                    self.send_error(503)
+                    return
+
+                body = server.segment(index)
+                self.send_response(200)
+                self.send_header('Content-Type', 'video/mp2t')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+
+                if fault == 'truncate':
+                    server._count('truncated')
+                    body = body[:len(body) // 2]
+                    self.close_connection = True
+                elif fault == 'reset':
+                    server._count('resets')
+                    self._write_limited(body[:len(body) // 2])
+                    self._reset()
+                    return
+                elif fault == 'stall':
+                    server._count('stalled')
+                    self._write_limited(self._trickle(body))
+                    server._count('bytes', len(body))
+                    return
+                self._write_limited(body)
+                server._count('bytes', len(body))
+
+            def _reset(self):
+                """Сбрасывает соединение (RST вместо FIN)"""
+                self.close_connection = True
+                self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+                self.connection.close()
+
+            def _trickle(self, body: bytes) -> bytes:
+                """
+                Отдает тело по пакету раз в STALL_INTERVAL в течение config.stall
+
+                Таймаут чтения клиента при этом не срабатывает.
+
+                Returns:
+                    Оставшаяся часть тела
+                """
+                deadline = time.monotonic() + server.config.stall
+                offset = 0
+                while offset < len(body) and time.monotonic() < deadline:
+                    self.wfile.write(body[offset:offset + TS_PACKET_SIZE])
+                    offset += TS_PACKET_SIZE
+                    time.sleep(STALL_INTERVAL)
+                return body[offset:]
+
+            def _write_limited(self, body: bytes):
+                """Пишет тело, выдерживая config.bandwidth байт/с"""
+                bandwidth = server.config.bandwidth
+                if not bandwidth:
+                    self.wfile.write(body)
+                    return
+                chunk_size = max(TS_PACKET_SIZE, bandwidth // 20)
+                started = time.monotonic()
+                view = memoryview(body)
+                for offset in range(0, len(body), chunk_size):
+                    self.wfile.write(view[offset:offset + chunk_size])
+                    ahead = (offset + chunk_size) / bandwidth - (time.monotonic() - started)
+                    if ahead > 0:
+                        time.sleep(ahead)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,149 @@
+"""Время по этапам скачивания и профилирование всего запуска"""
+
+import sys
+import time
+import cProfile
+import threading
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+
+
+@dataclass
+class StageTiming:
+    """Время одного этапа"""
+    name: str
+    wall: float  # секунды по часам
+    cpu: float  # секунды процессорного времени процесса (все потоки)
+
+    def to_dict(self) -> Dict:
+        return {key: round(value, 4) if isinstance(value, float) else value
+                for key, value in asdict(self).items()}
+
+
+class StageTimer:
+    """
+    Замеряет этапы, идущие друг за другом
+
+    Начало нового этапа завершает предыдущий, поэтому достаточно отмечать
+    только переходы.
+
+    Пример:
+        timer = StageTimer()
+        timer.start('playlist')
+        ...
+        timer.start('download')
+        ...
+        timer.stop()
+        print(format_timings(timer.stages))
+    """
+
+    def __init__(self):
+        self.stages: List[StageTiming] = []
+        self._current: Optional[str] = None
+        self._wall_start = 0.0
+        self._cpu_start = 0.0
+
+    @property
+    def current(self) -> Optional[str]:
+        """Имя идущего этапа"""
+        return self._current
+
+    def start(self, name: str):
+        """Завершает текущий этап и начинает новый"""
+        self.stop()
+        self._current = name
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+
+    def stop(self):
+        """Завершает текущий этап"""
+        if self._current is None:
+            return
+        self.stages.append(StageTiming(
+            self._current,
+            time.perf_counter() - self._wall_start,
+            time.process_time() - self._cpu_start,
+        ))
+        self._current = None
+
+
+def format_timings(timings: List[StageTiming]) -> str:
+    """Таблица времени по этапам для итогового вывода"""
+    total_wall = sum(timing.wall for timing in timings) or 1.0
+    width = max([len(timing.name) for timing in timings] + [5])
+    lines = ["Время по этапам:"]
+    for timing in timings:
+        lines.append(
+            f"  {timing.name:<{width}}  {timing.wall:8.2f} с  CPU {timing.cpu:7.2f} с"
+            f"  {timing.wall / total_wall * 100:5.1f}%"
+        )
+    lines.append(f"  {'всего':<{width}}  {sum(t.wall for t in timings):8.2f} с  "
+                 f"CPU {sum(t.cpu for t in timings):7.2f} с")
+    return '\n'.join(lines)
+
+
+class RunProfiler:
+    """
+    cProfile для всего запуска, включая рабочие потоки
+
+    cProfile до Python 3.12 профилирует только поток, в котором включен,
+    поэтому в каждом новом потоке включается свой профиль, а при
+    сохранении все они объединяются. Начиная с 3.12 профиль основного
+    потока и так видит все потоки - включить второй нельзя, и он
+    просто не создается.
+    """
+
+    REPORT_LINES = 60
+
+    def __init__(self):
+        self._profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Включает профилирование текущего и всех новых потоков"""
+        self._enable_current()
+        threading.setprofile(self._thread_hook)
+
+    def stop(self):
+        """Выключает профилирование (профили рабочих потоков уже завершены)"""
+        threading.setprofile(None)
+        with self._lock:
+            if self._profiles:
+                self._profiles[0].disable()
+
+    def save(self, path: str) -> str:
+        """
+        Сохраняет профиль
+
+        Args:
+            path: Файл для pstats (открывается snakeviz, pstats, gprof2dot)
+
+        Returns:
+            Путь к текстовому отчету (path + '.txt')
+        """
+        import pstats
+
+        with self._lock:
+            profiles = list(self._profiles)
+        stats = pstats.Stats(*profiles)
+        stats.dump_stats(path)
+
+        report_path = path + '.txt'
+        with open(report_path, 'w', encoding='utf-8') as f:
+            stats.stream = f
+            stats.sort_stats('cumulative').print_stats(self.REPORT_LINES)
+            stats.sort_stats('tottime').print_stats(self.REPORT_LINES)
+        return report_path
+
+    def _thread_hook(self, frame, event, arg):
+        sys.setprofile(None)
+        self._enable_current()
+
+    def _enable_current(self):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return
+        with self._lock:
+            self._profiles.append(profile)
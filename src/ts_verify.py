@@ -0,0 +1,602 @@
+"""TSVerifier - проверка целостности и починка скачанных MPEG-TS файлов"""
+
+import os
+import sys
+import time
+import mmap
+import argparse
+import importlib.util
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+# NumPy импортируется при первой векторной проверке, а не при загрузке модуля
+NUMPY_AVAILABLE = importlib.util.find_spec('numpy') is not None
+
+from .segment_journal import SegmentJournal, SegmentJournalError
+
+
+TS_PACKET_SIZE = 188
+SYNC_BYTE = 0x47
+NULL_PID = 0x1FFF
+
+# Сколько пакетов подряд с синхробайтом считается восстановлением синхронизации
+RESYNC_PACKETS = 3
+
+
+class TSVerifyError(Exception):
+    """Ошибка проверки или починки MPEG-TS файла"""
+    pass
+
+
+@dataclass
+class CorruptRange:
+    """Поврежденный диапазон байт [start, end)"""
+    start: int
+    end: int
+    reason: str
+
+
+@dataclass
+class VerifyReport:
+    """Результат проверки файла"""
+    path: str
+    size: int
+    packets: int
+    ranges: List[CorruptRange] = field(default_factory=list)
+    bad_segments: List[int] = field(default_factory=list)
+    elapsed: float = 0.0
+    vectorized: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return not self.ranges
+
+
+class _ContinuityChecker:
+    """
+    Проверка счетчиков непрерывности (continuity_counter) по PID
+
+    Пакеты подаются порциями по порядку; между порциями хранится
+    только последний пакет каждого PID.
+    """
+
+    def __init__(self):
+        self.ranges: List[CorruptRange] = []
+        self.errors: List[CorruptRange] = []  # пакеты с transport_error_indicator
+        self._last: Dict[int, Tuple[int, int]] = {}  # pid -> (cc, позиция)
+        self._carry = None
+
+    def feed_packet(self, position: int, header: bytes):
+        """Проверяет один пакет (header - байты 1..5 заголовка)"""
+        if header[0] & 0x80:
+            self.errors.append(CorruptRange(position, position + TS_PACKET_SIZE, "transport_error_indicator"))
+        pid = ((header[0] & 0x1F) << 8) | header[1]
+        control = (header[2] >> 4) & 0x3
+        if not control & 0x1 or pid == NULL_PID:
+            return
+        cc = header[2] & 0x0F
+        discontinuity = control & 0x2 and header[3] > 0 and header[4] & 0x80
+
+        previous = self._last.get(pid)
+        if previous is not None and not discontinuity:
+            delta = (cc - previous[0]) & 0x0F
+            if delta not in (0, 1):
+                self.ranges.append(CorruptRange(previous[1], position + TS_PACKET_SIZE,
+                                                "разрыв continuity_counter"))
+        self._last[pid] = (cc, position)
+
+    def feed_array(self, positions, headers):
+        """
+        Векторная проверка порции пакетов
+
+        Args:
+            positions: Позиции пакетов в файле (int64)
+            headers: Байты 1..5 заголовков, массив (N, 5) uint8
+        """
+        import numpy as np
+
+        b1, b2, b3, b4, b5 = (headers[:, i] for i in range(5))
+
+        errors = np.flatnonzero(b1 & 0x80)
+        for index in errors:
+            start = int(positions[index])
+            self.errors.append(CorruptRange(start, start + TS_PACKET_SIZE, "transport_error_indicator"))
+
+        pid = ((b1 & 0x1F).astype(np.uint16) << 8) | b2
+        control = (b3 >> 4) & 0x3
+        selected = np.flatnonzero(((control & 0x1) != 0) & (pid != NULL_PID))
+
+        pid = pid[selected]
+        cc = b3[selected] & 0x0F
+        discontinuity = ((control[selected] & 0x2) != 0) & (b4[selected] > 0) & ((b5[selected] & 0x80) != 0)
+        positions = positions[selected]
+
+        # Последние пакеты каждого PID из предыдущей порции идут первыми
+        if self._carry is not None:
+            pid = np.concatenate((self._carry[0], pid))
+            cc = np.concatenate((self._carry[1], cc))
+            discontinuity = np.concatenate((np.zeros(len(self._carry[0]), dtype=bool), discontinuity))
+            positions = np.concatenate((self._carry[2], positions))
+
+        order = np.argsort(pid, kind='stable')
+        pid, cc, discontinuity, positions = pid[order], cc[order], discontinuity[order], positions[order]
+
+        same_pid = pid[1:] == pid[:-1]
+        delta = (cc[1:] - cc[:-1]) & 0x0F
+        broken = np.flatnonzero(same_pid & (delta > 1) & ~discontinuity[1:])
+        for index in broken:
+            self.ranges.append(CorruptRange(int(positions[index]), int(positions[index + 1]) + TS_PACKET_SIZE,
+                                            "разрыв continuity_counter"))
+
+        if len(pid):
+            last = np.append(~same_pid, True)
+            self._carry = (pid[last], cc[last], positions[last])
+
+
+class TSVerifier:
+    """
+    Проверяет MPEG-TS файл: синхробайт 0x47 каждые 188 байт и счетчики
+    непрерывности по каждому PID
+
+    С NumPy файл читается через memmap и проверяется векторно порциями
+    (гигабайты за секунды); без NumPy - тот же алгоритм в чистом Python.
+    Найденные диапазоны сопоставляются с сегментами по журналу
+    (<видео>.segments.json).
+    """
+
+    CHUNK_PACKETS = 350_000  # ~64 МБ
+    RESYNC_WINDOW = 1024 * 1024
+
+    def __init__(self, path: str, journal: Optional[SegmentJournal] = None,
+                 vectorized: Optional[bool] = None):
+        """
+        Args:
+            path: Путь к файлу
+            journal: Границы сегментов (для сопоставления и починки)
+            vectorized: Использовать NumPy (по умолчанию - если установлен)
+        """
+        self.path = path
+        self.journal = journal
+        self.vectorized = NUMPY_AVAILABLE if vectorized is None else vectorized and NUMPY_AVAILABLE
+
+    def verify(self) -> VerifyReport:
+        """
+        Проверяет файл
+
+        Returns:
+            VerifyReport с поврежденными диапазонами и номерами сегментов
+
+        Raises:
+            TSVerifyError: Если файл не найден или не является MPEG-TS
+        """
+        started = time.perf_counter()
+        try:
+            size = os.path.getsize(self.path)
+        except OSError as e:
+            raise TSVerifyError(f"Файл не найден: {e}")
+
+        report = VerifyReport(path=self.path, size=size, packets=size // TS_PACKET_SIZE,
+                              vectorized=self.vectorized)
+        if size == 0:
+            report.ranges.append(CorruptRange(0, 0, "пустой файл"))
+        else:
+            self._check_container()
+            ranges, continuity = self._scan_numpy(size) if self.vectorized else self._scan_python(size)
+            if self.journal:
+                ranges.extend(self._check_journal(size))
+            report.ranges = _merge_ranges(ranges + _unexplained(continuity, _merge_ranges(ranges)))
+
+        if self.journal:
+            bad = set()
+            for corrupt in report.ranges:
+                bad.update(self.journal.segments_in_range(corrupt.start, max(corrupt.end, corrupt.start + 1)))
+            report.bad_segments = sorted(bad)
+
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    def _check_container(self):
+        """Отличает перепакованный MP4 от MPEG-TS"""
+        with open(self.path, 'rb') as f:
+            head = f.read(12)
+        if head[:1] != bytes([SYNC_BYTE]) and head[4:8] in (b'ftyp', b'moov', b'moof', b'styp'):
+            raise TSVerifyError("Файл - MP4 (перепакован через --remux), проверка поддерживает только MPEG-TS")
+
+    # --- векторная проверка ---
+
+    def _scan_numpy(self, size: int) -> Tuple[List[CorruptRange], List[CorruptRange]]:
+        import numpy as np
+
+        data = np.memmap(self.path, dtype=np.uint8, mode='r')
+        checker = _ContinuityChecker()
+        ranges = []
+        position = 0
+
+        while position < size:
+            count = min(self.CHUNK_PACKETS, (size - position) // TS_PACKET_SIZE)
+            if count == 0:
+                ranges.append(CorruptRange(position, size, "неполный пакет в конце файла"))
+                break
+
+            packets = data[position:position + count * TS_PACKET_SIZE].reshape(count, TS_PACKET_SIZE)
+            lost = np.flatnonzero(packets[:, 0] != SYNC_BYTE)
+            good = int(lost[0]) if lost.size else count
+
+            if good:
+                offsets = position + np.arange(good, dtype=np.int64) * TS_PACKET_SIZE
+                checker.feed_array(offsets, np.array(packets[:good, 1:6]))
+
+            if good == count:
+                position += count * TS_PACKET_SIZE
+                continue
+
+            lost_at = position + good * TS_PACKET_SIZE
+            resync = self._find_sync_numpy(data, _resync_from(lost_at, position), size)
+            ranges.append(_sync_loss(lost_at, resync))
+            position = resync
+
+        del data
+        return ranges + checker.errors, checker.ranges
+
+    def _find_sync_numpy(self, data, start: int, size: int) -> int:
+        """Ищет позицию, с которой RESYNC_PACKETS пакетов подряд начинаются с 0x47"""
+        import numpy as np
+
+        lookahead = (RESYNC_PACKETS - 1) * TS_PACKET_SIZE
+
+        while start < size:
+            end = min(size, start + self.RESYNC_WINDOW)
+            window = data[start:min(size, end + lookahead)]
+            candidates = np.flatnonzero(window[:end - start] == SYNC_BYTE)
+            valid = np.ones(len(candidates), dtype=bool)
+            for k in range(1, RESYNC_PACKETS):
+                index = candidates + k * TS_PACKET_SIZE
+                inside = index < len(window)
+                valid &= ~inside | (window[np.minimum(index, len(window) - 1)] == SYNC_BYTE)
+            hits = candidates[valid]
+            if hits.size:
+                return start + int(hits[0])
+            start = end
+
+        return size
+
+    # --- проверка без NumPy ---
+
+    def _scan_python(self, size: int) -> Tuple[List[CorruptRange], List[CorruptRange]]:
+        checker = _ContinuityChecker()
+        ranges = []
+        position = 0
+        sync = bytes([SYNC_BYTE])
+
+        with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            while position < size:
+                count = min(self.CHUNK_PACKETS, (size - position) // TS_PACKET_SIZE)
+                if count == 0:
+                    ranges.append(CorruptRange(position, size, "неполный пакет в конце файла"))
+                    break
+
+                end = position + count * TS_PACKET_SIZE
+                sync_column = data[position:end:TS_PACKET_SIZE]
+                good = count - len(sync_column.lstrip(sync))
+
+                for offset in range(position, position + good * TS_PACKET_SIZE, TS_PACKET_SIZE):
+                    checker.feed_packet(offset, data[offset + 1:offset + 6])
+
+                if good == count:
+                    position = end
+                    continue
+
+                lost_at = position + good * TS_PACKET_SIZE
+                resync = self._find_sync_python(data, _resync_from(lost_at, position), size)
+                ranges.append(_sync_loss(lost_at, resync))
+                position = resync
+
+        return ranges + checker.errors, checker.ranges
+
+    @staticmethod
+    def _find_sync_python(data, start: int, size: int) -> int:
+        while True:
+            candidate = data.find(bytes([SYNC_BYTE]), start)
+            if candidate == -1:
+                return size
+            if all(candidate + k * TS_PACKET_SIZE >= size or data[candidate + k * TS_PACKET_SIZE] == SYNC_BYTE
+                   for k in range(1, RESYNC_PACKETS)):
+                return candidate
+            start = candidate + 1
+
+    # --- журнал ---
+
+    def _check_journal(self, size: int) -> List[CorruptRange]:
+        """Сверяет размер файла и границы сегментов с журналом"""
+        ranges = []
+        expected = self.journal.total_size
+        if size != expected:
+            ranges.append(CorruptRange(min(size, expected), max(size, expected),
+                                       f"размер файла {size} вместо {expected} по журналу"))
+
+        with open(self.path, 'rb') as f:
+            for entry in self.journal.entries:
+                if entry.size % TS_PACKET_SIZE:
+                    ranges.append(CorruptRange(entry.offset, entry.end, "размер сегмента не кратен 188"))
+                    continue
+                if entry.offset >= size:
+                    continue
+                f.seek(entry.offset)
+                if f.read(1) != bytes([SYNC_BYTE]):
+                    ranges.append(CorruptRange(entry.offset, entry.end, "сегмент не начинается с 0x47"))
+
+        return ranges
+
+
+class TSRepairer:
+    """
+    Перекачивает поврежденные сегменты и вставляет их на место
+
+    Если размеры новых сегментов совпадают с журналом, файл исправляется
+    на месте; иначе собирается заново одним последовательным проходом.
+    Журнал обновляется вместе с файлом.
+    """
+
+    COPY_BUFFER = 4 * 1024 * 1024
+
+    def __init__(self, path: str, journal: SegmentJournal, downloader):
+        """
+        Args:
+            path: Путь к файлу
+            journal: Границы сегментов
+            downloader: VideoDownloader для перекачки сегментов
+        """
+        self.path = path
+        self.journal = journal
+        self.downloader = downloader
+
+    def repair(self, segment_indices: List[int]) -> SegmentJournal:
+        """
+        Перекачивает и заменяет сегменты
+
+        Args:
+            segment_indices: Номера поврежденных сегментов
+
+        Returns:
+            Обновленный журнал
+
+        Raises:
+            TSVerifyError: Если сегмент не удалось скачать или он снова поврежден
+        """
+        replacements = self._download(segment_indices)
+
+        same_size = all(len(data) == self.journal[index].size for index, data in replacements.items())
+        if same_size and os.path.getsize(self.path) == self.journal.total_size:
+            self._patch_in_place(replacements)
+            journal = self.journal
+        else:
+            self._rebuild(replacements)
+            journal = self.journal.replace_sizes([(index, len(data)) for index, data in replacements.items()])
+
+        journal.save(SegmentJournal.path_for(self.path))
+        self.journal = journal
+        return journal
+
+    def _download(self, segment_indices: List[int]) -> Dict[int, bytes]:
+        """Скачивает сегменты параллельно и проверяет их"""
+        from .downloader import DownloadError
+
+        def fetch(index: int) -> Tuple[int, bytes]:
+            try:
+                return index, self.downloader.download_segment(self.journal[index].url)
+            except DownloadError as e:
+                raise TSVerifyError(f"Не удалось скачать сегмент {index + 1}: {e}")
+
+        with ThreadPoolExecutor(max_workers=self.downloader.max_workers) as executor:
+            replacements = dict(executor.map(fetch, segment_indices))
+
+        for index, data in replacements.items():
+            if len(data) % TS_PACKET_SIZE or data[::TS_PACKET_SIZE].strip(bytes([SYNC_BYTE])):
+                raise TSVerifyError(f"Сегмент {index + 1} скачан повторно, но по-прежнему поврежден")
+        return replacements
+
+    def _patch_in_place(self, replacements: Dict[int, bytes]):
+        with open(self.path, 'r+b') as f:
+            for index, data in sorted(replacements.items()):
+                f.seek(self.journal[index].offset)
+                f.write(data)
+
+    def _rebuild(self, replacements: Dict[int, bytes]):
+        temp_path = self.path + '.repair'
+        try:
+            with open(self.path, 'rb') as source, open(temp_path, 'wb') as target:
+                for index, entry in enumerate(self.journal.entries):
+                    if index in replacements:
+                        target.write(replacements[index])
+                        continue
+                    source.seek(entry.offset)
+                    remaining = entry.size
+                    while remaining:
+                        chunk = source.read(min(remaining, self.COPY_BUFFER))
+                        if not chunk:
+                            raise TSVerifyError(f"Сегмент {index + 1} отсутствует в файле - добавьте его в починку")
+                        target.write(chunk)
+                        remaining -= len(chunk)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+
+def journal_from_playlist(playlist_url: str, max_workers: int = 8) -> SegmentJournal:
+    """
+    Восстанавливает границы сегментов по плейлисту (HEAD запросы)
+
+    Используется, если журнал рядом с видео не сохранился. Результат
+    верен только для файла, скачанного из того же плейлиста целиком.
+
+    Raises:
+        TSVerifyError: Если плейлист недоступен или сервер не сообщает размеры
+    """
+    import requests
+    from urllib.parse import urljoin
+    from .m3u8_parser import M3U8Parser, M3U8ParseError
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=max_workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    try:
+        response = session.get(playlist_url, timeout=30)
+        response.raise_for_status()
+        parser = M3U8Parser()
+        content, base_url = response.text, playlist_url
+        if parser.is_master_playlist(content):
+            base_url = urljoin(playlist_url, parser.select_best_quality(content))
+            response = session.get(base_url, timeout=30)
+            response.raise_for_status()
+            content = response.text
+        urls = [segment.url for segment in parser.parse_segments(content, base_url)]
+    except (requests.RequestException, M3U8ParseError) as e:
+        raise TSVerifyError(f"Не удалось загрузить плейлист: {e}")
+
+    def content_length(url: str) -> int:
+        try:
+            head = session.head(url, timeout=30, allow_redirects=True)
+            head.raise_for_status()
+            return int(head.headers['Content-Length'])
+        except (requests.RequestException, KeyError, ValueError) as e:
+            raise TSVerifyError(f"Не удалось узнать размер сегмента {url}: {e}")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        sizes = list(executor.map(content_length, urls))
+
+    return SegmentJournal.from_sizes(urls, sizes)
+
+
+def _resync_from(lost_at: int, position: int) -> int:
+    """
+    Позиция начала поиска синхронизации
+
+    Поиск начинается внутри предыдущего пакета: если он обрезан, следующий
+    сегмент начинается в его середине. Позиция всегда правее начала
+    текущего участка, поэтому сканирование продвигается вперед.
+    """
+    return max(lost_at - TS_PACKET_SIZE, position) + 1
+
+
+def _sync_loss(lost_at: int, resync: int) -> CorruptRange:
+    """Диапазон потери синхронизации"""
+    if resync < lost_at:
+        # Синхронизация нашлась внутри предыдущего пакета - обрезан именно он
+        return CorruptRange(lost_at - TS_PACKET_SIZE, resync, "обрезанный пакет")
+    return CorruptRange(lost_at, resync, "потеря синхронизации")
+
+
+def _unexplained(continuity: List[CorruptRange], hard: List[CorruptRange]) -> List[CorruptRange]:
+    """
+    Отбрасывает разрывы счетчиков, объясненные потерей синхронизации
+
+    Разрыв редкого PID (PAT/PMT) растягивается на несколько сегментов;
+    если внутри уже есть поврежденный диапазон, виноват он.
+    """
+    starts = [corrupt.start for corrupt in hard]
+    result = []
+    for corrupt in continuity:
+        index = bisect_left(starts, corrupt.end) - 1
+        if index >= 0 and hard[index].end > corrupt.start:
+            continue
+        result.append(corrupt)
+    return result
+
+
+def _merge_ranges(ranges: List[CorruptRange]) -> List[CorruptRange]:
+    """Объединяет пересекающиеся диапазоны"""
+    merged: List[CorruptRange] = []
+    for corrupt in sorted(ranges, key=lambda r: (r.start, r.end)):
+        if merged and corrupt.start <= merged[-1].end:
+            last = merged[-1]
+            last.end = max(last.end, corrupt.end)
+            if corrupt.reason not in last.reason.split('; '):
+                last.reason += f"; {corrupt.reason}"
+        else:
+            merged.append(CorruptRange(corrupt.start, corrupt.end, corrupt.reason))
+    return merged
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI: facecast-dl verify FILE [--repair] [--playlist URL]"""
+    parser = argparse.ArgumentParser(
+        prog='facecast-dl verify',
+        description='Проверка целостности скачанного MPEG-TS и перекачка поврежденных сегментов'
+    )
+    parser.add_argument('path', help='Скачанный файл видео')
+    parser.add_argument('--repair', action='store_true',
+                        help='Перекачать поврежденные сегменты и вставить их на место')
+    parser.add_argument('--journal', help='Журнал сегментов (по умолчанию: <файл>.segments.json)')
+    parser.add_argument('--playlist', help='URL M3U8 для восстановления границ сегментов без журнала')
+    parser.add_argument('-w', '--workers', type=int, default=5,
+                        help='Количество параллельных потоков (по умолчанию: 5)')
+    parser.add_argument('--no-numpy', action='store_true', help='Проверка без NumPy (медленнее)')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.journal:
+            journal = SegmentJournal.load(args.journal)
+        else:
+            journal = SegmentJournal.find(args.path)
+        if journal is None and args.playlist:
+            print("Восстановление границ сегментов по плейлисту...")
+            journal = journal_from_playlist(args.playlist, args.workers)
+        if journal is None:
+            print("⚠ Журнал сегментов не найден - поврежденные места будут показаны без номеров сегментов")
+
+        if not NUMPY_AVAILABLE and not args.no_numpy:
+            print("⚠ NumPy не установлен - проверка без векторизации (pip install numpy)")
+
+        report = TSVerifier(args.path, journal, vectorized=not args.no_numpy).verify()
+    except (TSVerifyError, SegmentJournalError) as e:
+        print(f"✗ {e}")
+        return 1
+
+    speed = report.size / report.elapsed / (1024 * 1024) if report.elapsed else 0
+    print(f"Проверено: {report.packets} пакетов, {report.size / (1024 * 1024):.1f} МБ "
+          f"за {report.elapsed:.2f} с ({speed:.0f} МБ/с)")
+
+    if report.ok:
+        print("✓ Повреждений не найдено")
+        return 0
+
+    print(f"⚠ Найдено поврежденных диапазонов: {len(report.ranges)}")
+    for corrupt in report.ranges[:20]:
+        print(f"  {corrupt.start}-{corrupt.end}: {corrupt.reason}")
+    if len(report.ranges) > 20:
+        print(f"  ... и еще {len(report.ranges) - 20}")
+
+    if report.bad_segments:
+        print(f"  Сегменты: {', '.join(str(index + 1) for index in report.bad_segments)}")
+
+    if not args.repair:
+        return 1
+    if not report.bad_segments:
+        print("✗ Починка невозможна: нет журнала сегментов (укажите --playlist)")
+        return 1
+
+    from .downloader import VideoDownloader
+
+    print(f"Перекачка сегментов: {len(report.bad_segments)}...")
+    try:
+        journal = TSRepairer(args.path, journal, VideoDownloader(max_workers=args.workers)).repair(report.bad_segments)
+        report = TSVerifier(args.path, journal, vectorized=not args.no_numpy).verify()
+    except (TSVerifyError, OSError) as e:
+        print(f"✗ Ошибка починки: {e}")
+        return 1
+
+    if report.ok:
+        print("✓ Файл исправлен")
+        return 0
+    print(f"⚠ После починки остались повреждения: {len(report.ranges)}")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
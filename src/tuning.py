@@ -0,0 +1,366 @@
+"""WorkerTuner - подбор количества потоков скачивания для хоста CDN"""
+
+import os
+import json
+import time
+import argparse
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from .progress import format_bytes
+
+
+# Кандидаты по умолчанию, по возрастанию
+DEFAULT_CANDIDATES = (1, 2, 4, 6, 8, 12, 16, 24, 32)
+DEFAULT_BUDGET = 30.0  # секунды на весь подбор
+
+
+class TuningError(Exception):
+    """Ошибка подбора или чтения профиля"""
+    pass
+
+
+def default_profile_path() -> str:
+    """~/.config/facecast-dl/tuning.json (или $XDG_CONFIG_HOME/facecast-dl/tuning.json)"""
+    config_home = os.environ.get('XDG_CONFIG_HOME') or os.path.join(os.path.expanduser('~'), '.config')
+    return os.path.join(config_home, 'facecast-dl', 'tuning.json')
+
+
+def host_of(url: str) -> str:
+    """Ключ профиля - хост с портом из URL сегмента (узел CDN)"""
+    return urlsplit(url).netloc.lower()
+
+
+@dataclass
+class HostTuning:
+    """Результат подбора для одного хоста"""
+    workers: int
+    throughput: float  # байт/с при выбранном числе потоков
+    tuned_at: str
+    samples: Dict[str, float] = field(default_factory=dict)  # потоков -> байт/с
+
+
+class TuningProfile:
+    """
+    Профиль подбора: хост CDN -> количество потоков
+
+    Хранится в JSON: {"version": 1, "hosts": {"<хост>": {"workers": 8, ...}}}.
+
+    Пример:
+        profile = TuningProfile.load()
+        workers = profile.workers_for(segment_urls[0]) or VideoDownloader.DEFAULT_WORKERS
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: Optional[str] = None, hosts: Optional[Dict[str, HostTuning]] = None):
+        """
+        Args:
+            path: Файл профиля (по умолчанию - default_profile_path())
+            hosts: Результаты по хостам
+        """
+        self.path = path or default_profile_path()
+        self.hosts: Dict[str, HostTuning] = dict(hosts or {})
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> 'TuningProfile':
+        """
+        Читает профиль; если файла нет - возвращает пустой
+
+        Raises:
+            TuningError: Если файл поврежден или недоступен
+        """
+        profile = cls(path)
+        if not os.path.exists(profile.path):
+            return profile
+        try:
+            with open(profile.path, encoding='utf-8') as f:
+                data = json.load(f)
+            for host, entry in data.get('hosts', {}).items():
+                profile.hosts[host] = HostTuning(
+                    workers=int(entry['workers']),
+                    throughput=float(entry.get('throughput', 0.0)),
+                    tuned_at=str(entry.get('tuned_at', '')),
+                    samples={str(k): float(v) for k, v in entry.get('samples', {}).items()},
+                )
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            raise TuningError(f"Не удалось прочитать профиль {profile.path}: {e}")
+        return profile
+
+    def save(self):
+        """
+        Записывает профиль (через временный файл)
+
+        Raises:
+            TuningError: Если файл не удалось записать
+        """
+        data = {
+            'version': self.VERSION,
+            'hosts': {host: asdict(tuning) for host, tuning in sorted(self.hosts.items())},
+        }
+        temp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            raise TuningError(f"Не удалось сохранить профиль {self.path}: {e}")
+
+    def workers_for(self, url: str) -> Optional[int]:
+        """Подобранное количество потоков для хоста сегмента url (None - хост не настроен)"""
+        tuning = self.hosts.get(host_of(url))
+        return tuning.workers if tuning else None
+
+
+@dataclass
+class TuningSample:
+    """Замер одного количества потоков"""
+    workers: int
+    throughput: float  # байт/с после прогрева (сумма по потокам)
+    segments: int
+    errors: int
+    elapsed: float
+
+
+class WorkerTuner:
+    """
+    Перебирает количество потоков и находит точку насыщения
+
+    Каждому кандидату отводится равная доля бюджета времени. Потоки
+    скачивают сегменты через VideoDownloader.download_segment (с теми же
+    повторами и проверкой) и сразу их отбрасывают; первый сегмент каждого
+    потока - прогрев соединения, в скорость он не входит. Скорость потока -
+    байты после прогрева за время от его конца до последнего сегмента,
+    скорость кандидата - сумма по потокам. Чтобы все кандидаты мерились
+    одинаково, каждый поток скачивает не меньше MIN_MEASURED сегментов
+    после прогрева, даже если его доля бюджета уже истекла. Каждый
+    кандидат берет следующие по списку сегменты, чтобы кэш узла CDN не
+    подыгрывал более поздним замерам.
+
+    Перебор останавливается, если два кандидата подряд не дали прироста
+    больше MIN_GAIN или у кандидата появились ошибки (сервер ограничивает
+    запросы). Замер с ошибками повторяется до ERROR_RETRIES раз: единичный
+    обрыв соединения не прерывает перебор, а замеры с ошибками не
+    участвуют в выборе. Выбирается наименьшее число потоков, дающее
+    KNEE_FRACTION лучшей скорости.
+    """
+
+    KNEE_FRACTION = 0.9
+    MIN_GAIN = 0.05
+    MIN_MEASURED = 2  # сегментов на поток после прогрева
+    ERROR_RETRIES = 1  # повторных замеров кандидата после замера с ошибками
+
+    def __init__(self, segment_urls: Sequence[str], budget: float = DEFAULT_BUDGET,
+                 candidates: Sequence[int] = DEFAULT_CANDIDATES):
+        """
+        Args:
+            segment_urls: URL сегментов для замеров
+            budget: Время на весь перебор (секунды)
+            candidates: Количества потоков по возрастанию
+        """
+        if not segment_urls:
+            raise TuningError("Список сегментов пуст")
+        self.segment_urls = list(segment_urls)
+        self.budget = budget
+        self.candidates = sorted(set(candidates))
+        self._next = 0
+
+    def run(self, report=None) -> Tuple[int, List[TuningSample]]:
+        """
+        Выполняет перебор
+
+        Args:
+            report: Вызывается с каждым TuningSample по мере замеров
+
+        Returns:
+            (выбранное количество потоков, замеры)
+
+        Raises:
+            TuningError: Если ни один замер не удался
+        """
+        slice_seconds = self.budget / len(self.candidates)
+        samples: List[TuningSample] = []
+        best = 0.0
+        stalled = 0
+
+        for workers in self.candidates:
+            for _ in range(1 + self.ERROR_RETRIES):
+                sample = self.measure(workers, slice_seconds)
+                samples.append(sample)
+                if report:
+                    report(sample)
+                if not sample.errors:
+                    break
+            if sample.errors:
+                break
+            if sample.throughput > best * (1 + self.MIN_GAIN):
+                stalled = 0
+            else:
+                stalled += 1
+                if stalled >= 2:
+                    break
+            best = max(best, sample.throughput)
+
+        measured = [sample for sample in samples if sample.throughput > 0 and not sample.errors]
+        if not measured:
+            raise TuningError("Не удалось скачать ни одного сегмента без ошибок")
+        best = max(sample.throughput for sample in measured)
+        knee = min(sample.workers for sample in measured if sample.throughput >= best * self.KNEE_FRACTION)
+        return knee, samples
+
+    def measure(self, workers: int, seconds: float) -> TuningSample:
+        """Скорость скачивания при workers потоках за seconds секунд"""
+        from .downloader import VideoDownloader, DownloadError
+
+        downloader = VideoDownloader(max_workers=workers)
+        urls = self._urls()
+        lock = threading.Lock()
+        # Завершения сегментов каждого потока: [(время, байт)], первое - прогрев
+        threads_completions: List[List[Tuple[float, int]]] = []
+        errors = [0]
+        started = time.monotonic()
+        deadline = started + seconds
+
+        def worker():
+            completions: List[Tuple[float, int]] = []
+            with lock:
+                threads_completions.append(completions)
+            while len(completions) <= self.MIN_MEASURED or time.monotonic() < deadline:
+                with lock:
+                    url = next(urls)
+                try:
+                    data = downloader.download_segment(url)
+                except DownloadError:
+                    with lock:
+                        errors[0] += 1
+                    return
+                completions.append((time.monotonic(), len(data)))
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        throughput = 0.0
+        for completions in threads_completions:
+            if len(completions) < 2:
+                continue
+            span = completions[-1][0] - completions[0][0]
+            if span > 0:
+                throughput += sum(size for _, size in completions[1:]) / span
+        segments = sum(len(completions) for completions in threads_completions)
+        return TuningSample(workers, throughput, segments, errors[0], elapsed)
+
+    def _urls(self) -> Iterator[str]:
+        """Сегменты по кругу, начиная с места, где остановился прошлый замер"""
+        while True:
+            url = self.segment_urls[self._next % len(self.segment_urls)]
+            self._next += 1
+            yield url
+
+
+def resolve_stream(url: str) -> Tuple[str, List[str]]:
+    """
+    URL потока и сегменты лучшего качества для страницы события или M3U8
+
+    Returns:
+        (URL плейлиста, URL сегментов - ключ профиля по хосту первого из них)
+
+    Raises:
+        TuningError: Если поток не найден или плейлист недоступен
+    """
+    import requests
+    from urllib.parse import urljoin
+    from .m3u8_parser import M3U8Parser, M3U8ParseError
+
+    if '.m3u8' in url.lower():
+        stream_url = url
+    else:
+        from .url_parser import URLParser, URLParseError
+        from .metadata import VideoMetadataExtractor, MetadataExtractionError
+        try:
+            video_id, code = URLParser().parse(url)
+            info = VideoMetadataExtractor().extract_stream_url(video_id, code)
+        except (URLParseError, MetadataExtractionError) as e:
+            raise TuningError(str(e))
+        if info.stream_type != 'm3u8':
+            raise TuningError("Поток отдается одним файлом - подбирать количество потоков не для чего")
+        stream_url = info.stream_url
+
+    try:
+        response = requests.get(stream_url, timeout=30)
+        response.raise_for_status()
+        parser = M3U8Parser()
+        content, base_url = response.text, stream_url
+        if parser.is_master_playlist(content):
+            base_url = urljoin(stream_url, parser.select_best_quality(content))
+            response = requests.get(base_url, timeout=30)
+            response.raise_for_status()
+            content = response.text
+        urls = [segment.url for segment in parser.parse_segments(content, base_url)]
+    except (requests.RequestException, M3U8ParseError) as e:
+        raise TuningError(f"Не удалось загрузить плейлист: {e}")
+    if not urls:
+        raise TuningError("В плейлисте нет сегментов")
+    return stream_url, urls
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI: facecast-dl tune URL [--budget 30] [--max-workers 32]"""
+    parser = argparse.ArgumentParser(
+        prog='facecast-dl tune',
+        description='Подбор количества потоков скачивания для хоста CDN события. '
+                    'Результат сохраняется в профиль и используется, если -w не указан.'
+    )
+    parser.add_argument('url', help='URL события (facecast.net, opendemo.ru) или M3U8 плейлиста')
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET,
+                        help=f'Время на подбор в секундах (по умолчанию: {DEFAULT_BUDGET:.0f})')
+    parser.add_argument('--max-workers', type=int, default=DEFAULT_CANDIDATES[-1],
+                        help=f'Наибольшее проверяемое количество потоков (по умолчанию: {DEFAULT_CANDIDATES[-1]})')
+    parser.add_argument('--profile-file', help=f'Файл профиля (по умолчанию: {default_profile_path()})')
+    parser.add_argument('--dry-run', action='store_true', help='Только показать результат, не сохранять')
+    args = parser.parse_args(argv)
+
+    candidates = [count for count in DEFAULT_CANDIDATES if count <= args.max_workers]
+    if args.max_workers not in candidates and args.max_workers > 0:
+        candidates.append(args.max_workers)
+
+    try:
+        profile = TuningProfile.load(args.profile_file)
+        _, urls = resolve_stream(args.url)
+        host = host_of(urls[0])
+        print(f"Хост CDN: {host}, сегментов в плейлисте: {len(urls)}, бюджет {args.budget:.0f} с")
+
+        def report(sample: TuningSample):
+            errors = f", ошибок {sample.errors}" if sample.errors else ''
+            print(f"  {sample.workers:3} потоков: {format_bytes(sample.throughput):>10}/с "
+                  f"({sample.segments} сегментов{errors})")
+
+        workers, samples = WorkerTuner(urls, args.budget, candidates).run(report)
+    except TuningError as e:
+        print(f"✗ {e}")
+        return 1
+
+    chosen = next(sample for sample in samples if sample.workers == workers)
+    print(f"✓ Выбрано потоков: {workers} ({format_bytes(chosen.throughput)}/с)")
+
+    if args.dry_run:
+        return 0
+    profile.hosts[host] = HostTuning(
+        workers=workers,
+        throughput=chosen.throughput,
+        tuned_at=time.strftime('%Y-%m-%dT%H:%M:%S'),
+        samples={str(sample.workers): sample.throughput for sample in samples},
+    )
+    try:
+        profile.save()
+    except TuningError as e:
+        print(f"✗ {e}")
+        return 1
+    print(f"✓ Профиль сохранен: {profile.path}")
+    return 0
@@ -0,0 +1,110 @@
+"""ChatAlignment: поиск позиции сообщения и часовые пояса"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.chat_alignment import ChatAlignment, ChatAlignmentError, parse_timezone
+from src.chat_message import ChatMessage
+from src.m3u8_parser import Segment
+
+
+START = datetime(2024, 3, 1, 9, 0, tzinfo=timezone.utc)
+MOSCOW = timezone(timedelta(hours=3))
+
+
+def playlist(count=10, duration=6.0, gap_after=None, gap=60.0):
+    """Сегменты с меткой времени у первого; после gap_after - разрыв в gap секунд"""
+    segments = []
+    for index in range(count):
+        moment = None
+        if index == 0:
+            moment = START
+        elif gap_after is not None and index == gap_after + 1:
+            moment = START + timedelta(seconds=index * duration + gap)
+        segments.append(Segment(url=f'seg{index}.ts', duration=duration, program_date_time=moment))
+    return segments
+
+
+def locate(timestamp, segments=None, chat_tz=MOSCOW):
+    alignment = ChatAlignment(segments or playlist(), chat_tz=chat_tz)
+    return alignment.locate(ChatMessage(timestamp, 'Мария', 'текст'))
+
+
+@pytest.mark.parametrize('value, offset', [
+    ('UTC', timedelta(0)),
+    ('Z', timedelta(0)),
+    ('+03:00', timedelta(hours=3)),
+    ('UTC+3', timedelta(hours=3)),
+    ('GMT-0530', -timedelta(hours=5, minutes=30)),
+])
+def test_parse_timezone_offsets(value, offset):
+    assert parse_timezone(value).utcoffset(None) == offset
+
+
+def test_parse_timezone_name():
+    assert parse_timezone('Europe/Moscow').utcoffset(datetime(2024, 3, 1)) == timedelta(hours=3)
+
+
+@pytest.mark.parametrize('value', ['+25:00', 'Mars/Olympus', 'завтра'])
+def test_parse_timezone_rejects_unknown(value):
+    with pytest.raises(ChatAlignmentError):
+        parse_timezone(value)
+
+
+@pytest.mark.parametrize('timestamp, expected', [
+    ('2024-03-01T09:00:07Z', [7.0, 1]),
+    ('2024-03-01T09:00:00+00:00', [0.0, 0]),
+    ('2024-03-01T12:00:31', [31.0, 5]),  # без пояса - chat_tz
+    (str(int(START.timestamp()) + 13), [13.0, 2]),
+    (str(int(START.timestamp() * 1000) + 59_500), [59.5, 9]),
+])
+def test_locate_iso_and_unix_times(timestamp, expected):
+    assert locate(timestamp) == expected
+
+
+def test_clock_time_is_read_in_chat_time_zone():
+    assert locate('12:00:20') == [20.0, 3]
+    assert locate('09:00:20', chat_tz=timezone.utc) == [20.0, 3]
+
+
+def test_times_outside_the_stream_are_clamped():
+    assert locate('2024-03-01T08:59:00Z') == [0.0, 0]
+    assert locate('2024-03-01T10:00:00Z') == [60.0, 9]
+
+
+def test_message_in_a_gap_goes_to_the_next_segment():
+    segments = playlist(gap_after=4)
+
+    # Сегмент 4 заканчивается в 09:00:30, сегмент 5 начинается в 09:01:30
+    assert locate('2024-03-01T09:00:45Z', segments) == [30.0, 5]
+    assert locate('2024-03-01T09:01:33Z', segments) == [33.0, 5]
+
+
+def test_stream_crossing_midnight():
+    late = [Segment(url='seg0.ts', duration=600.0, program_date_time=datetime(2024, 3, 1, 20, 55, tzinfo=timezone.utc))]
+    alignment = ChatAlignment(late, chat_tz=MOSCOW)
+
+    # 23:55 по Москве - начало, 00:01 - уже следующие сутки
+    assert alignment.locate(ChatMessage('00:01', 'Иван', 'текст')) == [360.0, 0]
+
+
+def test_unparsable_times_and_save(tmp_path):
+    messages = [ChatMessage('12:00:06', 'a', 'x'), ChatMessage('', 'b', 'y'), ChatMessage('вчера', 'c', 'z')]
+    path = tmp_path / 'video_chat_align.json'
+
+    assert ChatAlignment(playlist(), chat_tz=MOSCOW).save(messages, str(path)) == 1
+
+    data = json.loads(path.read_text(encoding='utf-8'))
+    assert data['messages'] == [[6.0, 1], [None, None], [None, None]]
+    assert data['duration'] == 60.0 and data['segment_offsets'][:2] == [0.0, 6.0]
+
+
+def test_playlist_without_program_date_time():
+    segments = [Segment(url='seg0.ts', duration=6.0)]
+
+    with pytest.raises(ChatAlignmentError, match='PROGRAM-DATE-TIME'):
+        ChatAlignment(segments)
+    assert ChatAlignment(segments, stream_start=START, chat_tz=MOSCOW).locate(
+        ChatMessage('12:00:03', 'a', 'x')) == [3.0, 0]
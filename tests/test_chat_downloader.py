@@ -0,0 +1,96 @@
+"""Пагинация API чата ChatDownloader против ChatReplayServer"""
+
+from src.chat_downloader import ChatDownloader
+from src.standin.chat import ChatReplayServer
+
+
+VIDEO_ID = 'abc123'
+PATH = f'/api/event/{VIDEO_ID}'
+
+
+def messages(start, count):
+    return [{'id': i, 'username': 'user', 'message': f'сообщение {i}', 'time': '12:00'}
+            for i in range(start, start + count)]
+
+
+def record(query, body, status=200):
+    return {'path': PATH, 'query': query, 'status': status, 'body': body}
+
+
+def download(records, **kwargs):
+    """Скачивает чат с сервера записей; возвращает (сообщения, запросы к API событий)"""
+    with ChatReplayServer(records) as server:
+        downloader = ChatDownloader(page_size=100, **kwargs)
+        downloader.BASE_URL = server.base_url
+        chat = downloader.download_chat(VIDEO_ID)
+    return chat, [query for path, query in server.requests_log if path == PATH]
+
+
+def texts(chat):
+    return [message.message for message in chat]
+
+
+def test_offset_pages_with_total():
+    records = [
+        record({'offset': '0'}, {'total': 250, 'messages': messages(0, 100)}),
+        record({'offset': '100'}, {'total': 250, 'messages': messages(100, 100)}),
+        record({'offset': '200'}, {'total': 250, 'messages': messages(200, 50)}),
+    ]
+    chat, log = download(records)
+
+    assert texts(chat) == [f'сообщение {i}' for i in range(250)]
+    assert sorted(int(query['offset']) for query in log) == [0, 100, 200]
+
+
+def test_cursor_chain():
+    records = [
+        record({'offset': '0'}, {'next_cursor': 'p2', 'chat': messages(0, 100)}),
+        record({'cursor': 'p2'}, {'next_cursor': 'p3', 'chat': messages(100, 100)}),
+        record({'cursor': 'p3'}, {'chat': messages(200, 20)}),
+    ]
+    chat, log = download(records)
+
+    assert len(chat) == 220
+    assert [query.get('cursor') for query in log] == [None, 'p2', 'p3']
+    assert 'offset' not in log[1]
+
+
+def test_short_first_page_is_the_whole_history():
+    records = [record({'offset': '0'}, {'messages': messages(0, 40)})]
+    chat, log = download(records)
+
+    assert len(chat) == 40
+    assert len(log) == 1
+
+
+def test_cursor_ignored_by_server_stops_on_repeated_page():
+    records = [
+        record({'cursor': 'p2'}, {'next_cursor': 'p3', 'messages': messages(0, 100)}),
+        record({'cursor': 'p3'}, {'next_cursor': 'p4', 'messages': messages(0, 100)}),
+        record({}, {'next_cursor': 'p2', 'messages': messages(0, 100)}),
+    ]
+    chat, log = download(records)
+
+    assert len(chat) == 100
+    assert len(log) == 2
+
+
+def test_failed_page_does_not_truncate_history(capsys):
+    records = [
+        record({'offset': '0'}, {'total': 300, 'messages': messages(0, 100)}),
+        record({'offset': '100'}, {'error': 'rate limited'}, status=429),
+        record({'offset': '200'}, {'total': 300, 'messages': messages(200, 100)}),
+    ]
+    chat, _ = download(records, max_workers=1)
+
+    # Неполная история не выдается за полную
+    assert chat == []
+    assert 'HTTP 429' in capsys.readouterr().out
+
+
+def test_missing_chat_api_is_not_an_error(capsys):
+    chat, log = download([])
+
+    assert chat == []
+    assert len(log) == 1
+    assert capsys.readouterr().out == ''
@@ -0,0 +1,97 @@
+"""Потоковый экспорт чата: форматы, сжатие, количество сообщений"""
+
+import gzip
+import json
+
+import pytest
+
+from src.chat_export import (
+    ZSTD_AVAILABLE, ChatExportError, export_chat, open_output, output_path_for
+)
+from src.chat_message import ChatMessage
+
+
+MESSAGES = [
+    ChatMessage('12:00', 'Мария', 'добрый день', user_id='7'),
+    ChatMessage('12:01', 'Иван', 'цитата: "<b>"\nвторая строка'),
+    ChatMessage('', 'Гость', 'без времени'),
+]
+
+
+@pytest.mark.parametrize('source', [list, iter], ids=['list', 'generator'])
+def test_json_export_is_valid_json(tmp_path, source):
+    path = tmp_path / 'chat.json'
+
+    assert export_chat(source(MESSAGES), str(path), 'json') == 3
+
+    data = json.loads(path.read_text(encoding='utf-8'))
+    assert data['message_count'] == 3
+    assert [ChatMessage.from_dict(item).to_dict() for item in data['messages']] == \
+        [message.to_dict() for message in MESSAGES]
+
+
+def test_empty_json_export(tmp_path):
+    path = tmp_path / 'chat.json'
+
+    assert export_chat(iter([]), str(path), 'json') == 0
+    data = json.loads(path.read_text(encoding='utf-8'))
+    assert (data['messages'], data['message_count']) == ([], 0)
+
+
+def test_jsonl_export_has_one_message_per_line(tmp_path):
+    path = tmp_path / 'chat.jsonl'
+    export_chat(MESSAGES, str(path), 'jsonl')
+
+    lines = path.read_text(encoding='utf-8').splitlines()
+    assert [json.loads(line)['username'] for line in lines] == ['Мария', 'Иван', 'Гость']
+
+
+def test_txt_export_counts_generator_messages_at_the_end(tmp_path):
+    path = tmp_path / 'chat.txt'
+    export_chat(iter(MESSAGES), str(path), 'txt', title='Вебинар')
+
+    text = path.read_text(encoding='utf-8')
+    assert 'Вебинар' in text and '[12:00] Мария: добрый день' in text
+    assert '[??:??:??] Гость: без времени' in text
+    assert text.rstrip().endswith('Всего сообщений: 3')
+
+
+def test_html_export_escapes_text(tmp_path):
+    path = tmp_path / 'chat.html'
+    export_chat(MESSAGES, str(path), 'html', title='<Вебинар>')
+
+    html = path.read_text(encoding='utf-8')
+    assert '<title>&lt;Вебинар&gt;</title>' in html
+    assert '&quot;&lt;b&gt;&quot;' in html and '<b>' not in html
+
+
+def test_gzip_is_chosen_by_suffix(tmp_path):
+    path = output_path_for(str(tmp_path / 'chat'), 'jsonl', 'gzip')
+    assert path.endswith('chat.jsonl.gz')
+
+    export_chat(MESSAGES, path, 'jsonl')
+
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        assert len(f.read().splitlines()) == 3
+
+
+@pytest.mark.skipif(ZSTD_AVAILABLE, reason='zstandard установлен')
+def test_zstd_without_zstandard_raises(tmp_path):
+    with pytest.raises(ChatExportError, match='pip install zstandard'):
+        open_output(str(tmp_path / 'chat.json.zst'))
+
+
+@pytest.mark.skipif(not ZSTD_AVAILABLE, reason='zstandard не установлен')
+def test_zstd_round_trip(tmp_path):
+    import zstandard
+
+    path = tmp_path / 'chat.jsonl.zst'
+    export_chat(MESSAGES, str(path), 'jsonl')
+
+    text = zstandard.ZstdDecompressor().decompress(path.read_bytes(), max_output_size=1 << 20)
+    assert len(text.decode('utf-8').splitlines()) == 3
+
+
+def test_unknown_format_raises(tmp_path):
+    with pytest.raises(ChatExportError, match='Неизвестный формат'):
+        export_chat(MESSAGES, str(tmp_path / 'chat.xml'), 'xml')
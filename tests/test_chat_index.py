@@ -0,0 +1,85 @@
+"""ChatIndex: загрузка экспортов и полнотекстовый поиск"""
+
+import json
+
+import pytest
+
+from src.chat_export import export_chat
+from src.chat_index import ChatIndex, ChatIndexError, main
+from src.chat_message import ChatMessage
+
+
+def write_export(path, messages):
+    path.write_text(json.dumps({'messages': messages}, ensure_ascii=False), encoding='utf-8')
+
+
+def test_truncated_export_does_not_stop_ingest(tmp_path, capsys):
+    archive = tmp_path / 'archive'
+    archive.mkdir()
+    (archive / 'aaa_chat.json').write_text('{"messages": [{"timestamp": "12:00", "username": "a", '
+                                           '"message": "обрыв"}, {"timestamp": "12:0', encoding='utf-8')
+    write_export(archive / 'bbb_chat.json', [
+        {'timestamp': '12:01', 'username': 'Мария', 'message': 'запись вебинара'},
+    ])
+    db = str(tmp_path / 'index.db')
+
+    assert main(['--db', db, 'ingest', str(archive)]) == 0
+    output = capsys.readouterr().out
+    assert 'aaa_chat.json' in output and '⚠' in output
+    assert 'bbb_chat.json: добавлено 1' in output
+
+    assert main(['--db', db, 'search', 'вебинара']) == 0
+    assert 'bbb [12:01] Мария' in capsys.readouterr().out
+
+
+WEBINAR = [
+    ChatMessage('12:00', 'Мария', 'Добрый день! Когда будет запись вебинара?'),
+    ChatMessage('12:05', 'Иван', 'Запись пришлют на почту'),
+    ChatMessage('12:10', 'Мария', 'Спасибо за ответы на вопросы'),
+    ChatMessage('12:30', 'Ольга', 'Ещё вопрос про домашнее задание'),
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    with ChatIndex(str(tmp_path / 'index.db')) as index:
+        index.ingest_messages('webinar', WEBINAR)
+        index.ingest_messages('lecture', [ChatMessage('10:00', 'Иван', 'Где запись лекции?')])
+        yield index
+
+
+def test_search_matches_words_and_prefixes(index):
+    assert {hit.event_id for hit in index.search('запись')} == {'webinar', 'lecture'}
+    assert [hit.message for hit in index.search('вопрос*', event_id='webinar', author='Мария')] == \
+        ['Спасибо за ответы на вопросы']
+    assert index.search('вебинара')[0].snippet == 'Добрый день! Когда будет запись [вебинара]?'
+
+
+def test_search_filters_by_time(index):
+    hits = index.search('вопрос* OR запись', event_id='webinar', since='12:05', until='12:10')
+
+    assert sorted(hit.timestamp for hit in hits) == ['12:05', '12:10']
+
+
+def test_search_ignores_case(index):
+    assert [hit.username for hit in index.search('ДОМАШНЕЕ')] == ['Ольга']
+
+
+def test_repeated_ingest_adds_nothing(index):
+    assert index.ingest_messages('webinar', WEBINAR) == 0
+    assert index.count('webinar') == 4 and index.count() == 5
+
+
+def test_unchanged_file_is_skipped(tmp_path):
+    path = tmp_path / 'webinar_chat.jsonl'
+    export_chat(WEBINAR, str(path), 'jsonl')
+
+    with ChatIndex(str(tmp_path / 'index.db')) as index:
+        assert index.ingest_file(str(path)) == 4
+        assert index.ingest_file(str(path)) == 0
+        assert index.search('почту')[0].event_id == 'webinar'
+
+
+def test_invalid_query_raises(index):
+    with pytest.raises(ChatIndexError, match='Неверный поисковый запрос'):
+        index.search('"незакрытая')
@@ -0,0 +1,62 @@
+"""PageFetcher: ограничение количества страниц"""
+
+from src.chat_pagination import Page, PageFetcher, item_id
+
+
+def endless_history(page_size, with_total=False, with_cursor=False):
+    """Сервер с бесконечной историей; возвращает (fetch_page, журнал запросов)"""
+    log = []
+
+    def fetch_page(offset=0, cursor=None):
+        start = int(cursor) if cursor else offset
+        log.append(start)
+        items = [{'id': i} for i in range(start, start + page_size)]
+        return Page(items,
+                    total=10 ** 6 if with_total else None,
+                    cursor=str(start + page_size) if with_cursor else None)
+
+    return fetch_page, log
+
+
+def fetch_capped(capsys, **kwargs):
+    fetch_page, log = endless_history(10, **kwargs)
+    pages = PageFetcher(fetch_page, page_size=10, max_workers=3, key=item_id, max_pages=5).fetch()
+    return pages, log, capsys.readouterr().out
+
+
+def test_offset_pages_beyond_the_cap_are_reported(capsys):
+    pages, log, output = fetch_capped(capsys, with_total=True)
+
+    assert len(pages) == 6 and len(log) == 6
+    assert '⚠ История чата обрезана' in output
+
+
+def test_cursor_chain_beyond_the_cap_is_reported(capsys):
+    pages, log, output = fetch_capped(capsys, with_cursor=True)
+
+    assert len(pages) == 6 and len(log) == 6
+    assert '⚠ История чата обрезана' in output
+
+
+def test_full_pages_beyond_the_cap_are_reported(capsys):
+    pages, log, output = fetch_capped(capsys)
+
+    # Пачки по max_workers не выходят за ограничение
+    assert len(pages) == 6 and len(log) == 6
+    assert '⚠ История чата обрезана' in output
+
+
+def test_complete_history_is_not_reported(capsys):
+    def fetch_page(offset=0, cursor=None):
+        return Page([{'id': i} for i in range(offset, min(offset + 10, 45))], total=45)
+
+    pages = PageFetcher(fetch_page, page_size=10, max_pages=5).fetch()
+
+    assert sum(map(len, pages)) == 45
+    assert capsys.readouterr().out == ''
+
+
+def test_cli_default_matches_page_fetcher():
+    from src.download import CHAT_WORKERS
+
+    assert CHAT_WORKERS == PageFetcher.DEFAULT_WORKERS
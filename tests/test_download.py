@@ -0,0 +1,42 @@
+"""download_video против HLSStandInServer: завершенный и живой плейлист"""
+
+import pytest
+
+from src.download import download_video
+from src.m3u8_parser import M3U8Parser
+from src.metadata import VideoMetadataExtractor
+from src.standin.hls import HLSConfig, HLSStandInServer
+
+
+def download(tmp_path, monkeypatch, **config):
+    with HLSStandInServer(HLSConfig(segments=12, segment_size=16 * 188, **config)) as server:
+        monkeypatch.setattr(VideoMetadataExtractor, 'BASE_URL', server.base_url)
+        result = download_video('https://facecast.net/w/standin', output_dir=str(tmp_path),
+                                filename='video.ts', workers=3)
+        expected = b''.join(server.segment(i) for i in range(12))
+    return result, expected
+
+
+def test_finished_stream_is_downloaded(tmp_path, monkeypatch):
+    result, expected = download(tmp_path, monkeypatch)
+
+    assert result.success
+    assert (tmp_path / 'video.ts').read_bytes() == expected
+
+
+def test_live_playlist_fails_clearly_without_a_partial_file(tmp_path, monkeypatch):
+    result, _ = download(tmp_path, monkeypatch, live=True, live_window=5)
+
+    assert not result.success
+    assert 'Трансляция еще идет' in result.error_message
+    assert not (tmp_path / 'video.ts').exists()
+
+
+@pytest.mark.parametrize('content, live', [
+    ('#EXTM3U\n#EXTINF:4,\nseg0.ts\n#EXT-X-ENDLIST\n', False),
+    ('#EXTM3U\n#EXT-X-PLAYLIST-TYPE:VOD\n#EXTINF:4,\nseg0.ts\n', False),
+    ('#EXTM3U\n#EXT-X-MEDIA-SEQUENCE:40\n#EXTINF:4,\nseg40.ts\n', True),
+    ('#EXTM3U\n#EXT-X-PLAYLIST-TYPE:EVENT\n#EXTINF:4,\nseg0.ts\n', True),
+])
+def test_is_live(content, live):
+    assert M3U8Parser().is_live(content) == live
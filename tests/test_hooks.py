@@ -0,0 +1,93 @@
+"""DownloadHooks: рассылка вызовов и события скачивания"""
+
+import threading
+
+from src.downloader import VideoDownloader
+from src.hooks import DownloadHooks, HookList, as_hook_list
+from src.standin.hls import HLSConfig, HLSStandInServer
+
+
+class Recorder(DownloadHooks):
+    """Записывает события (вызовы приходят из рабочих потоков)"""
+
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+
+    def _add(self, *event):
+        with self._lock:
+            self.events.append(event)
+
+    def on_download_start(self, segments, total_bytes, workers, output_path):
+        self._add('start', segments, workers)
+
+    def on_request_end(self, url, kind, status, nbytes, latency, error):
+        self._add('request', kind, status)
+
+    def on_retry(self, url, attempt, reason, error):
+        self._add('retry', reason)
+
+    def on_segment_written(self, index, nbytes, latency):
+        self._add('written', index, nbytes)
+
+    def on_download_end(self, success, error):
+        self._add('end', success, error)
+
+    def of(self, name):
+        return [event for event in self.events if event[0] == name]
+
+
+class Chat(DownloadHooks):
+    def __init__(self, log, name):
+        self.log, self.name = log, name
+
+    def on_chat_messages(self, source, count):
+        self.log.append((self.name, source, count))
+
+
+def test_hook_list_dispatches_only_to_overriding_hooks():
+    log = []
+    first, second = Chat(log, 'first'), Chat(log, 'second')
+
+    single = HookList([Recorder(), first])
+    assert single.on_chat_messages == first.on_chat_messages
+
+    hooks = HookList([first, HookList([second]), None])
+    hooks.on_chat_messages('api', 3)
+    hooks.on_cache_hit('seg.ts', 10)
+
+    assert log == [('first', 'api', 3), ('second', 'api', 3)]
+    assert hooks.hooks == [first, second]
+
+
+def test_as_hook_list():
+    recorder = Recorder()
+    hooks = as_hook_list(recorder)
+
+    assert as_hook_list(hooks) is hooks and hooks.hooks == [recorder]
+    assert not as_hook_list(None)
+    assert as_hook_list([recorder, None]).hooks == [recorder]
+
+
+def test_download_reports_requests_retries_and_segments(tmp_path, monkeypatch):
+    # Обрывается каждый второй ответ; попыток хватает, чтобы получить все сегменты
+    download_segment = VideoDownloader.download_segment
+    monkeypatch.setattr(VideoDownloader, 'download_segment',
+                        lambda self, url: download_segment(self, url, retry_count=30))
+    monkeypatch.setattr(VideoDownloader, 'RETRY_DELAY', 0)
+    config = HLSConfig(segments=12, segment_size=16 * 188, truncate_rate=0.5, seed=3)
+    recorder = Recorder()
+
+    with HLSStandInServer(config) as server:
+        result = VideoDownloader(max_workers=3, hooks=[recorder]).download_segments(
+            server.segment_urls(), str(tmp_path / 'video.ts'))
+        expected = b''.join(server.segment(i) for i in range(12))
+
+    assert result.success
+    assert (tmp_path / 'video.ts').read_bytes() == expected
+    assert recorder.of('start') == [('start', 12, 3)]
+    assert sorted(index for _, index, _ in recorder.of('written')) == list(range(12))
+    assert recorder.of('retry'), 'обрывы ответов должны приводить к повторам'
+    assert len(recorder.of('request')) == 12 + len(recorder.of('retry'))
+    assert {kind for _, kind, _ in recorder.of('request')} == {'segment'}
+    assert recorder.events[-1] == ('end', True, None)
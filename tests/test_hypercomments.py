@@ -0,0 +1,131 @@
+"""HyperCommentsClient против ChatReplayServer"""
+
+import pytest
+
+from src.hypercomments import HyperCommentsClient, HyperCommentsError
+from src.standin.chat import ChatReplayServer
+
+
+PATH = HyperCommentsClient.HISTORY_PATH
+
+
+def comments(start, count):
+    return [{'id': i, 'nick': f'user{i % 3}', 'text': f'сообщение {i}', 'time': 1700000000 + i}
+            for i in range(start, start + count)]
+
+
+def record(query, body, status=200):
+    return {'path': PATH, 'query': query, 'status': status, 'body': body}
+
+
+def fetch(records, **kwargs):
+    """Скачивает историю с сервера записей; возвращает (сообщения, журнал запросов)"""
+    with ChatReplayServer(records) as server:
+        client = HyperCommentsClient('42', base_url=server.base_url, page_size=100, **kwargs)
+        messages = client.fetch_history('event')
+    return messages, server.requests_log
+
+
+def texts(messages):
+    return [message.message for message in messages]
+
+
+def test_offset_pages_with_total():
+    records = [
+        record({'offset': '0'}, {'total': 250, 'data': comments(0, 100)}),
+        record({'offset': '100'}, {'total': 250, 'data': comments(100, 100)}),
+        record({'offset': '200'}, {'total': 250, 'data': comments(200, 50)}),
+    ]
+    messages, log = fetch(records)
+
+    assert texts(messages) == [f'сообщение {i}' for i in range(250)]
+    assert sorted(int(query['offset']) for _, query in log) == [0, 100, 200]
+    assert all(query['widget_id'] == '42' and query['xid'] == 'event' for _, query in log)
+
+
+def test_overlapping_offset_pages_are_deduplicated():
+    # За время скачивания в чат добавились сообщения - страницы сдвинулись
+    records = [
+        record({'offset': '0'}, {'total': 200, 'data': comments(0, 100)}),
+        record({'offset': '100'}, {'total': 200, 'data': comments(95, 100)}),
+    ]
+    messages, _ = fetch(records)
+
+    assert texts(messages) == [f'сообщение {i}' for i in range(195)]
+
+
+def test_cursor_chain():
+    records = [
+        record({'offset': '0'}, {'next_cursor': 'b', 'data': comments(0, 100)}),
+        record({'cursor': 'b'}, {'next_cursor': 'c', 'data': comments(100, 100)}),
+        record({'cursor': 'c'}, {'data': comments(200, 10)}),
+    ]
+    messages, log = fetch(records)
+
+    assert len(messages) == 210
+    assert [query.get('cursor') for _, query in log] == [None, 'b', 'c']
+
+
+def test_reads_until_short_page():
+    records = [
+        record({'offset': '0'}, {'data': comments(0, 100)}),
+        record({'offset': '100'}, {'data': comments(100, 100)}),
+        record({'offset': '200'}, {'data': comments(200, 30)}),
+        record({'offset': '300'}, {'data': []}),
+    ]
+    messages, log = fetch(records, max_workers=1)
+
+    assert len(messages) == 230
+    assert [query['offset'] for _, query in log] == ['0', '100', '200']
+
+
+def test_server_ignoring_offset_stops_after_repeated_page():
+    records = [record({}, {'data': comments(0, 100)})]
+    messages, log = fetch(records, max_workers=4)
+
+    assert len(messages) == 100
+    # Первая страница и одна пачка запросов, а не MAX_PAGES
+    assert len(log) <= 1 + 4
+
+
+def test_failed_page_raises():
+    records = [
+        record({'offset': '0'}, {'total': 300, 'data': comments(0, 100)}),
+        record({'offset': '100'}, {'error': 'busy'}, status=503),
+        record({'offset': '200'}, {'total': 300, 'data': comments(200, 100)}),
+    ]
+    with pytest.raises(HyperCommentsError):
+        fetch(records)
+
+
+def test_api_error_result_raises():
+    records = [record({'offset': '0'}, {'result': 'error', 'description': 'widget not found'})]
+    with pytest.raises(HyperCommentsError, match='widget not found'):
+        fetch(records)
+
+
+def test_timestamps_are_utc():
+    records = [record({'offset': '0'}, {'data': [{'id': 1, 'nick': 'a', 'text': 'x', 'time': 1700000000000}]})]
+    messages, _ = fetch(records)
+
+    assert messages[0].timestamp == '2023-11-14T22:13:20+00:00'
+
+
+def test_recorded_responses_replay(tmp_path):
+    records = [
+        record({'offset': '0'}, {'total': 150, 'data': comments(0, 100)}),
+        record({'offset': '100'}, {'total': 150, 'data': comments(100, 50)}),
+    ]
+    original, _ = fetch(records, record_dir=str(tmp_path))
+
+    with ChatReplayServer.from_directory(str(tmp_path)) as server:
+        replayed = HyperCommentsClient('42', base_url=server.base_url, page_size=100).fetch_history('event')
+
+    assert [message.to_dict() for message in replayed] == [message.to_dict() for message in original]
+
+
+def test_discover_widget():
+    html = '<script>_hcwp.push({widget: "Stream", widget_id: 12345, xid: "event-7"});</script>'
+
+    assert HyperCommentsClient.discover(html, 'https://facecast.net/w/abc') == ('12345', 'event-7')
+    assert HyperCommentsClient.discover('<html></html>', 'https://facecast.net/w/abc') is None
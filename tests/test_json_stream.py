@@ -0,0 +1,73 @@
+"""JSONArrayStream: выбор массива и разбор фрагментами"""
+
+import json
+import random
+
+import pytest
+
+from src.json_stream import JSONArrayStream
+
+
+def split(data, seed, max_size=16):
+    """Режет документ на фрагменты случайной длины"""
+    rng = random.Random(seed)
+    chunks = []
+    position = 0
+    while position < len(data):
+        size = rng.randint(1, max_size)
+        chunks.append(data[position:position + size])
+        position += size
+    return chunks
+
+
+def read(document, seed=0, **kwargs):
+    stream = JSONArrayStream(split(document, seed), **kwargs)
+    return list(stream), stream.found_key, stream.meta
+
+
+def test_top_level_key_wins_over_nested_array():
+    document = '{"event": {"items": [{"id": 1}]}, "chat": [{"id": 2}], "total": 1}'
+
+    assert read(document) == ([{'id': 2}], 'chat', {'total': 1})
+
+
+def test_top_level_keys_follow_priority_order():
+    document = '{"data": [1], "messages": [2], "chat": [3]}'
+
+    assert read(document)[:2] == ([3], 'chat')
+    assert read('{"data": [1], "messages": [2]}')[:2] == ([2], 'messages')
+
+
+def test_nested_array_is_used_when_no_top_level_array():
+    document = '{"event": {"title": "t", "items": [1, 2]}, "next_cursor": "c2"}'
+
+    items, key, meta = read(document)
+    assert (items, key) == ([1, 2], 'items')
+    assert meta['next_cursor'] == 'c2' and meta['title'] == 't'
+
+
+def test_top_level_key_that_is_not_an_array_is_skipped():
+    assert read('{"chat": {"enabled": true}, "messages": [1]}')[:2] == ([1], 'messages')
+
+
+def test_root_array():
+    assert read('[{"messages": [1]}, 2]')[:2] == ([{'messages': [1]}, 2], None)
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_multibyte_characters_split_between_byte_chunks(seed):
+    rng = random.Random(seed)
+    items = [{'id': i, 'username': 'Мария', 'message': 'привет 😀 ' * rng.randint(0, 3)}
+             for i in range(rng.randint(0, 10))]
+    document = json.dumps({'messages': items, 'next_cursor': 'курсор'}, ensure_ascii=False).encode('utf-8')
+
+    stream = JSONArrayStream(split(document, seed, max_size=5))
+    assert list(stream) == items
+    assert stream.meta['next_cursor'] == 'курсор'
+
+
+def test_truncated_multibyte_character_raises():
+    document = '{"messages": ["ё"]}'.encode('utf-8')[:-4]
+
+    with pytest.raises(UnicodeDecodeError):
+        list(JSONArrayStream([document]))
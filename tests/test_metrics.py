@@ -0,0 +1,91 @@
+"""Метрики Prometheus: формат, гистограммы, обработчики и сервер"""
+
+import urllib.error
+import urllib.request
+
+import pytest
+
+from src.metrics import (
+    CHAT_MESSAGES, RETRIES, SEGMENTS, MetricsError, MetricsHooks, MetricsRegistry, MetricsServer
+)
+
+
+def test_counter_and_gauge_rendering():
+    registry = MetricsRegistry()
+    requests = registry.counter('test_requests_total', 'Запросы', ['host'])
+    depth = registry.gauge('test_queue_depth', 'Очередь')
+
+    requests.inc(host='cdn.example')
+    requests.inc(2.5, host='edge"1')
+    depth.set(10)
+    depth.dec(3)
+
+    assert registry.render().splitlines() == [
+        '# HELP test_requests_total Запросы',
+        '# TYPE test_requests_total counter',
+        'test_requests_total{host="cdn.example"} 1',
+        'test_requests_total{host="edge\\"1"} 2.5',
+        '# HELP test_queue_depth Очередь',
+        '# TYPE test_queue_depth gauge',
+        'test_queue_depth 7',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram('test_seconds', 'Время', buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        latency.observe(value)
+
+    samples = [line for line in registry.render().splitlines() if not line.startswith('#')]
+    assert samples == [
+        'test_seconds_bucket{le="0.1"} 1',
+        'test_seconds_bucket{le="1"} 3',
+        'test_seconds_bucket{le="+Inf"} 4',
+        'test_seconds_sum 4.25',
+        'test_seconds_count 4',
+    ]
+
+
+def test_labels_and_names_are_checked():
+    registry = MetricsRegistry()
+    counter = registry.counter('test_total', 'Счетчик', ['host'])
+
+    with pytest.raises(ValueError, match='ожидает метки'):
+        counter.inc(kind='segment')
+    with pytest.raises(ValueError, match='уже зарегистрирована'):
+        registry.gauge('test_total', 'Повтор')
+
+
+def test_hooks_update_process_metrics():
+    hooks = MetricsHooks()
+    written = SEGMENTS.value(result='written')
+    retries = RETRIES.value(host='cdn.example', reason='validation')
+    chat = CHAT_MESSAGES.value(source='api')
+
+    hooks.on_segment_written(0, 188, 0.1)
+    hooks.on_retry('https://cdn.example/seg1.ts', 1, 'validation', ValueError())
+    hooks.on_chat_messages('api', 40)
+
+    assert SEGMENTS.value(result='written') == written + 1
+    assert RETRIES.value(host='cdn.example', reason='validation') == retries + 1
+    assert CHAT_MESSAGES.value(source='api') == chat + 40
+
+
+def test_server_exposes_registry():
+    registry = MetricsRegistry()
+    registry.counter('test_total', 'Счетчик').inc(5)
+    server = MetricsServer(0, registry=registry)
+    server.start()
+    try:
+        url = f'http://127.0.0.1:{server.port}'
+        with urllib.request.urlopen(url + '/metrics') as response:
+            assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+            assert 'test_total 5' in response.read().decode('utf-8')
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(url + '/other')
+
+        with pytest.raises(MetricsError, match='Не удалось открыть порт'):
+            MetricsServer(server.port).start()
+    finally:
+        server.stop()
@@ -0,0 +1,32 @@
+"""OpendemoChat: время сообщений, полученных через API"""
+
+import time
+
+import pytest
+
+from src.chat_downloader import ChatDownloader
+from src.chat_message import ChatMessage
+from src.opendemo_chat import OpendemoChat
+
+
+@pytest.fixture
+def moscow_tz(monkeypatch):
+    monkeypatch.setenv('TZ', 'Europe/Moscow')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_api_times_are_shown_in_local_time_like_the_widget(monkeypatch, moscow_tz):
+    api_messages = [
+        ChatMessage('2024-03-01T09:30:00+00:00', 'Мария', 'добрый день'),
+        ChatMessage('2024-03-01T21:05:00+00:00', 'Иван', 'спасибо'),
+    ]
+    monkeypatch.setattr(ChatDownloader, 'download_hypercomments', lambda self, video_id, code=None: api_messages)
+
+    # Браузер не нужен: OpendemoChat() без Selenium не создается
+    chat = OpendemoChat.__new__(OpendemoChat)
+    messages = chat._extract_via_api('zfvfh8', '1')
+
+    assert [message.timestamp for message in messages] == ['12:30', '00:05']
@@ -0,0 +1,152 @@
+"""Приемники сегментов: порядок записи и сборка итогового файла"""
+
+import os
+import stat
+
+import pytest
+
+from src.output_sink import (
+    FFmpegSink, OrderedFileSink, OutputSinkError, PositionalFileSink, create_sink
+)
+
+
+SEGMENTS = [bytes([i]) * (100 + i) for i in range(5)]
+
+positional = pytest.mark.skipif(not PositionalFileSink.is_supported(), reason='нет os.pwrite')
+
+
+@pytest.mark.parametrize('preallocate', [None, 10 ** 6])
+def test_ordered_sink_writes_out_of_order_segments_in_order(tmp_path, preallocate):
+    path = tmp_path / 'video.ts'
+    with OrderedFileSink(str(path), preallocate=preallocate) as sink:
+        sink.write(2, SEGMENTS[2])
+        sink.write(1, SEGMENTS[1])
+        assert (sink.pending_count, sink.next_index) == (2, 0)
+        assert sink.pending_bytes == len(SEGMENTS[1]) + len(SEGMENTS[2])
+        sink.write(0, SEGMENTS[0])
+        assert (sink.pending_count, sink.next_index) == (0, 3)
+        sink.write(1, b'duplicate')
+        sink.write(4, SEGMENTS[4])
+        sink.write(3, SEGMENTS[3])
+
+    assert path.read_bytes() == b''.join(SEGMENTS)
+    assert sink.segment_sizes == [len(data) for data in SEGMENTS]
+
+
+def test_ordered_sink_with_a_gap_fails_and_removes_file(tmp_path):
+    path = tmp_path / 'video.ts'
+    sink = OrderedFileSink(str(path))
+    sink.open()
+    sink.write(0, SEGMENTS[0])
+    sink.write(2, SEGMENTS[2])
+
+    with pytest.raises(OutputSinkError, match='Сегмент 2 не получен'):
+        sink.close()
+    sink.abort()
+
+    assert not path.exists()
+
+
+def test_create_sink_choice(tmp_path):
+    path = str(tmp_path / 'video.ts')
+
+    assert isinstance(create_sink(path, remux=True, sizes=[188]), FFmpegSink)
+    assert isinstance(create_sink(path, estimated_size=188), OrderedFileSink)
+    if PositionalFileSink.is_supported():
+        assert isinstance(create_sink(path, sizes=[188]), PositionalFileSink)
+
+
+def fake_ffmpeg(tmp_path, script):
+    """Исполняемый файл вместо ffmpeg: последний аргумент - путь к результату"""
+    path = tmp_path / 'ffmpeg'
+    path.write_text('#!/bin/sh\nfor last; do :; done\n' + script + '\n')
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path)
+
+
+ffmpeg_stub = pytest.mark.skipif(os.name != 'posix', reason='заглушка ffmpeg - shell скрипт')
+
+
+@ffmpeg_stub
+def test_ffmpeg_sink_pipes_segments_in_order(tmp_path):
+    path = tmp_path / 'video.mp4'
+    with FFmpegSink(str(path), ffmpeg_path=fake_ffmpeg(tmp_path, 'cat > "$last"')) as sink:
+        for index in (1, 0, 3, 2, 4):
+            sink.write(index, SEGMENTS[index])
+
+    assert path.read_bytes() == b''.join(SEGMENTS)
+    assert sink.command()[-3:] == ['-f', 'mp4', str(path)]
+
+
+@ffmpeg_stub
+def test_ffmpeg_failure_is_reported_and_output_removed(tmp_path):
+    path = tmp_path / 'video.mp4'
+    script = 'cat > "$last"; echo "Invalid data found" >&2; exit 1'
+    sink = FFmpegSink(str(path), ffmpeg_path=fake_ffmpeg(tmp_path, script))
+    sink.open()
+    sink.write(0, SEGMENTS[0])
+
+    with pytest.raises(OutputSinkError, match='кодом 1: Invalid data found'):
+        sink.close()
+    assert not path.exists()
+
+
+def test_missing_ffmpeg(tmp_path, monkeypatch):
+    monkeypatch.setattr('shutil.which', lambda name: None)
+
+    with pytest.raises(OutputSinkError, match='ffmpeg не найден'):
+        FFmpegSink(str(tmp_path / 'video.mp4')).open()
+
+
+@positional
+def test_positional_sink_writes_segments_in_place(tmp_path):
+    path = tmp_path / 'video.ts'
+    with PositionalFileSink(str(path), [len(data) for data in SEGMENTS]) as sink:
+        for index in (3, 0, 4, 1, 2):
+            sink.write(index, SEGMENTS[index])
+
+    assert path.read_bytes() == b''.join(SEGMENTS)
+    assert sink.bytes_written == path.stat().st_size
+
+
+@positional
+def test_mismatched_segments_are_spilled_and_relaid(tmp_path):
+    path = tmp_path / 'video.ts'
+    actual = list(SEGMENTS)
+    actual[1] = b'\x01' * 10
+    actual[3] = b'\x03' * 500
+    with PositionalFileSink(str(path), [len(data) for data in SEGMENTS]) as sink:
+        for index in (4, 3, 2, 1, 0):
+            sink.write(index, actual[index])
+        # Сегменты другого размера не ждут закрытия в памяти
+        assert sink.pending_bytes == 0
+
+    assert path.read_bytes() == b''.join(actual)
+    assert sink.segment_sizes == [len(data) for data in actual]
+    assert sorted(os.listdir(tmp_path)) == ['video.ts']
+
+
+@positional
+def test_failed_close_removes_partial_file(tmp_path):
+    path = tmp_path / 'video.ts'
+    sink = PositionalFileSink(str(path), [len(data) for data in SEGMENTS])
+    sink.open()
+    sink.write(0, SEGMENTS[0])
+    sink.write(1, b'short')
+
+    with pytest.raises(OutputSinkError, match='Не получено сегментов: 3'):
+        sink.close()
+    sink.abort()
+
+    assert os.listdir(tmp_path) == []
+
+
+@positional
+def test_exception_inside_with_removes_partial_file(tmp_path):
+    path = tmp_path / 'video.ts'
+    with pytest.raises(RuntimeError):
+        with PositionalFileSink(str(path), [len(data) for data in SEGMENTS]) as sink:
+            sink.write(0, SEGMENTS[0])
+            raise RuntimeError('прервано')
+
+    assert not path.exists()
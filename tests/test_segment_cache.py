@@ -0,0 +1,32 @@
+"""Ключи кэша сегментов"""
+
+from src.segment_cache import SegmentCache, normalize_url
+
+
+def test_known_cdn_signatures_are_dropped():
+    assert normalize_url('https://CDN.example:443/v/seg1.ts?hdnts=exp=1~hmac=2&q=hd') == \
+        'https://cdn.example/v/seg1.ts?q=hd'
+    assert normalize_url('https://s3.example/seg1.ts?X-Amz-Signature=a&X-Amz-Date=b') == \
+        'https://s3.example/seg1.ts'
+
+
+def test_generic_parameter_names_stay_in_the_key():
+    # e, st, hash, sid могут выбирать содержимое - разные сегменты не должны совпасть
+    first = normalize_url('https://cdn.example/seg.ts?e=1&sid=a')
+    second = normalize_url('https://cdn.example/seg.ts?e=2&sid=a')
+    assert first != second
+
+
+def test_cloudfront_signature_only_dropped_as_a_whole():
+    signed = 'https://d1.cloudfront.net/seg.ts?Expires=1&Signature=s&Key-Pair-Id=k'
+    assert normalize_url(signed) == 'https://d1.cloudfront.net/seg.ts'
+    assert normalize_url('https://d1.cloudfront.net/seg.ts?Expires=1&Signature=s') == \
+        'https://d1.cloudfront.net/seg.ts?Expires=1&Signature=s'
+
+
+def test_configured_volatile_params(tmp_path):
+    with SegmentCache(str(tmp_path), volatile_params=['Token']) as cache:
+        cache.put('https://cdn.example/seg1.ts?token=first', b'segment')
+
+        assert cache.get('https://cdn.example/seg1.ts?token=second') == b'segment'
+        assert cache.get('https://cdn.example/seg2.ts?token=first') is None
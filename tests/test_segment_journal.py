@@ -0,0 +1,53 @@
+"""SegmentJournal: границы сегментов в файле"""
+
+import pytest
+
+from src.segment_journal import SegmentJournal, SegmentJournalError
+
+
+def make_journal():
+    return SegmentJournal.from_sizes(['a.ts', 'b.ts', 'c.ts'], [376, 188, 564])
+
+
+def test_offsets_follow_sizes():
+    journal = make_journal()
+
+    assert [(entry.offset, entry.end) for entry in journal.entries] == [(0, 376), (376, 564), (564, 1128)]
+    assert journal.total_size == 1128
+
+
+@pytest.mark.parametrize('start, end, expected', [
+    (0, 1, [0]),
+    (375, 377, [0, 1]),
+    (376, 564, [1]),
+    (100, 1000, [0, 1, 2]),
+    (1128, 2000, [2]),
+    (10, 10, []),
+])
+def test_segments_in_range(start, end, expected):
+    assert list(make_journal().segments_in_range(start, end)) == expected
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = SegmentJournal.path_for(str(tmp_path / 'video.ts'))
+    make_journal().save(path)
+
+    loaded = SegmentJournal.find(str(tmp_path / 'video.ts'))
+
+    assert loaded.entries == make_journal().entries
+    assert SegmentJournal.find(str(tmp_path / 'other.ts')) is None
+
+
+def test_replace_sizes_shifts_following_segments():
+    journal = make_journal().replace_sizes([(0, 188)])
+
+    assert [entry.offset for entry in journal.entries] == [0, 188, 376]
+    assert [entry.url for entry in journal.entries] == ['a.ts', 'b.ts', 'c.ts']
+
+
+def test_damaged_journal_raises(tmp_path):
+    path = tmp_path / 'video.ts.segments.json'
+    path.write_text('{"segments": [{"url": "a.ts"}]}', encoding='utf-8')
+
+    with pytest.raises(SegmentJournalError):
+        SegmentJournal.load(str(path))
@@ -0,0 +1,33 @@
+"""SegmentValidator: сигнатура тела важнее Content-Type"""
+
+import pytest
+
+from src.segment_validator import SegmentValidator, SegmentValidationError
+
+
+TS_SEGMENT = (b'\x47' + bytes(187)) * 20
+
+
+@pytest.mark.parametrize('content_type', [
+    'video/mp2t',
+    'text/vnd.trolltech.linguist',  # .ts в распространенных таблицах mime.types
+    'application/octet-stream',
+    '',
+])
+def test_ts_body_passes_with_any_content_type(content_type):
+    SegmentValidator().validate(TS_SEGMENT, {'Content-Type': content_type})
+
+
+@pytest.mark.parametrize('body, content_type', [
+    (b'<html><body>503</body></html>', 'video/mp2t'),
+    (b'{"error": "expired"}', 'application/json'),
+    (b'Access denied', 'text/plain'),
+])
+def test_error_pages_are_rejected(body, content_type):
+    with pytest.raises(SegmentValidationError, match='вместо видео получен текст'):
+        SegmentValidator().validate(body, {'Content-Type': content_type})
+
+
+def test_truncated_ts_is_rejected_even_with_video_content_type():
+    with pytest.raises(SegmentValidationError, match='не кратен'):
+        SegmentValidator().validate(TS_SEGMENT[:-10], {'Content-Type': 'video/mp2t'})
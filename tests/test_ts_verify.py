@@ -0,0 +1,175 @@
+"""TSVerifier и TSRepairer на сегментах HLSStandInServer"""
+
+import pytest
+
+from src.segment_journal import SegmentJournal
+from src.standin.hls import HLSConfig, HLSStandInServer
+from src.ts_verify import NUMPY_AVAILABLE, TS_PACKET_SIZE, TSRepairer, TSVerifier, main
+
+
+SEGMENTS = 6
+PACKETS = 32
+
+scan_modes = pytest.mark.parametrize('vectorized', [
+    False,
+    pytest.param(True, marks=pytest.mark.skipif(not NUMPY_AVAILABLE, reason='нет NumPy')),
+])
+
+
+@pytest.fixture(scope='module')
+def segments():
+    config = HLSConfig(segments=SEGMENTS, segment_size=PACKETS * TS_PACKET_SIZE)
+    with HLSStandInServer(config) as server:
+        return [server.segment(i) for i in range(SEGMENTS)]
+
+
+def write_video(tmp_path, parts, journal_sizes=None):
+    """Склеивает сегменты в файл; журнал - по journal_sizes или по фактическим размерам"""
+    path = tmp_path / 'video.ts'
+    path.write_bytes(b''.join(parts))
+    sizes = journal_sizes or [len(part) for part in parts]
+    journal = SegmentJournal.from_sizes([f'seg{i}.ts' for i in range(len(sizes))], sizes)
+    journal.save(SegmentJournal.path_for(str(path)))
+    return str(path), journal
+
+
+def corrupt_byte(segment, position, value):
+    data = bytearray(segment)
+    data[position] = value
+    return bytes(data)
+
+
+@scan_modes
+def test_intact_file(tmp_path, segments, vectorized):
+    path, journal = write_video(tmp_path, segments)
+
+    report = TSVerifier(path, journal, vectorized=vectorized).verify()
+
+    assert report.ok and report.packets == SEGMENTS * PACKETS
+    assert report.vectorized == vectorized
+
+
+@scan_modes
+def test_sync_loss_is_mapped_to_its_segment(tmp_path, segments, vectorized):
+    parts = list(segments)
+    parts[2] = corrupt_byte(parts[2], 5 * TS_PACKET_SIZE, 0x00)
+    path, journal = write_video(tmp_path, parts)
+
+    report = TSVerifier(path, journal, vectorized=vectorized).verify()
+
+    assert report.bad_segments == [2]
+    assert 'потеря синхронизации' in report.ranges[0].reason
+
+
+@scan_modes
+def test_continuity_counter_gap(tmp_path, segments, vectorized):
+    parts = list(segments)
+    # Синхробайты на месте, но счетчик пакета 10 сегмента 3 перескакивает
+    parts[3] = corrupt_byte(parts[3], 10 * TS_PACKET_SIZE + 3, 0x10 | 14)
+    path, journal = write_video(tmp_path, parts)
+
+    report = TSVerifier(path, journal, vectorized=vectorized).verify()
+
+    assert report.bad_segments == [3]
+    assert [corrupt.reason for corrupt in report.ranges] == ['разрыв continuity_counter']
+
+
+@scan_modes
+def test_truncated_segment_inside_file(tmp_path, segments, vectorized):
+    parts = list(segments)
+    parts[4] = parts[4][:-100]
+    path, journal = write_video(tmp_path, parts, journal_sizes=[len(part) for part in segments])
+
+    report = TSVerifier(path, journal, vectorized=vectorized).verify()
+
+    assert 4 in report.bad_segments and 1 not in report.bad_segments
+    reasons = '; '.join(corrupt.reason for corrupt in report.ranges)
+    assert 'обрезанный пакет' in reasons or 'неполный пакет' in reasons
+    assert 'по журналу' in reasons
+
+
+@scan_modes
+def test_truncated_file_end(tmp_path, segments, vectorized):
+    path, _ = write_video(tmp_path, segments)
+    with open(path, 'r+b') as f:
+        f.truncate(SEGMENTS * PACKETS * TS_PACKET_SIZE - 50)
+
+    report = TSVerifier(path, vectorized=vectorized).verify()
+
+    assert [corrupt.reason for corrupt in report.ranges] == ['неполный пакет в конце файла']
+    assert report.ranges[0].end == SEGMENTS * PACKETS * TS_PACKET_SIZE - 50
+
+
+@pytest.mark.skipif(not NUMPY_AVAILABLE, reason='нет NumPy')
+def test_numpy_and_python_scans_agree_across_chunks(tmp_path, segments, monkeypatch):
+    parts = list(segments)
+    parts[1] = corrupt_byte(parts[1], 7 * TS_PACKET_SIZE + 3, 0x10 | 2)
+    parts[2] = parts[2][:3000] + parts[2][3100:]
+    parts[5] = corrupt_byte(parts[5], 0, 0x00)
+    path, journal = write_video(tmp_path, parts, journal_sizes=[len(part) for part in segments])
+    # Порции по 7 пакетов: счетчики и потеря синхронизации на границах порций
+    monkeypatch.setattr(TSVerifier, 'CHUNK_PACKETS', 7)
+
+    python = TSVerifier(path, journal, vectorized=False).verify()
+    vectorized = TSVerifier(path, journal, vectorized=True).verify()
+
+    assert python.ranges == vectorized.ranges and python.ranges
+    assert python.bad_segments == vectorized.bad_segments
+
+
+class SegmentSource:
+    """Заменяет VideoDownloader: отдает исходные сегменты по URL журнала"""
+
+    max_workers = 2
+
+    def __init__(self, segments):
+        self.segments = segments
+        self.requested = []
+
+    def download_segment(self, url):
+        index = int(url[len('seg'):-len('.ts')])
+        self.requested.append(index)
+        return self.segments[index]
+
+
+def test_repair_in_place_is_byte_exact(tmp_path, segments):
+    parts = list(segments)
+    parts[1] = corrupt_byte(parts[1], 3 * TS_PACKET_SIZE, 0x00)
+    parts[4] = corrupt_byte(parts[4], 9 * TS_PACKET_SIZE + 3, 0x10 | 3)
+    path, journal = write_video(tmp_path, parts)
+    report = TSVerifier(path, journal).verify()
+    source = SegmentSource(segments)
+
+    repaired = TSRepairer(path, journal, source).repair(report.bad_segments)
+
+    assert sorted(source.requested) == [1, 4]
+    with open(path, 'rb') as f:
+        assert f.read() == b''.join(segments)
+    assert TSVerifier(path, repaired).verify().ok
+
+
+def test_repair_rebuilds_file_after_truncated_segment(tmp_path, segments):
+    parts = list(segments)
+    parts[2] = parts[2][:-TS_PACKET_SIZE * 3]
+    # Журнал скачивания: сегмент 2 записан обрезанным
+    path, journal = write_video(tmp_path, parts)
+    source = SegmentSource(segments)
+
+    repaired = TSRepairer(path, journal, source).repair([2])
+
+    with open(path, 'rb') as f:
+        assert f.read() == b''.join(segments)
+    assert [entry.size for entry in repaired.entries] == [len(segment) for segment in segments]
+    saved = SegmentJournal.load(SegmentJournal.path_for(path))
+    assert [entry.offset for entry in saved.entries] == [entry.offset for entry in repaired.entries]
+
+
+def test_cli_reports_bad_segments(tmp_path, segments, capsys):
+    parts = list(segments)
+    parts[0] = corrupt_byte(parts[0], 2 * TS_PACKET_SIZE, 0x00)
+    path, _ = write_video(tmp_path, parts)
+
+    assert main([path, '--no-numpy']) == 1
+    output = capsys.readouterr().out
+    assert '⚠ Найдено поврежденных диапазонов: 1' in output
+    assert 'Сегменты: 1' in output
@@ -0,0 +1,93 @@
+"""WorkerTuner: выбор точки насыщения и профиль по хостам"""
+
+import pytest
+
+from src.standin.hls import HLSConfig, HLSStandInServer
+from src.tuning import HostTuning, TuningError, TuningProfile, TuningSample, WorkerTuner
+
+
+class ScriptedTuner(WorkerTuner):
+    """Замеры по сценарию: потоков -> список (скорость, ошибки) по попыткам"""
+
+    def __init__(self, script, **kwargs):
+        super().__init__(['https://cdn.example/seg0.ts'], budget=1.0, candidates=sorted(script), **kwargs)
+        self.script = {workers: list(attempts) for workers, attempts in script.items()}
+        self.measured = []
+
+    def measure(self, workers, seconds):
+        self.measured.append(workers)
+        throughput, errors = self.script[workers].pop(0)
+        return TuningSample(workers, throughput, segments=10, errors=errors, elapsed=seconds)
+
+
+def test_knee_is_the_smallest_count_near_the_best():
+    tuner = ScriptedTuner({1: [(10, 0)], 2: [(19, 0)], 4: [(30, 0)], 6: [(31, 0)],
+                           8: [(31.5, 0)], 12: [(40, 0)]})
+
+    workers, samples = tuner.run()
+
+    # 6 и 8 не дали прироста больше MIN_GAIN - 12 уже не проверяется
+    assert tuner.measured == [1, 2, 4, 6, 8]
+    assert workers == 4 and len(samples) == 5
+
+
+def test_single_transient_error_is_measured_again():
+    tuner = ScriptedTuner({1: [(10, 0)], 2: [(5, 1), (20, 0)], 4: [(40, 0)]})
+    reported = []
+
+    workers, samples = tuner.run(reported.append)
+
+    assert tuner.measured == [1, 2, 2, 4]
+    assert workers == 4
+    assert [sample.errors for sample in reported] == [0, 1, 0, 0]
+
+
+def test_repeated_errors_stop_the_sweep():
+    tuner = ScriptedTuner({1: [(10, 0)], 2: [(20, 0)], 4: [(30, 2), (28, 3)], 8: [(60, 0)]})
+
+    workers, samples = tuner.run()
+
+    assert tuner.measured == [1, 2, 4, 4]
+    # Замеры с ошибками не выбираются, даже если быстрее
+    assert workers == 2
+
+
+def test_all_samples_failed():
+    tuner = ScriptedTuner({1: [(0, 1), (0, 1)], 2: [(10, 0)]})
+
+    with pytest.raises(TuningError, match='ни одного сегмента'):
+        tuner.run()
+
+
+def test_measure_against_stand_in_server():
+    config = HLSConfig(segments=20, segment_size=64 * 188)
+    with HLSStandInServer(config) as server:
+        workers, samples = WorkerTuner(server.segment_urls(), budget=0.2, candidates=(1, 2)).run()
+
+    assert workers in (1, 2)
+    for sample in samples:
+        # Прогрев и MIN_MEASURED сегментов после него в каждом потоке
+        assert sample.throughput > 0 and sample.errors == 0
+        assert sample.segments >= sample.workers * (1 + WorkerTuner.MIN_MEASURED)
+
+
+def test_profile_round_trip_by_host(tmp_path):
+    path = str(tmp_path / 'config' / 'tuning.json')
+    profile = TuningProfile(path)
+    profile.hosts['cdn.example:8443'] = HostTuning(workers=6, throughput=1e7, tuned_at='2024-03-01',
+                                                   samples={'4': 9e6, '6': 1e7})
+    profile.save()
+
+    loaded = TuningProfile.load(path)
+
+    assert loaded.workers_for('https://CDN.example:8443/v1/seg5.ts') == 6
+    assert loaded.workers_for('https://cdn.example/v1/seg5.ts') is None
+    assert loaded.hosts['cdn.example:8443'].samples == {'4': 9e6, '6': 1e7}
+
+
+def test_damaged_profile_raises(tmp_path):
+    path = tmp_path / 'tuning.json'
+    path.write_text('{"hosts": {"cdn.example": {}}}', encoding='utf-8')
+
+    with pytest.raises(TuningError, match='Не удалось прочитать профиль'):
+        TuningProfile.load(str(path))